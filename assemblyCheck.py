@@ -0,0 +1,161 @@
+"""Interference and clearance check of the assembled box.
+
+All five meshes are placed at their stacked positions (kitAssembly.py)
+and every mating pair is checked with a pair of BVHs walked together
+(meshBVH.MeshBVH.proximity):
+
+- clearance: smallest gap between facing surfaces, e.g. the 0.1 mm
+  between the fingerHole top tab and the ledHousing groove
+- contact: facets resting on each other (within --contact-tol)
+- interference: facets crossing each other; the overlapping volume is
+  then measured along scanlines (see overlap_volume)
+
+    python3 assemblyCheck.py                   # committed STLs
+    python3 assemblyCheck.py --meshes build --json assembly.json
+
+The exit status is 1 when any pair interferes.
+"""
+import argparse
+import itertools
+import json
+import sys
+
+import numpy as np
+
+import kitAssembly
+from meshBVH import MeshBVH
+
+
+def overlap_volume(bvh_a, bvh_b, lo, hi, resolution=0.05, max_lines=40000, seed=0):
+    """Volume inside both meshes within the box (lo, hi), in mm^3.
+
+    One scanline along +X per (resolution x resolution) cell of the box's
+    YZ face, placed at a random point of its cell so thin slabs are not
+    aliased by the grid. Both meshes are hit-tested along each line and
+    the length where both are inside (odd hit count so far) is summed
+    exactly. The step is coarsened so at most max_lines lines are cast.
+    Returns (volume, step used).
+    """
+    size = np.maximum(hi - lo, 0.0)
+    if not (size > 0).all():
+        return 0.0, resolution
+    step = max(resolution, float(np.sqrt(size[1] * size[2] / max_lines)))
+    ny, nz = np.maximum(np.ceil(size[1:] / step), 1).astype(np.intp)
+    cell_y, cell_z = size[1] / ny, size[2] / nz
+    rng = np.random.default_rng(seed)
+    grid_y, grid_z = np.meshgrid(np.arange(ny), np.arange(nz), indexing='ij')
+    ys = lo[1] + (grid_y.ravel() + rng.random(grid_y.size)) * cell_y
+    zs = lo[2] + (grid_z.ravel() + rng.random(grid_z.size)) * cell_z
+    # Lines start left of both meshes, so the hit parity starts outside
+    start = min(bvh_a.node_lo[0][0], bvh_b.node_lo[0][0]) - 1.0
+    origins = np.stack([np.full(len(ys), start), ys, zs], axis=1)
+
+    rays, xs, in_a = [], [], []
+    for is_a, bvh in ((True, bvh_a), (False, bvh_b)):
+        hit_rays, t, _facets = bvh.ray_intersections(origins, [1.0, 0.0, 0.0])
+        rays.append(hit_rays)
+        xs.append(start + t)
+        in_a.append(np.full(len(t), is_a))
+    rays, xs, in_a = np.concatenate(rays), np.concatenate(xs), np.concatenate(in_a)
+    order = np.lexsort((xs, rays))
+    rays, xs, in_a = rays[order], xs[order], in_a[order]
+
+    # Hit counts of each mesh so far along the line, restarted per line
+    count_a = np.cumsum(in_a)
+    count_b = np.cumsum(~in_a)
+    first = np.searchsorted(rays, rays)
+    count_a = count_a - count_a[first] + in_a[first]
+    count_b = count_b - count_b[first] + ~in_a[first]
+
+    same_line = rays[1:] == rays[:-1]
+    both = same_line & (count_a[:-1] % 2 == 1) & (count_b[:-1] % 2 == 1)
+    clipped = np.clip(xs, lo[0], hi[0])
+    length = (clipped[1:] - clipped[:-1])[both].sum()
+    return float(length * cell_y * cell_z), step
+
+
+def _interference_region(bvh_a, bvh_b, near):
+    """Box bounding the crossing facets and the facets inside the other part."""
+    lo = np.maximum(bvh_a.node_lo[0], bvh_b.node_lo[0])
+    hi = np.minimum(bvh_a.node_hi[0], bvh_b.node_hi[0])
+    parts = [bvh_a.tris[near.crossing[:, 0]], bvh_b.tris[near.crossing[:, 1]]]
+    for bvh, other, touching in ((bvh_a, bvh_b, near.contact[:, 0]), (bvh_b, bvh_a, near.contact[:, 1])):
+        candidates = np.setdiff1d(np.arange(len(bvh.tris)), touching)
+        tris = bvh.tris[candidates]
+        candidates = candidates[((tris.max(axis=1) >= lo) & (tris.min(axis=1) <= hi)).all(axis=1)]
+        if len(candidates):
+            inside = other.contains(bvh.tris[candidates].mean(axis=1))
+            parts.append(bvh.tris[candidates[inside]])
+    points = np.concatenate([p.reshape(-1, 3) for p in parts])
+    if not len(points):
+        return None
+    return np.maximum(points.min(axis=0), lo), np.minimum(points.max(axis=0), hi)
+
+
+def check_pair(bvh_a, bvh_b, max_clearance=5.0, contact_tol=1e-4, resolution=0.05):
+    near = bvh_a.proximity(bvh_b, max_distance=max_clearance, contact_tol=contact_tol)
+    result = {
+        'clearance': near.gap,
+        'clearance_at': None if near.gap_points is None else ((near.gap_points[0] + near.gap_points[1]) / 2).tolist(),
+        'contact_facets': len(near.contact),
+        'crossing_facets': len(near.crossing),
+        'interference_volume': 0.0,
+    }
+
+    region = _interference_region(bvh_a, bvh_b, near)
+    if region is not None:
+        volume, step = overlap_volume(bvh_a, bvh_b, region[0], region[1], resolution)
+        result['interference_volume'] = volume
+        result['volume_resolution'] = step
+    result['interferes'] = bool(len(near.crossing)) or result['interference_volume'] > 0
+    return result
+
+
+def check_assembly(meshes, pairs=None, max_clearance=5.0, contact_tol=1e-4, resolution=0.05):
+    """Check placed meshes ({module: triangles}, see kitAssembly.load_assembly).
+
+    pairs defaults to kitAssembly.MATING_PAIRS. Returns {(a, b): result}.
+    """
+    pairs = kitAssembly.MATING_PAIRS if pairs is None else pairs
+    trees = {}
+    for name in sorted(set(itertools.chain(*pairs))):
+        trees[name] = MeshBVH(meshes[name])
+    return {(a, b): check_pair(trees[a], trees[b], max_clearance, contact_tol, resolution) for a, b in pairs}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check the assembled box for interference and clearances.')
+    parser.add_argument('--meshes', default='.', help='directory with the module STLs (default: .)')
+    parser.add_argument('--params', help='JSON file of {module: parameter overrides} the meshes were built with')
+    parser.add_argument('--all-pairs', action='store_true', help='check every pair of parts, not only mating pairs')
+    parser.add_argument('--max-clearance', type=float, default=5.0, help='largest gap reported in mm (default: 5)')
+    parser.add_argument('--contact-tol', type=float, default=1e-4, help='touching tolerance in mm (default: 1e-4)')
+    parser.add_argument('--resolution', type=float, default=0.05,
+                        help='scanline spacing for interference volumes in mm (default: 0.05)')
+    parser.add_argument('--json', help='write the full report to this file')
+    args = parser.parse_args(argv)
+
+    params = None
+    if args.params:
+        with open(args.params) as f:
+            params = json.load(f)
+    meshes = kitAssembly.load_assembly(args.meshes, params)
+    pairs = list(itertools.combinations(meshes, 2)) if args.all_pairs else None
+    results = check_assembly(meshes, pairs, args.max_clearance, args.contact_tol, args.resolution)
+
+    failed = False
+    for (a, b), result in results.items():
+        failed = failed or result['interferes']
+        clearance = '%8.3f mm' % result['clearance'] if result['clearance'] is not None else '      > %g' % args.max_clearance
+        print('%-24s %-24s clearance %s  contact %5d  %s' % (
+            a, b, clearance, result['contact_facets'],
+            'INTERFERES %.3f mm3' % result['interference_volume'] if result['interferes'] else 'ok'))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([dict(result, parts=[a, b]) for (a, b), result in results.items()], f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""Timing benchmarks for the module builders.
+
+For every module: build_base, each cut step (making its tools and the
+boolean that applies them), all cuts as one batched boolean,
+tessellation at several tolerances and STL export (time and file size).
+Every timing is the best of --repeat runs.
+
+Runs against the real FreeCAD kernel when it can be imported and falls
+back to the stand-in in freecadShim/ otherwise (--kernel picks one
+explicitly). Shim numbers measure the Python side of the builders only;
+the report records which kernel produced it and baselines are only
+compared within the same kernel.
+
+    python3 benchmarkSuite.py --out bench.json
+    python3 benchmarkSuite.py --baseline bench.json --threshold 0.25   # exit 1 on regressions
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import booleanOps
+import buildKit
+
+SHIM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'freecadShim')
+KERNELS = ('auto', 'freecad', 'shim')
+TOLERANCES = (0.1, 0.05, 0.01)
+
+
+def select_kernel(kernel='auto'):
+    """Make `import FreeCAD, Part` resolve to the requested kernel and return its label."""
+    if kernel != 'shim':
+        try:
+            import FreeCAD
+            import Part  # noqa: F401
+        except ImportError:
+            if kernel == 'freecad':
+                raise
+        else:
+            if os.path.dirname(os.path.abspath(getattr(FreeCAD, '__file__', None) or '.')) != SHIM_DIR:
+                return 'freecad ' + '.'.join(FreeCAD.Version()[:3])
+            if kernel == 'freecad':
+                raise ImportError('FreeCAD resolves to the stand-in in %s' % SHIM_DIR)
+            return 'shim'
+    sys.path.insert(0, SHIM_DIR)
+    for name in ('FreeCAD', 'Part'):
+        sys.modules.pop(name, None)
+    # The builders load the kernel lazily (kernelLoader.py); import it now so
+    # the first timed build_base does not pay for the import
+    import FreeCAD  # noqa: F401
+    import Part  # noqa: F401
+    return 'shim'
+
+
+def _timed(func, repeat, setup=None):
+    """Run func repeat times; return ({'seconds': best, 'median': median}, last result).
+
+    setup() runs untimed before each call and its result is passed to func.
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return {'seconds': min(times), 'median': statistics.median(times)}, result
+
+
+def bench_module(module, tolerances=TOLERANCES, repeat=3, out_dir='.'):
+    p = dict(module.PARAMS)
+    report = {}
+    report['build_base'], shape = _timed(lambda: module.build_base(p), repeat)
+    base = shape
+
+    steps = {}
+    all_tools = []
+    for label, step in module.CUT_STEPS:
+        make, tools = _timed(lambda: step(p), repeat)
+        tools = booleanOps.flatten_tools([(label, tools)])
+        cut, cut_shape = _timed(lambda: booleanOps.cut_sequential(shape, tools), repeat)
+        steps[label] = {'tools': len(tools), 'make_tools': make, 'cut': cut}
+        all_tools.extend(tools)
+        shape = cut_shape
+    report['steps'] = steps
+    report['cut_batched'], _batched = _timed(lambda: booleanOps.cut_batched(base, all_tools), repeat)
+
+    # Fresh copies, so a triangulation cached on the shape is never reused
+    tessellation = {}
+    for tolerance in tolerances:
+        timing, (points, facets) = _timed(lambda fresh: fresh.tessellate(tolerance), repeat, shape.copy)
+        tessellation[str(tolerance)] = dict(timing, points=len(points), triangles=len(facets))
+    report['tessellate'] = tessellation
+
+    path = os.path.join(out_dir, module.MODULE_NAME + '.stl')
+    timing, _ = _timed(lambda fresh: fresh.exportStl(path), repeat, shape.copy)
+    report['export_stl'] = dict(timing, bytes=os.path.getsize(path))
+    return report
+
+
+def run_benchmarks(modules=buildKit.MODULES, tolerances=TOLERANCES, repeat=3, kernel='auto'):
+    label = select_kernel(kernel)
+    results = {}
+    with tempfile.TemporaryDirectory() as out_dir:
+        for name in modules:
+            results[name] = bench_module(buildKit.load_module(name), tolerances, repeat, out_dir)
+    return {
+        'kernel': label,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repeat': repeat,
+        'modules': results,
+    }
+
+
+# ---------------------------------------
+# Baseline comparison
+# ---------------------------------------
+def metrics(report):
+    """Flatten a report into {metric path: (value, is_time)}."""
+    flat = {}
+    for name, result in report['modules'].items():
+        flat[name + '/build_base'] = (result['build_base']['seconds'], True)
+        for label, step in result['steps'].items():
+            flat['%s/%s/make_tools' % (name, label)] = (step['make_tools']['seconds'], True)
+            flat['%s/%s/cut' % (name, label)] = (step['cut']['seconds'], True)
+        flat[name + '/cut_batched'] = (result['cut_batched']['seconds'], True)
+        for tolerance, tess in result['tessellate'].items():
+            flat['%s/tessellate %s' % (name, tolerance)] = (tess['seconds'], True)
+            flat['%s/tessellate %s/triangles' % (name, tolerance)] = (tess['triangles'], False)
+        flat[name + '/export_stl'] = (result['export_stl']['seconds'], True)
+        flat[name + '/export_stl/bytes'] = (result['export_stl']['bytes'], False)
+    return flat
+
+
+def compare(report, baseline, threshold=0.25, min_seconds=0.002):
+    """Rows (metric, baseline, current, ratio, status) for the modules of report.
+
+    A metric regresses when it grows by more than threshold (relative);
+    timings also need to grow by more than min_seconds, so noise on
+    sub-millisecond steps is not flagged.
+    """
+    if report['kernel'] != baseline['kernel']:
+        raise ValueError('baseline was measured with %r, this run with %r' % (baseline['kernel'], report['kernel']))
+    current = metrics(report)
+    # Modules left out of this run are not missing
+    previous = {metric: value for metric, value in metrics(baseline).items()
+                if metric.split('/', 1)[0] in report['modules']}
+    rows = []
+    for metric in sorted(set(current) | set(previous)):
+        if metric not in previous:
+            rows.append((metric, None, current[metric][0], None, 'new'))
+            continue
+        if metric not in current:
+            rows.append((metric, previous[metric][0], None, None, 'missing'))
+            continue
+        (new, is_time), (old, _) = current[metric], previous[metric]
+        ratio = new / old if old else (1.0 if new == old else float('inf'))
+        floor = min_seconds if is_time else 0
+        if ratio > 1 + threshold and new - old > floor:
+            status = 'regressed'
+        elif ratio < 1 / (1 + threshold) and old - new > floor:
+            status = 'improved'
+        else:
+            status = 'ok'
+        rows.append((metric, old, new, ratio, status))
+    return rows
+
+
+def _format(value):
+    if value is None:
+        return '-'
+    return '%d' % value if isinstance(value, int) else '%.4f' % value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the module builders.')
+    parser.add_argument('modules', nargs='*', help='modules to benchmark (default: all five)')
+    parser.add_argument('--kernel', default='auto', choices=KERNELS,
+                        help='FreeCAD kernel or the freecadShim stand-in (default: auto)')
+    parser.add_argument('--repeat', type=int, default=3, help='timing repetitions (best is kept)')
+    parser.add_argument('--tolerances', default=','.join(str(t) for t in TOLERANCES),
+                        help='comma separated tessellation tolerances in mm (default: %(default)s)')
+    parser.add_argument('--out', help='write the report as JSON to this file')
+    parser.add_argument('--baseline', help='compare against this earlier report')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='relative growth flagged as a regression (default: 0.25)')
+    parser.add_argument('--min-seconds', type=float, default=0.002,
+                        help='ignore timing changes smaller than this (default: 0.002)')
+    args = parser.parse_args(argv)
+
+    tolerances = [float(t) for t in args.tolerances.split(',') if t.strip()]
+    report = run_benchmarks(args.modules or buildKit.MODULES, tolerances, args.repeat, args.kernel)
+
+    print('kernel: %s' % report['kernel'])
+    for name, result in report['modules'].items():
+        steps = result['steps']
+        slowest = max(steps, key=lambda label: steps[label]['cut']['seconds']) if steps else '-'
+        print('%-24s base %7.4f s  cuts %7.4f s (batched %7.4f s, slowest %s)  stl %7.4f s %8d bytes' % (
+            name, result['build_base']['seconds'], sum(step['cut']['seconds'] for step in steps.values()),
+            result['cut_batched']['seconds'], slowest, result['export_stl']['seconds'],
+            result['export_stl']['bytes']))
+        for tolerance, tess in result['tessellate'].items():
+            print('%24s tessellate %-6s %7.4f s %8d triangles' % ('', tolerance, tess['seconds'], tess['triangles']))
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        try:
+            rows = compare(report, baseline, args.threshold, args.min_seconds)
+        except ValueError as error:
+            print('cannot compare: %s' % error)
+            return 2
+        flagged = [row for row in rows if row[4] != 'ok']
+        for metric, old, new, ratio, status in flagged:
+            print('%-10s %-64s %10s -> %10s%s' % (status, metric, _format(old), _format(new),
+                                                 '  x%.2f' % ratio if ratio is not None else ''))
+        regressions = sum(1 for row in rows if row[4] == 'regressed')
+        print('%d metric(s) compared, %d regression(s)' % (len(rows), regressions))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Cut strategies shared by the module builders.
+
+Every builder is a base solid plus an ordered list of cut steps. The
+cuts can be applied one boolean at a time ('sequential', the way the
+original scripts did it) or as a single multi-tool boolean ('batched'),
+which lets OpenCascade process the accumulated solid only once. With
+'symmetric' the batched cut runs on a half or quarter of a mirror
+symmetric base, mirrored back afterwards (symmetryOps.py).
+
+    python3 booleanOps.py               # compare both modes for all modules
+    python3 booleanOps.py ledHousing --repeat 5
+"""
+import argparse
+import time
+
+CUT_MODES = ('sequential', 'batched', 'symmetric')
+
+
+def flatten_tools(steps):
+    """Return the tool shapes of (label, shape-or-list) steps as one list."""
+    tools = []
+    for _label, step_tools in steps:
+        if isinstance(step_tools, (list, tuple)):
+            tools.extend(step_tools)
+        else:
+            tools.append(step_tools)
+    return tools
+
+
+def cut_sequential(shape, tools):
+    for tool in tools:
+        shape = shape.cut(tool)
+    return shape
+
+
+def cut_batched(shape, tools):
+    # Shape.cut accepts a list of tools and runs one generalized boolean
+    if not tools:
+        return shape
+    return shape.cut(list(tools))
+
+
+def apply_cuts(base, steps, mode='batched'):
+    if mode == 'sequential':
+        return cut_sequential(base, flatten_tools(steps))
+    if mode == 'batched':
+        return cut_batched(base, flatten_tools(steps))
+    if mode == 'symmetric':
+        import symmetryOps  # imports this module
+        return symmetryOps.cut_symmetric(base, steps)
+    raise ValueError('unknown cut mode %r, expected one of %s' % (mode, ', '.join(CUT_MODES)))
+
+
+def shapes_equivalent(a, b, rel_tol=1e-6):
+    """Check two solids enclose the same volume (symmetric difference ~ 0)."""
+    scale = max(abs(a.Volume), abs(b.Volume), 1e-12)
+    if abs(a.Volume - b.Volume) > rel_tol * scale:
+        return False
+    difference = a.cut(b).Volume + b.cut(a).Volume
+    return difference <= rel_tol * scale
+
+
+def _best_time(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def compare_cut_modes(module, params=None, repeat=3):
+    """Time the cut modes for a builder module and check they agree with sequential cuts."""
+    p = dict(module.PARAMS, **(params or {}))
+    base = module.build_base(p)
+    steps = [(label, step(p)) for label, step in module.CUT_STEPS]
+    tools = flatten_tools(steps)
+
+    sequential, sequential_seconds = _best_time(lambda: cut_sequential(base, tools), repeat)
+    batched, batched_seconds = _best_time(lambda: cut_batched(base, tools), repeat)
+    symmetric, symmetric_seconds = _best_time(lambda: apply_cuts(base, steps, 'symmetric'), repeat)
+
+    return {
+        'module': module.__name__,
+        'tools': len(tools),
+        'sequential_seconds': sequential_seconds,
+        'batched_seconds': batched_seconds,
+        'symmetric_seconds': symmetric_seconds,
+        'speedup': sequential_seconds / batched_seconds if batched_seconds else float('inf'),
+        'symmetric_speedup': batched_seconds / symmetric_seconds if symmetric_seconds else float('inf'),
+        'sequential_volume': sequential.Volume,
+        'batched_volume': batched.Volume,
+        'symmetric_volume': symmetric.Volume,
+        'equivalent': shapes_equivalent(sequential, batched),
+        'symmetric_equivalent': shapes_equivalent(sequential, symmetric),
+    }
+
+
+def main(argv=None):
+    import buildKit
+
+    parser = argparse.ArgumentParser(description='Compare sequential, batched and symmetric cuts.')
+    parser.add_argument('modules', nargs='*', help='modules to compare (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='timing repetitions (best is kept)')
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.modules or buildKit.MODULES:
+        result = compare_cut_modes(buildKit.load_module(name), repeat=args.repeat)
+        results.append(result)
+        print('%-24s %3d tools  sequential %7.3f s  batched %7.3f s  x%.2f  %s  symmetric %7.3f s  x%.2f  %s' % (
+            name, result['tools'], result['sequential_seconds'], result['batched_seconds'],
+            result['speedup'], 'equivalent' if result['equivalent'] else 'MISMATCH',
+            result['symmetric_seconds'], result['symmetric_speedup'],
+            'equivalent' if result['symmetric_equivalent'] else 'MISMATCH'))
+    return results
+
+
+if __name__ == '__main__':
+    main()
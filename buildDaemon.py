@@ -0,0 +1,382 @@
+"""Long-lived build worker that keeps FreeCAD and the builders loaded.
+
+    python3 buildDaemon.py serve --watch --params params.json --out build
+    python3 buildDaemon.py build ledHousing --set tilt_angle_deg=14
+    python3 buildDaemon.py status
+    python3 buildDaemon.py stop
+
+The server imports FreeCAD and the five module scripts once and keeps a
+stepGraph.IncrementalBuilder per module, so a request pays neither the
+interpreter and kernel startup nor the steps whose parameters did not
+change. Requests come in over a local socket (a named pipe on Windows)
+through multiprocessing.connection, authenticated with a random key the
+server writes next to the socket, readable by the user only.
+
+With --watch the server polls the module files, SHARED_MODULES and the
+--params file (JSON {module: {parameter: value}}) and rebuilds what
+changed: an edited module is reloaded and rebuilt from scratch, edited
+parameters re-run only the steps that read them. A saved parameter
+file sets the overrides of every module, replacing those of earlier
+build requests. Every rebuild writes the module's files to --out.
+
+With --documents DIR (real FreeCAD only) every module keeps one
+document that is emptied and refilled on each rebuild and saved as
+DIR/<module>.FCStd, instead of a new document per run.
+"""
+import argparse
+import getpass
+import importlib
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import AuthenticationError, Client, Listener
+
+import buildKit
+import stepGraph
+
+SHARED_MODULES = ('booleanOps', 'patternOps', 'symmetryOps', 'ledGeometry')   # imported by the builders
+HISTORY = 20
+
+
+def default_address():
+    name = 'box-kit-%s' % getpass.getuser()
+    if os.name == 'nt':
+        return r'\\.\pipe\%s' % name
+    return os.path.join(tempfile.gettempdir(), name + '.sock')
+
+
+def key_path(address):
+    if os.name == 'nt':
+        return os.path.join(tempfile.gettempdir(), address.rsplit('\\', 1)[-1] + '.key')
+    return address + '.key'
+
+
+def _write_key(path):
+    key = os.urandom(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    return key
+
+
+def load_params(path):
+    """{module: overrides} from a parameter file; missing modules get {}."""
+    with open(path) as f:
+        data = json.load(f)
+    unknown = sorted(set(data) - set(buildKit.MODULES))
+    if unknown:
+        raise ValueError('%s: unknown module(s) %s' % (path, ', '.join(unknown)))
+    return {name: dict(data.get(name) or {}) for name in buildKit.MODULES}
+
+
+class BuildServer:
+    """The warm state: loaded modules, their step memos and last parameters."""
+
+    def __init__(self, out_dir='build', formats=('stl',), document_dir=None):
+        self.out_dir = out_dir
+        self.formats = list(formats)
+        self.document_dir = document_dir
+        self.modules = {name: buildKit.load_module(name) for name in buildKit.MODULES}
+        self.builders = {name: stepGraph.IncrementalBuilder(module) for name, module in self.modules.items()}
+        self.params = {name: {} for name in buildKit.MODULES}
+        self.history = []
+        self.started = time.time()
+        self.stopped = threading.Event()
+        # Kernel calls are not thread-safe: builds and reloads take turns
+        self.lock = threading.RLock()
+        os.makedirs(out_dir, exist_ok=True)
+
+    def build(self, name, params=None, formats=None):
+        """Rebuild one module (only its stale steps) and export it.
+
+        params replaces the module's overrides; None keeps the last ones.
+        Files are rewritten only when a step re-ran or one is missing.
+        """
+        with self.lock:
+            if name not in self.modules:
+                raise ValueError('unknown module %r, expected one of %s' % (name, ', '.join(buildKit.MODULES)))
+            module = self.modules[name]
+            if params is not None:
+                buildKit.check_params(module, params)
+                self.params[name] = dict(params)
+            formats = list(formats or self.formats)
+            builder = self.builders[name]
+
+            start = time.perf_counter()
+            shape = builder.build(self.params[name])
+            build_seconds = time.perf_counter() - start
+            stem = os.path.join(self.out_dir, module.MODULE_NAME)
+            paths = ['%s.%s' % (stem, fmt) for fmt in formats]
+            if builder.last_run or not all(os.path.exists(path) for path in paths):
+                buildKit.export_shape(shape, stem, formats)
+            if self.document_dir:
+                self.publish(module.MODULE_NAME, shape)
+
+            result = {
+                'module': name,
+                'params': self.params[name],
+                'rerun': list(builder.last_run),
+                'build_seconds': build_seconds,
+                'total_seconds': time.perf_counter() - start,
+                'files': paths,
+            }
+            self.history = (self.history + [result])[-HISTORY:]
+            return result
+
+    def publish(self, name, shape):
+        """Put the shape into the module's one document, replacing what it held."""
+        import FreeCAD
+
+        doc = FreeCAD.listDocuments().get(name) or FreeCAD.newDocument(name)
+        for obj in list(doc.Objects):
+            doc.removeObject(obj.Name)
+        feature = doc.addObject('Part::Feature', name)
+        feature.Shape = shape
+        doc.recompute()
+        os.makedirs(self.document_dir, exist_ok=True)
+        doc.saveAs(os.path.join(os.path.abspath(self.document_dir), name + '.FCStd'))
+
+    def reload(self, names=None):
+        """Re-import module sources; None also reloads SHARED_MODULES and all builders.
+
+        A module that fails to import keeps its previous version.
+        Returns {name: error message} for those.
+        """
+        errors = {}
+        with self.lock:
+            if names is None:
+                for helper in SHARED_MODULES:
+                    if helper in sys.modules:
+                        try:
+                            importlib.reload(sys.modules[helper])
+                        except Exception as error:
+                            errors[helper] = '%s: %s' % (type(error).__name__, error)
+                names = list(self.modules)
+            for name in names:
+                try:
+                    module = importlib.reload(self.modules[name])
+                except Exception as error:     # a half-edited file must not kill the server
+                    errors[name] = '%s: %s' % (type(error).__name__, error)
+                    continue
+                self.modules[name] = module
+                self.builders[name] = stepGraph.IncrementalBuilder(module)
+        return errors
+
+    def status(self):
+        return {
+            'pid': os.getpid(),
+            'uptime': time.time() - self.started,
+            'out': os.path.abspath(self.out_dir),
+            'params': self.params,
+            'run_counts': {name: builder.run_counts for name, builder in self.builders.items()},
+            'recent': self.history[-5:],
+        }
+
+    def handle(self, request):
+        """Answer one request dict; errors are returned, never raised."""
+        command = request.get('cmd')
+        try:
+            if command == 'build':
+                return {'ok': True, 'result': self.build(request['module'], request.get('params'),
+                                                         request.get('formats'))}
+            if command == 'status':
+                return {'ok': True, 'status': self.status()}
+            if command == 'stop':
+                self.stopped.set()
+                return {'ok': True}
+            raise ValueError('unknown command %r' % command)
+        except Exception as error:
+            return {'ok': False, 'error': '%s: %s' % (type(error).__name__, error)}
+
+
+# ---------------------------------------
+# File watching
+# ---------------------------------------
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class FileWatcher:
+    """Polls modification times; no platform notification API needed."""
+
+    def __init__(self, paths):
+        self.mtimes = {path: _mtime(path) for path in paths}
+
+    def changed(self):
+        changed = []
+        for path, seen in self.mtimes.items():
+            current = _mtime(path)
+            if current != seen:
+                self.mtimes[path] = current
+                changed.append(path)
+        return changed
+
+
+def watch(server, params_path=None, interval=0.5, log=print):
+    """Rebuild on edits until server.stopped is set (runs in its own thread)."""
+    module_files = {os.path.abspath(module.__file__): name for name, module in server.modules.items()}
+    # Also the helpers the builders import on first use only (ledGeometry, symmetryOps)
+    specs = [importlib.util.find_spec(helper) for helper in SHARED_MODULES]
+    shared_files = [os.path.abspath(spec.origin) for spec in specs if spec is not None and spec.origin]
+    paths = list(module_files) + shared_files + ([os.path.abspath(params_path)] if params_path else [])
+    watcher = FileWatcher(paths)
+
+    while not server.stopped.wait(interval):
+        changed = watcher.changed()
+        if not changed:
+            continue
+        rebuild = set()
+        if any(path in shared_files for path in changed):
+            errors = server.reload()
+            rebuild.update(server.modules)
+        else:
+            edited = [module_files[path] for path in changed if path in module_files]
+            errors = server.reload(edited) if edited else {}
+            rebuild.update(edited)
+        for name, error in sorted(errors.items()):
+            log('%s: reload failed, keeping the previous version (%s)' % (name, error))
+            rebuild.discard(name)
+
+        new_params = {}
+        if params_path and os.path.abspath(params_path) in changed:
+            try:
+                new_params = load_params(params_path)
+            except (OSError, ValueError) as error:
+                log('%s: %s' % (params_path, error))
+            for name, params in new_params.items():
+                if params != server.params[name]:
+                    rebuild.add(name)
+
+        for name in sorted(rebuild):
+            response = server.handle({'cmd': 'build', 'module': name, 'params': new_params.get(name)})
+            if response['ok']:
+                result = response['result']
+                log('%-24s %6.2f s  re-ran %s' % (name, result['total_seconds'], ', '.join(result['rerun']) or '-'))
+            else:
+                log('%-24s %s' % (name, response['error']))
+
+
+# ---------------------------------------
+# Socket server and client
+# ---------------------------------------
+def request(message, address=None):
+    """Send one request to a running server and return its response."""
+    address = address or default_address()
+    with open(key_path(address), 'rb') as f:
+        key = f.read()
+    with Client(address, authkey=key) as connection:
+        connection.send(message)
+        return connection.recv()
+
+
+def serve(server, address=None, log=print):
+    address = address or default_address()
+    try:
+        if request({'cmd': 'status'}, address)['ok']:
+            raise RuntimeError('a build server is already running at %s' % address)
+    except (OSError, EOFError, AuthenticationError):
+        pass
+    if os.name != 'nt' and os.path.exists(address):
+        os.unlink(address)     # left behind by a server that was killed
+    key = _write_key(key_path(address))
+    try:
+        with Listener(address, authkey=key) as listener:
+            if os.name != 'nt':
+                os.chmod(address, 0o600)
+            log('serving on %s' % address)
+            while not server.stopped.is_set():
+                try:
+                    connection = listener.accept()
+                except (AuthenticationError, OSError):
+                    continue
+                with connection:
+                    try:
+                        message = connection.recv()
+                    except (EOFError, OSError):
+                        continue
+                    connection.send(server.handle(message))
+    finally:
+        server.stopped.set()
+        if os.path.exists(key_path(address)):
+            os.unlink(key_path(address))
+
+
+def _print_result(result):
+    print('%-24s %6.2f s  re-ran %s  %s' % (result['module'], result['total_seconds'],
+                                           ', '.join(result['rerun']) or '-', ', '.join(result['files'])))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Warm build server for the box modules.')
+    parser.add_argument('--address', help='socket path or pipe name (default: %s)' % default_address())
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help='run the server in the foreground')
+    serve_parser.add_argument('--out', default='build', help='output directory (default: build)')
+    serve_parser.add_argument('--formats', default='stl', help='comma separated export formats (default: stl)')
+    serve_parser.add_argument('--params', help='JSON {module: {parameter: value}} file to build with')
+    serve_parser.add_argument('--watch', action='store_true', help='rebuild when modules or --params change')
+    serve_parser.add_argument('--interval', type=float, default=0.5, help='watch poll interval in s (default: 0.5)')
+    serve_parser.add_argument('--documents', help='keep one FreeCAD document per module, saved in this directory')
+
+    build_parser = commands.add_parser('build', help='ask the server to build modules')
+    build_parser.add_argument('modules', nargs='+')
+    build_parser.add_argument('--set', action='append', metavar='NAME=VALUE',
+                              help='parameter override (JSON value), may be repeated; replaces earlier ones')
+    build_parser.add_argument('--formats', help='comma separated export formats (default: the server\'s)')
+
+    commands.add_parser('status', help='show the server state')
+    commands.add_parser('stop', help='stop the server')
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        formats = [fmt.strip().lower() for fmt in args.formats.split(',') if fmt.strip()]
+        server = BuildServer(args.out, formats, args.documents)
+        initial = load_params(args.params) if args.params else {}
+        # Build everything once, so the first request only pays for its changes
+        for name in buildKit.MODULES:
+            response = server.handle({'cmd': 'build', 'module': name, 'params': initial.get(name)})
+            if response['ok']:
+                _print_result(response['result'])
+            else:
+                print('%-24s %s' % (name, response['error']))
+        if args.watch:
+            threading.Thread(target=watch, args=(server, args.params, args.interval), daemon=True).start()
+        try:
+            serve(server, args.address)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    try:
+        if args.command == 'build':
+            params = buildKit.parse_overrides(args.set) if args.set is not None else None
+            formats = [fmt.strip().lower() for fmt in args.formats.split(',')] if args.formats else None
+            failed = False
+            for name in args.modules:
+                response = request({'cmd': 'build', 'module': name, 'params': params, 'formats': formats},
+                                   args.address)
+                if response['ok']:
+                    _print_result(response['result'])
+                else:
+                    print('%-24s %s' % (name, response['error']))
+                    failed = True
+            return 1 if failed else 0
+        response = request({'cmd': args.command}, args.address)
+    except (OSError, EOFError, AuthenticationError) as error:
+        print('no build server at %s (%s)' % (args.address or default_address(), error))
+        return 2
+    if args.command == 'status':
+        print(json.dumps(response['status'], indent=2, default=str))
+    return 0 if response['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""Headless batch build of the box modules.
+
+Runs without FreeCAD.Gui, so it works from FreeCADCmd or from a plain
+Python interpreter that can import the FreeCAD library:
+
+    FREECAD_LIB=/usr/lib/freecad/lib python3 buildKit.py --out build
+    python3 buildKit.py ledHousing fingerHole --formats stl,step
+    python3 buildKit.py --formats 3mf,ply      # indexed meshes (meshExport.py)
+    python3 buildKit.py --variants variants.json --jobs 8
+    python3 buildKit.py --cache ~/.cache/box-kit --cache-size 256
+    python3 buildKit.py --trace traces   # Chrome trace of every build (buildTrace.py)
+    python3 buildKit.py --kit-set led_wall=2.4   # rebuild what a kit parameter reaches (kitParams.py)
+
+A variants file is a JSON list of builds:
+
+    [{"module": "ledHousing", "name": "tilt14", "params": {"tilt_angle_deg": 14.0}}]
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+import booleanOps
+import buildTrace
+from geometryCache import GeometryCache
+
+# Make the FreeCAD library importable in this process and in pool workers
+if os.environ.get('FREECAD_LIB') and os.environ['FREECAD_LIB'] not in sys.path:
+    sys.path.append(os.environ['FREECAD_LIB'])
+
+MODULES = (
+    'fingerHole',
+    'ledHousing',
+    'photodiodeHousing',
+    'humiditySensorMountSlot',
+    'opticalFilterMountSlot',
+)
+
+FORMATS = ('stl', 'step', '3mf', 'ply', 'obj')
+
+
+def load_module(name):
+    if name not in MODULES:
+        raise ValueError('unknown module %r, expected one of %s' % (name, ', '.join(MODULES)))
+    return importlib.import_module(name)
+
+
+def check_params(module, params):
+    unknown = sorted(set(params) - set(module.PARAMS))
+    if unknown:
+        raise ValueError('%s has no parameter(s) %s' % (module.__name__, ', '.join(unknown)))
+
+
+def parse_overrides(items):
+    """{name: value} from NAME=VALUE strings; values are JSON where they parse."""
+    overrides = {}
+    for item in items:
+        name, _, text = item.partition('=')
+        try:
+            overrides[name] = json.loads(text)
+        except ValueError:
+            overrides[name] = text
+    return overrides
+
+
+def make_jobs(modules, variants=None):
+    """Expand module names and variant entries into build job dicts."""
+    jobs = []
+    for name in modules:
+        jobs.append({'module': name, 'name': load_module(name).MODULE_NAME, 'params': {}})
+    for variant in variants or ():
+        module = load_module(variant['module'])
+        params = variant.get('params', {})
+        check_params(module, params)
+        jobs.append({
+            'module': variant['module'],
+            'name': variant.get('name', module.MODULE_NAME),
+            'params': params,
+        })
+    return jobs
+
+
+def export_shape(shape, path_stem, formats, tracer=None):
+    paths = []
+    for fmt in formats:
+        path = '%s.%s' % (path_stem, fmt)
+        with buildTrace.optional_span(tracer, 'export ' + fmt, 'export'):
+            if fmt == 'stl':
+                shape.exportStl(path)
+            elif fmt == 'step':
+                shape.exportStep(path)
+            else:
+                # Indexed meshes, welded, at meshExport's default deflection
+                import meshExport  # NumPy, only needed for these formats
+                path = meshExport.export_shape(shape, path_stem, fmt)
+        paths.append(path)
+    return paths
+
+
+def build_job(job, out_dir, formats, cut_mode='batched', cache_dir=None,
+              cache_bytes=512 * 1024 * 1024, trace_dir=None):
+    """Build one job and write its outputs; runs inside a pool worker."""
+    module = load_module(job['module'])
+    stem = os.path.join(out_dir, job['name'])
+    start = time.perf_counter()
+    cached = None
+    tracer = buildTrace.BuildTracer() if trace_dir is not None else None
+
+    with buildTrace.traced_job(module, tracer, job['name']):
+        if cache_dir is None:
+            shape = module.build(job['params'], cut_mode)
+            build_seconds = time.perf_counter() - start
+            paths = export_shape(shape, stem, formats, tracer)
+        else:
+            cache = GeometryCache(cache_dir, cache_bytes)
+            key = cache.key(module, job['params'])
+            if list(formats) == ['stl']:
+                # STL only: a hit is a plain file copy, no kernel work at all
+                with buildTrace.optional_span(tracer, 'cache get_stl', 'cache'):
+                    cached = cache.get_stl(key, stem + '.stl') is not None
+                if not cached:
+                    shape = module.build(job['params'], cut_mode)
+                    with buildTrace.optional_span(tracer, 'cache put', 'cache'):
+                        # One miss for this key: the STL comes from the put, not a second lookup
+                        cache.put(key, shape, stl_dest=stem + '.stl')
+                build_seconds = time.perf_counter() - start
+                paths = [stem + '.stl']
+            else:
+                with buildTrace.optional_span(tracer, 'cache get_shape', 'cache'):
+                    shape = cache.get_shape(key)
+                cached = shape is not None
+                if not cached:
+                    shape = module.build(job['params'], cut_mode)
+                    with buildTrace.optional_span(tracer, 'cache put', 'cache'):
+                        cache.put(key, shape)
+                build_seconds = time.perf_counter() - start
+                paths = export_shape(shape, stem, formats, tracer)
+
+    trace = None
+    if tracer is not None:
+        os.makedirs(trace_dir, exist_ok=True)
+        trace = os.path.join(trace_dir, job['name'] + '.trace.json')
+        tracer.write(trace)
+
+    return {
+        'module': job['module'],
+        'name': job['name'],
+        'params': job['params'],
+        'cached': cached,
+        'build_seconds': build_seconds,
+        'total_seconds': time.perf_counter() - start,
+        'files': paths,
+        'trace': trace,
+    }
+
+
+def run_jobs(jobs, out_dir, formats=('stl',), workers=None, cut_mode='batched', cache_dir=None,
+             cache_bytes=512 * 1024 * 1024, trace_dir=None):
+    os.makedirs(out_dir, exist_ok=True)
+    options = (formats, cut_mode, cache_dir, cache_bytes, trace_dir)
+    if workers == 1 or len(jobs) == 1:
+        return [build_job(job, out_dir, *options) for job in jobs]
+    from concurrent.futures import ProcessPoolExecutor  # slow to import, skip it for one job
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(build_job, job, out_dir, *options) for job in jobs]
+        return [future.result() for future in futures]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the box modules headlessly.')
+    parser.add_argument('modules', nargs='*',
+                        help='modules to build (default: all five unless --variants is given)')
+    parser.add_argument('--variants', help='JSON file with a list of parameter variants')
+    parser.add_argument('--out', default='build', help='output directory (default: build)')
+    parser.add_argument('--formats', default='stl',
+                        help='comma separated export formats: %s' % ', '.join(FORMATS))
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--cut-mode', default='batched', choices=booleanOps.CUT_MODES,
+                        help='apply cuts one by one or as a single boolean (default: batched)')
+    parser.add_argument('--cache', help='geometry cache directory (default: no cache)')
+    parser.add_argument('--cache-size', type=float, default=512,
+                        help='cache size limit in MB before LRU eviction (default: 512)')
+    parser.add_argument('--trace', help='write a Chrome trace of every build into this directory')
+    parser.add_argument('--kit-set', nargs='+', metavar='NAME=VALUE',
+                        help='change shared kit parameters and build the modules they affect (kitParams.py)')
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip().lower() for fmt in args.formats.split(',') if fmt.strip()]
+    for fmt in formats:
+        if fmt not in FORMATS:
+            parser.error('unsupported format %r' % fmt)
+
+    variants = None
+    if args.variants:
+        with open(args.variants) as f:
+            variants = json.load(f)
+    modules = args.modules or ([] if variants else list(MODULES))
+
+    if args.kit_set and args.variants:
+        parser.error('--kit-set builds the kit parameter model, it cannot be combined with --variants')
+    try:
+        if args.kit_set:
+            import kitParams  # imports this module
+
+            jobs = kitParams.kit_jobs(parse_overrides(args.kit_set), args.modules)
+        else:
+            jobs = make_jobs(modules, variants)
+    except ValueError as error:
+        parser.error(str(error))
+    start = time.perf_counter()
+    results = run_jobs(jobs, args.out, formats, args.jobs, args.cut_mode, args.cache,
+                       int(args.cache_size * 1024 * 1024), args.trace)
+    for result in results:
+        status = {None: '', True: '  (cached)', False: '  (cache miss)'}[result['cached']]
+        print('%-32s %7.2f s  %s%s' % (result['name'], result['build_seconds'],
+                                        ', '.join(result['files']), status))
+    print('built %d part(s) in %.2f s' % (len(results), time.perf_counter() - start))
+    if args.cache:
+        hits = sum(1 for result in results if result['cached'])
+        print('cache: %d hit(s), %d miss(es)' % (hits, len(results) - hits))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""Per-step timing, memory and shape complexity of module builds.
+
+instrument(module, tracer) wraps a builder's build_base, every CUT_STEPS
+entry and booleanOps.apply_cuts for the duration of a with block, so the
+unchanged build() (and buildKit, stepGraph, ...) is traced step by step.
+Every span records wall time, the peak of Python allocations inside it
+(tracemalloc; the kernel's own C++ memory is not seen there), the process
+RSS high-water mark, and the face / edge / solid counts of the shape it
+produced.
+
+Traces are written in the Chrome trace event format, which
+chrome://tracing, Perfetto and speedscope open as timelines and flame
+graphs; --folded also writes folded stacks for flamegraph.pl.
+
+    python3 buildTrace.py                              # all modules into ./traces
+    python3 buildTrace.py fingerHole --cut-mode sequential --tessellate 0.1 0.01
+    python3 buildKit.py --trace traces                 # one trace per built part
+
+Batched builds subtract all tools in one boolean, which shows as a
+single cut span; --cut-mode sequential splits it per step.
+"""
+import argparse
+import contextlib
+import json
+import os
+import time
+import tracemalloc
+
+import booleanOps
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+
+def shape_counts(shape):
+    """Face, edge and solid counts of a Part shape (empty if it has none)."""
+    counts = {}
+    for name in ('Faces', 'Edges', 'Solids'):
+        items = getattr(shape, name, None)
+        if items is not None:
+            counts[name.lower()] = len(items)
+    return counts
+
+
+def _rss_max_kb():
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class _Frame:
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = dict(args)
+        self.start = time.perf_counter()
+        self.peak = 0
+
+
+class BuildTracer:
+    """Collects nested spans as Chrome trace 'complete' events."""
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.events = []
+        self._stack = []
+        self._origin = time.perf_counter()
+        self._started_tracemalloc = False
+
+    @contextlib.contextmanager
+    def span(self, name, category='build', **args):
+        """Time a block; yields the frame, whose args land in the trace."""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        if self.memory and self._stack:
+            # The child resets the peak; keep what the parent reached so far
+            parent = self._stack[-1]
+            parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+        if self.memory:
+            tracemalloc.reset_peak()
+        frame = _Frame(name, category, args)
+        self._stack.append(frame)
+        try:
+            yield frame
+        finally:
+            end = time.perf_counter()
+            self._stack.pop()
+            if self.memory:
+                frame.peak = max(frame.peak, tracemalloc.get_traced_memory()[1])
+                frame.args['py_peak_kb'] = round(frame.peak / 1024.0, 1)
+                if self._stack:
+                    self._stack[-1].peak = max(self._stack[-1].peak, frame.peak)
+            rss = _rss_max_kb()
+            if rss is not None:
+                frame.args['rss_max_kb'] = rss
+            self.events.append({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': (frame.start - self._origin) * 1e6,
+                'dur': (end - frame.start) * 1e6,
+                'pid': os.getpid(),
+                'tid': 0,
+                'args': frame.args,
+            })
+            if self.memory and not self._stack and self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def chrome_trace(self):
+        events = sorted(self.events, key=lambda event: (event['ts'], -event['dur']))
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f, indent=1)
+
+    def nested(self):
+        """(stack of names, event, self time in us) per span in start order."""
+        rows = []
+        stack = []      # (row index, end) of the open spans
+        for event in sorted(self.events, key=lambda event: (event['ts'], -event['dur'])):
+            end = event['ts'] + event['dur']
+            while stack and stack[-1][1] < end:
+                stack.pop()
+            names = (rows[stack[-1][0]][0] if stack else ()) + (event['name'],)
+            if stack:
+                rows[stack[-1][0]][2] -= event['dur']
+            stack.append((len(rows), end))
+            rows.append([names, event, event['dur']])
+        return [(names, event, max(self_us, 0.0)) for names, event, self_us in rows]
+
+    def folded(self):
+        """Folded stacks ('outer;inner self-time-in-us' lines) for flamegraph.pl."""
+        return ['%s %d' % (';'.join(names), self_us) for names, _event, self_us in self.nested()]
+
+    def write_folded(self, path):
+        with open(path, 'w') as f:
+            f.write('\n'.join(self.folded()) + '\n')
+
+
+# ---------------------------------------
+# Builder instrumentation
+# ---------------------------------------
+def _traced_step(tracer, label, step):
+    def run(p):
+        with tracer.span('tools: ' + label, 'tools') as frame:
+            tools = step(p)
+            frame.args['tools'] = len(booleanOps.flatten_tools([(label, tools)]))
+        return tools
+    return run
+
+
+@contextlib.contextmanager
+def instrument(module, tracer):
+    """Trace module.build_base, each cut step and the cuts while the block runs."""
+    build_base = module.build_base
+    cut_steps = module.CUT_STEPS
+    apply_cuts = booleanOps.apply_cuts
+
+    def traced_base(p):
+        with tracer.span('build_base', 'base') as frame:
+            shape = build_base(p)
+            frame.args.update(shape_counts(shape))
+        return shape
+
+    def traced_cuts(base, steps, mode='batched'):
+        if mode != 'sequential':
+            with tracer.span('cut (%s)' % mode, 'boolean', tools=len(booleanOps.flatten_tools(steps))) as frame:
+                shape = apply_cuts(base, steps, mode)
+                frame.args.update(shape_counts(shape))
+            return shape
+        shape = base
+        for label, tools in steps:
+            with tracer.span('cut: ' + label, 'boolean') as frame:
+                shape = apply_cuts(shape, [(label, tools)], mode)
+                frame.args.update(shape_counts(shape))
+        return shape
+
+    module.build_base = traced_base
+    module.CUT_STEPS = tuple((label, _traced_step(tracer, label, step)) for label, step in cut_steps)
+    booleanOps.apply_cuts = traced_cuts
+    try:
+        yield tracer
+    finally:
+        module.build_base = build_base
+        module.CUT_STEPS = cut_steps
+        booleanOps.apply_cuts = apply_cuts
+
+
+@contextlib.contextmanager
+def traced_job(module, tracer, name):
+    """One span around a buildKit job with the module instrumented; no-op without a tracer."""
+    if tracer is None:
+        yield
+        return
+    with tracer.span('job ' + name, 'job'), instrument(module, tracer):
+        yield
+
+
+def optional_span(tracer, name, category='build'):
+    return contextlib.nullcontext() if tracer is None else tracer.span(name, category)
+
+
+def traced_build(module, params=None, cut_mode='batched', tessellate=(), tracer=None):
+    """Build a module under a new (or the given) tracer; returns (shape, tracer).
+
+    tessellate lists tolerances to triangulate the result at, each in its
+    own span, on a fresh copy so no cached triangulation is reused.
+    """
+    tracer = tracer or BuildTracer()
+    with tracer.span('build ' + module.__name__, 'module', cut_mode=cut_mode):
+        with instrument(module, tracer):
+            shape = module.build(params, cut_mode)
+        for tolerance in tessellate:
+            fresh = shape.copy()
+            with tracer.span('tessellate %g' % tolerance, 'tessellate') as frame:
+                _points, facets = fresh.tessellate(tolerance)
+                frame.args['triangles'] = len(facets)
+    return shape, tracer
+
+
+def summary_rows(tracer):
+    """(depth, name, milliseconds, args) per span in start order."""
+    return [(len(names) - 1, event['name'], event['dur'] / 1000.0, event['args'])
+            for names, event, _self_us in tracer.nested()]
+
+
+def main(argv=None):
+    import buildKit
+
+    parser = argparse.ArgumentParser(description='Trace module builds step by step.')
+    parser.add_argument('modules', nargs='*', help='modules to trace (default: all)')
+    parser.add_argument('--cut-mode', default='batched', choices=booleanOps.CUT_MODES,
+                        help='sequential gives one cut span per step (default: batched)')
+    parser.add_argument('--tessellate', type=float, nargs='*', default=[0.1],
+                        help='tessellation tolerances to trace in mm (default: 0.1)')
+    parser.add_argument('--out', default='traces', help='directory for the trace files (default: traces)')
+    parser.add_argument('--folded', action='store_true', help='also write folded stacks for flamegraph.pl')
+    parser.add_argument('--no-memory', action='store_true', help='skip tracemalloc (lower overhead)')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.out, exist_ok=True)
+    for name in args.modules or buildKit.MODULES:
+        module = buildKit.load_module(name)
+        _shape, tracer = traced_build(module, cut_mode=args.cut_mode, tessellate=args.tessellate,
+                                      tracer=BuildTracer(memory=not args.no_memory))
+        path = os.path.join(args.out, module.MODULE_NAME + '.trace.json')
+        tracer.write(path)
+        if args.folded:
+            tracer.write_folded(os.path.join(args.out, module.MODULE_NAME + '.folded'))
+        for depth, label, ms, span_args in summary_rows(tracer):
+            details = '  '.join('%s %s' % (key, value) for key, value in sorted(span_args.items())
+                                if key in ('faces', 'edges', 'solids', 'tools', 'triangles', 'py_peak_kb'))
+            print('%-48s %9.2f ms  %s' % ('  ' * depth + label, ms, details))
+        print('trace: %s' % path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,419 @@
+"""Parameter sweeps with closed-form pre-screening before any CAD build.
+
+A sweep file maps module parameters to the values to explore:
+
+    {
+      "ledHousing": {
+        "tilt_angle_deg": {"min": 8, "max": 16, "steps": 9},
+        "led_distance": [7.0, 8.0, 9.0],
+        "target_point": {"values": [[0, 0, 34.0], [0, 0, 36.5]]}
+      },
+      "fingerHole": {"finger_radius": {"min": 9, "max": 11, "steps": 5}}
+    }
+
+A list gives the values themselves; a {"min", "max", "steps"} range is
+spaced evenly. Every combination is a candidate (or --samples draws
+random ones). ledHousing's led_count takes a list of whole LED counts,
+and candidates are screened per count; led_rings cannot be swept. All
+candidates are screened at once against the CONSTRAINTS, closed-form
+checks on NumPy arrays that cost microseconds where a build costs
+seconds; only the survivors are built, through the parallel (and
+optionally cached) buildKit pipeline. Parts shared by several survivors
+are built once.
+
+    python3 designSweep.py sweep.json --screen-only --table screen.csv
+    python3 designSweep.py sweep.json --out sweep --jobs 8 --cache ~/.cache/box-kit
+    python3 designSweep.py sweep.json --preview 0.5 --table preview.csv
+
+--preview samples the survivors through the signed distance backend
+(sdfPreview.py) instead of building them: no files, but a part volume
+in a fraction of a second, without the CAD kernel.
+
+The table has one row per candidate: its swept parameters, the margin of
+every constraint in mm (negative: violated), and for built or previewed
+candidates the time, the material volume of its parts and the files.
+"""
+import argparse
+import csv
+import itertools
+import json
+import sys
+import time
+
+import numpy as np
+
+import buildKit
+import meshProperties
+from ledGeometry import led_layout, min_clearance, per_led, pin_layout
+
+# Thinnest wall the checks accept, in mm (two 0.4 mm perimeters)
+MIN_WALL = 0.8
+
+
+def load_sweep(path):
+    with open(path) as f:
+        spec = json.load(f)
+    for name, params in spec.items():
+        buildKit.check_params(buildKit.load_module(name), params)
+    led = spec.get('ledHousing', {})
+    if 'led_rings' in led:
+        raise ValueError('ledHousing.led_rings cannot be swept; sweep led_count, or run one sweep per ring layout')
+    if 'led_count' in led:
+        values = led['led_count']
+        if isinstance(values, dict) and 'values' not in values:
+            raise ValueError('ledHousing.led_count must be swept over a list of LED counts, e.g. [4, 6, 8], not a range')
+        if any(float(value) != int(value) or value < 1 for value in axis_values(values)):
+            raise ValueError('ledHousing.led_count must be swept over whole LED counts, got %r' % (values,))
+    return spec
+
+
+def axis_values(values):
+    """Values of one swept parameter from a list, {"values": [...]} or {"min", "max", "steps"}."""
+    if isinstance(values, dict):
+        if 'values' in values:
+            return list(values['values'])
+        return np.linspace(values['min'], values['max'], values.get('steps', 2)).tolist()
+    return list(values)
+
+
+def _axes(spec):
+    return [(module, name, axis_values(values))
+            for module, params in sorted(spec.items()) for name, values in sorted(params.items())]
+
+
+def grid_candidates(spec):
+    """Every combination of the swept values, as {module: {param: array}} columns."""
+    axes = _axes(spec)
+    shape = [len(values) for _module, _name, values in axes]
+    index = np.indices(shape).reshape(len(axes), -1)
+    columns = {}
+    for (module, name, values), picks in zip(axes, index):
+        columns.setdefault(module, {})[name] = np.asarray(values, dtype=np.float64)[picks]
+    return columns, int(np.prod(shape))
+
+
+def random_candidates(spec, count, seed=0):
+    """count random candidates: ranges drawn uniformly, lists picked from."""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for module, params in sorted(spec.items()):
+        for name, values in sorted(params.items()):
+            if isinstance(values, dict) and 'values' not in values:
+                column = rng.uniform(values['min'], values['max'], count)
+            else:
+                values = np.asarray(axis_values(values), dtype=np.float64)
+                column = values[rng.integers(len(values), size=count)]
+            columns.setdefault(module, {})[name] = column
+    return columns, count
+
+
+def full_params(columns):
+    """Module PARAMS with the swept columns laid over them (scalars broadcast)."""
+    return {name: dict(buildKit.load_module(name).PARAMS, **columns.get(name, {}))
+            for name in ('ledHousing', 'fingerHole')}
+
+
+def candidate_params(columns, i):
+    """Parameter overrides of candidate i as plain Python values."""
+    return {module: {name: column[i].tolist() for name, column in params.items()}
+            for module, params in columns.items()}
+
+
+# ---------------------------------------
+# Closed-form constraints, all candidates at once
+#
+# Each returns the margin in mm per candidate, >= 0 when satisfied.
+# ---------------------------------------
+def _section_extent(beams, radius):
+    """Half extents (x, y) of a cylinder of this axis and radius cut by a horizontal plane."""
+    w_z = np.abs(beams[..., 2])
+    return radius * np.sqrt(w_z[..., None] ** 2 + beams[..., :2] ** 2) / w_z[..., None]
+
+
+def _disk_extent(beams, radius):
+    """Half extents (x, y, z) of a disk of this normal and radius."""
+    return radius * np.sqrt(np.maximum(1 - beams ** 2, 0.0))
+
+
+def _bore_exit(led, centers, beams):
+    """Bore axis length from the LED to the platform top, and the exit point."""
+    length = (led['box_height'][..., None] - centers[..., 2]) / beams[..., 2]
+    return length, centers + length[..., None] * beams
+
+
+def _led_params(p):
+    # led_rings is a list of ring dicts, not a number
+    return {name: value if name == 'led_rings' else np.asarray(value, dtype=np.float64)
+            for name, value in p['ledHousing'].items()}
+
+
+def _led(p):
+    led = _led_params(p)
+    centers, beams = led_layout(led)
+    return led, centers, beams
+
+
+def led_bore_floor(p):
+    """The bore bottom stays a wall above the housing bottom."""
+    led, centers, beams = _led(p)
+    lowest = centers[..., 2] - _disk_extent(beams, per_led(led, 'led_radius')[..., None])[..., 2]
+    return lowest.min(axis=-1) - MIN_WALL
+
+
+def led_bore_open(p):
+    """The bore reaches the platform top, so the LED can shine out."""
+    led, centers, beams = _led(p)
+    length, _exits = _bore_exit(led, centers, beams)
+    length = np.where(beams[..., 2] > 0, length, np.inf)
+    return (per_led(led, 'led_depth') - length).min(axis=-1)
+
+
+def led_bore_in_platform(p):
+    """The bore, from the LED to its exit ellipse, stays inside the platform footprint."""
+    led, centers, beams = _led(p)
+    radius = per_led(led, 'led_radius')[..., None]
+    _length, exits = _bore_exit(led, centers, beams)
+    inset = 2 * led['platform_inset']
+    half = np.stack(np.broadcast_arrays(led['box_width'] - inset, led['box_length'] - inset), axis=-1)[..., None, :] / 2
+    reach = np.maximum(np.abs(centers[..., :2]) + _disk_extent(beams, radius)[..., :2],
+                       np.abs(exits[..., :2]) + _section_extent(beams, radius))
+    return (half - reach).min(axis=(-2, -1)) - MIN_WALL
+
+
+def led_pin_exit(p):
+    """Pin holes leave the housing bottom cleanly or stop a wall short of it.
+
+    A hole ending just at the bottom face leaves a paper-thin skin or a
+    ragged half-open slot; one running through opens fully for the legs.
+    """
+    led = _led_params(p)
+    starts, directions = pin_layout(led)
+    ends = starts + per_led(led, 'pin_depth_actual')[..., None, None] * directions[..., None, :]
+    rim = _disk_extent(directions, per_led(led, 'pin_radius')[..., None])[..., 2:]
+    through = -(ends[..., 2] + rim)
+    short = ends[..., 2] - rim - MIN_WALL
+    return np.maximum(through, short).min(axis=(-2, -1))
+
+
+def led_hole_spacing(p):
+    """Bores and pin holes of different LEDs leave a wall between them (ledGeometry.clearances)."""
+    return min_clearance(_led_params(p)) - MIN_WALL
+
+
+def led_beam_window(p):
+    """Each bore looks through the fingerHole LED window without clipping.
+
+    In the assembly (kitAssembly.placements) the window spans from the
+    LED platform top to led_window_height below it; turning fingerHole
+    by 90 degrees and flipping the LED housing map the window's length
+    onto the LED x axis and its width onto y.
+    """
+    led, centers, beams = _led(p)
+    finger = p['fingerHole']
+    radius = per_led(led, 'led_radius')[..., None]
+    half = np.stack(np.broadcast_arrays(finger['led_window_length'], finger['led_window_width']), axis=-1)
+    margins = []
+    for depth in (0.0, finger['led_window_height']):
+        plane = led['box_height'] + np.asarray(depth)
+        length = (plane[..., None] - centers[..., 2]) / beams[..., 2]
+        points = centers + length[..., None] * beams
+        reach = np.abs(points[..., :2]) + _section_extent(beams, radius)
+        margins.append((half[..., None, :] / 2 - reach).min(axis=(-2, -1)))
+    return np.minimum(*margins)
+
+
+def finger_filter_wall(p):
+    """Wall between the filter pocket and the finger hole (4 mm band, pocket 1 mm up)."""
+    finger = p['fingerHole']
+    return 3.0 - np.asarray(finger['filter_height']) - MIN_WALL
+
+
+def finger_top_wall(p):
+    """The finger hole stays below the top of the middle block."""
+    finger = p['fingerHole']
+    top = finger['bottom_height'] + 4 + np.asarray(finger['finger_radius']) * 2
+    return finger['bottom_height'] + np.asarray(finger['middle_height']) - top - MIN_WALL
+
+
+def finger_window_open(p):
+    """The LED window cuts down into the finger hole, so light reaches the finger."""
+    finger = p['fingerHole']
+    top = finger['bottom_height'] + 4 + np.asarray(finger['finger_radius']) * 2
+    window_bottom = finger['bottom_height'] + np.asarray(finger['middle_height']) - finger['led_window_height']
+    return top - window_bottom
+
+
+def finger_side_wall(p):
+    """The humidity sensor pocket stays inside the middle block."""
+    finger = p['fingerHole']
+    outer = np.asarray(finger['finger_radius']) + 1 + finger['side_pocket_width']
+    return np.asarray(finger['middle_width']) / 2 - outer - MIN_WALL
+
+
+CONSTRAINTS = (
+    ('led_bore_floor', led_bore_floor),
+    ('led_bore_open', led_bore_open),
+    ('led_bore_in_platform', led_bore_in_platform),
+    ('led_pin_exit', led_pin_exit),
+    ('led_hole_spacing', led_hole_spacing),
+    ('led_beam_window', led_beam_window),
+    ('finger_filter_wall', finger_filter_wall),
+    ('finger_top_wall', finger_top_wall),
+    ('finger_window_open', finger_window_open),
+    ('finger_side_wall', finger_side_wall),
+)
+
+
+def screen(columns, count):
+    """Margins {constraint: (count,) array} and the mask of feasible candidates."""
+    led_counts = columns.get('ledHousing', {}).get('led_count')
+    if led_counts is not None:
+        return _screen_by_led_count(columns, count, led_counts)
+    return _screen(columns, count)
+
+
+def _screen(columns, count):
+    p = full_params(columns)
+    margins = {name: np.broadcast_to(check(p), count) for name, check in CONSTRAINTS}
+    feasible = np.logical_and.reduce([margin >= 0 for margin in margins.values()])
+    return margins, feasible
+
+
+def _screen_by_led_count(columns, count, led_counts):
+    # The LED count sets the array shapes of the LED checks, so every
+    # count is screened on its own, with led_count as a plain number
+    margins = {name: np.empty(count) for name, _check in CONSTRAINTS}
+    feasible = np.empty(count, dtype=bool)
+    for value in np.unique(led_counts):
+        picks = np.flatnonzero(led_counts == value)
+        group = {module: {name: column[picks] for name, column in params.items()}
+                 for module, params in columns.items()}
+        group['ledHousing']['led_count'] = int(value)
+        group_margins, group_feasible = _screen(group, len(picks))
+        for name, margin in group_margins.items():
+            margins[name][picks] = margin
+        feasible[picks] = group_feasible
+    return margins, feasible
+
+
+# ---------------------------------------
+# Build the survivors
+# ---------------------------------------
+def survivor_jobs(columns, survivors):
+    """buildKit jobs for the swept modules of each survivor, shared parts built once.
+
+    Returns (jobs, {candidate: [job names]}).
+    """
+    jobs = {}
+    parts = {}
+    for i in survivors:
+        parts[i] = []
+        for module, params in sorted(candidate_params(columns, i).items()):
+            key = (module, json.dumps(params, sort_keys=True))
+            if key not in jobs:
+                name = '%s_%05d' % (buildKit.load_module(module).MODULE_NAME, len(jobs))
+                jobs[key] = {'module': module, 'name': name, 'params': params}
+            parts[i].append(jobs[key]['name'])
+    return list(jobs.values()), parts
+
+
+def preview_jobs(jobs, resolution):
+    """Volume of each job through sdfPreview, as buildKit-like results."""
+    import sdfPreview
+
+    results = []
+    for job in jobs:
+        preview = sdfPreview.preview(buildKit.load_module(job['module']), job['params'], resolution, mesh=False)
+        results.append({'name': job['name'], 'build_seconds': preview['seconds'], 'files': [],
+                        'volume': preview['volume']})
+    return results
+
+
+def write_table(path, columns, count, margins, feasible, parts=None, results=None):
+    swept = [(module, name) for module, params in sorted(columns.items()) for name in sorted(params)]
+    built = {result['name']: result for result in results or ()}
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['candidate'] + ['%s.%s' % key for key in swept] + list(margins)
+                        + ['feasible', 'build_seconds', 'volume_mm3', 'files'])
+        for i in range(count):
+            names = (parts or {}).get(i, [])
+            row_results = [built[name] for name in names if name in built]
+            writer.writerow(
+                [i] + [json.dumps(columns[module][name][i].tolist()) for module, name in swept]
+                + ['%.4f' % margin[i] for margin in margins.values()]
+                + [int(feasible[i]),
+                   '%.3f' % sum(result['build_seconds'] for result in row_results) if row_results else '',
+                   '%.1f' % sum(result['volume'] for result in row_results)
+                   if row_results and all('volume' in result for result in row_results) else '',
+                   ' '.join(itertools.chain.from_iterable(result['files'] for result in row_results))])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Screen a parameter sweep and build the feasible designs.')
+    parser.add_argument('sweep', help='JSON file of {module: {parameter: values}}')
+    parser.add_argument('--samples', type=int, help='draw this many random candidates instead of the full grid')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--screen-only', action='store_true', help='only screen, build nothing')
+    parser.add_argument('--limit', type=int, help='build at most this many survivors, widest margins first')
+    parser.add_argument('--out', default='sweep', help='output directory for builds (default: sweep)')
+    parser.add_argument('--table', help='CSV results table (default: <out>/sweep.csv, or none with --screen-only)')
+    parser.add_argument('--formats', default='stl', help='comma separated export formats (default: stl)')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--cache', help='geometry cache directory (default: no cache)')
+    parser.add_argument('--cache-size', type=float, default=512,
+                        help='cache size limit in MB before LRU eviction (default: 512)')
+    parser.add_argument('--preview', type=float, metavar='RESOLUTION',
+                        help='estimate survivor volumes on an SDF grid of this spacing in mm instead of building')
+    args = parser.parse_args(argv)
+
+    try:
+        spec = load_sweep(args.sweep)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.samples:
+        columns, count = random_candidates(spec, args.samples, args.seed)
+    else:
+        columns, count = grid_candidates(spec)
+
+    start = time.perf_counter()
+    margins, feasible = screen(columns, count)
+    survivors = np.flatnonzero(feasible)
+    print('screened %d candidate(s) in %.3f s: %d feasible' % (count, time.perf_counter() - start, len(survivors)))
+    for name, margin in margins.items():
+        failing = int((margin < 0).sum())
+        if failing:
+            print('  %-22s rejects %d' % (name, failing))
+
+    parts = results = None
+    if not args.screen_only and len(survivors):
+        if args.limit is not None:
+            # Smallest margin over all constraints: widest first
+            slack = np.min([margin[survivors] for margin in margins.values()], axis=0)
+            survivors = survivors[np.argsort(-slack, kind='stable')[:args.limit]]
+        jobs, parts = survivor_jobs(columns, survivors)
+        start = time.perf_counter()
+        if args.preview:
+            results = preview_jobs(jobs, args.preview)
+            verb = 'previewed'
+        else:
+            formats = [fmt.strip().lower() for fmt in args.formats.split(',') if fmt.strip()]
+            results = buildKit.run_jobs(jobs, args.out, formats, args.jobs, cache_dir=args.cache,
+                                        cache_bytes=int(args.cache_size * 1024 * 1024))
+            for result in results:
+                stl = [path for path in result['files'] if path.endswith('.stl')]
+                if stl:
+                    result['volume'] = meshProperties.file_properties(stl[0])['volume']
+            verb = 'built'
+        print('%s %d part(s) for %d design(s) in %.2f s' % (verb, len(results), len(survivors),
+                                                           time.perf_counter() - start))
+
+    table = args.table or (None if args.screen_only or args.preview else '%s/sweep.csv' % args.out)
+    if table:
+        write_table(table, columns, count, margins, feasible, parts, results)
+        print('table: %s' % table)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,185 +1,260 @@
-import FreeCAD, Part
+from kernelLoader import FreeCAD, Part
 
-FreeCAD.newDocument('fingerHoleModule')
-FreeCAD.Gui.runCommand('Std_DrawStyle', 6)
+import booleanOps
 
-# ========================================================
-# STEP 1: Dimensions
-# ========================================================
-# Bottom tab (for photodiode module clip)
-bottom_width = 46.0-0.2
-bottom_length = 30.0-0.2
-bottom_height = 12.5
-
-# Middle block (main body)
-middle_width = 50.0
-middle_length = 34.0
-middle_height = 25.0
-
-# Top tab (for LED module clip)
-top_width = 46.0-0.2
-top_length = 30.0-0.2
-top_height = 10.0
+MODULE_NAME = 'fingerHoleModule'
+BUILDER_VERSION = 1  # bump to invalidate cached geometry (see geometryCache.py)
 
 # ========================================================
-# STEP 2: Create Block Geometry (Bottom + Middle + Top)
+# STEP 1: Dimensions
 # ========================================================
-bottom_block = Part.makeBox(bottom_width, bottom_length, bottom_height,
-                            FreeCAD.Vector(-bottom_width / 2, -bottom_length / 2, 0))
-
-middle_block = Part.makeBox(middle_width, middle_length, middle_height,
-                            FreeCAD.Vector(-middle_width / 2, -middle_length / 2, bottom_height))
-
-top_block = Part.makeBox(top_width, top_length, top_height,
-                         FreeCAD.Vector(-top_width / 2, -top_length / 2, bottom_height + middle_height))
+PARAMS = {
+    # Bottom tab (for photodiode module clip)
+    'bottom_width': 46.0 - 0.2,
+    'bottom_length': 30.0 - 0.2,
+    'bottom_height': 12.5,
+
+    # Middle block (main body)
+    'middle_width': 50.0,
+    'middle_length': 34.0,
+    'middle_height': 25.0,
+
+    # Top tab (for LED module clip)
+    'top_width': 46.0 - 0.2,
+    'top_length': 30.0 - 0.2,
+    'top_height': 10.0,
+    'top_wall': 1.9,            # Tab ring wall around the top pocket, fills the LED groove
+
+    # Bottom pocket (photodiode clip slot)
+    'bottom_cut_width': 30.0,
+    'bottom_cut_depth': 20.0,
+
+    # Photodiode light hole
+    'light_radius': 4.0,
+    'light_depth': 5.0,  # cut through small gap below finger hole
+
+    # Filter pocket (below finger hole)
+    'filter_width': 18.0,
+    'filter_depth': 30.0,
+    'filter_height': 2.0,
+
+    # Finger hole
+    'finger_radius': 10.0,
+
+    # Humidity sensor pocket and window
+    'side_pocket_width': 10.0,
+    'side_pocket_height': 18.0,
+    'side_pocket_depth': 27.0,
+    'sensor_size': 7.0,
+
+    # LED light window
+    'led_window_width': 18.5,
+    'led_window_length': 18.5,
+    'led_window_height': 5.0,  # vertical height
+}
+
+
+def build_base(p):
+    bottom_width = p['bottom_width']
+    bottom_length = p['bottom_length']
+    bottom_height = p['bottom_height']
+    middle_width = p['middle_width']
+    middle_length = p['middle_length']
+    middle_height = p['middle_height']
+    top_width = p['top_width']
+    top_length = p['top_length']
+    top_height = p['top_height']
+
+    # ========================================================
+    # STEP 2: Create Block Geometry (Bottom + Middle + Top)
+    # ========================================================
+    bottom_block = Part.makeBox(bottom_width, bottom_length, bottom_height,
+                                FreeCAD.Vector(-bottom_width / 2, -bottom_length / 2, 0))
+
+    middle_block = Part.makeBox(middle_width, middle_length, middle_height,
+                                FreeCAD.Vector(-middle_width / 2, -middle_length / 2, bottom_height))
+
+    top_block = Part.makeBox(top_width, top_length, top_height,
+                             FreeCAD.Vector(-top_width / 2, -top_length / 2, bottom_height + middle_height))
+
+    return bottom_block.fuse(middle_block).fuse(top_block)
+
+
+def finger_center_z(p):
+    return p['bottom_height'] + 4 + p['finger_radius']  # 4mm spacing above filter pocket
 
-block = bottom_block.fuse(middle_block).fuse(top_block)
 
 # ========================================================
 # STEP 3: Bottom Pocket (photodiode clip slot)
 # ========================================================
-bottom_cut_width = 30.0
-bottom_cut_depth = 20.0
-bottom_cut_height = bottom_height
-
-bottom_cut = Part.makeBox(
-    bottom_cut_width,
-    bottom_cut_depth,
-    bottom_cut_height,
-    FreeCAD.Vector(-bottom_cut_width / 2, -bottom_cut_depth / 2, 0)
-)
+def bottom_pocket(p):
+    bottom_cut_width = p['bottom_cut_width']
+    bottom_cut_depth = p['bottom_cut_depth']
+    bottom_cut_height = p['bottom_height']
+
+    return Part.makeBox(
+        bottom_cut_width,
+        bottom_cut_depth,
+        bottom_cut_height,
+        FreeCAD.Vector(-bottom_cut_width / 2, -bottom_cut_depth / 2, 0)
+    )
 
-block = block.cut(bottom_cut)
 
 # ========================================================
 # STEP 4: Photodiode Light Hole (vertical hole in bottom)
 # ========================================================
-light_radius = 4.0
-light_depth = 5.0  # cut through small gap below finger hole
-
-light_hole = Part.makeCylinder(
-    light_radius,
-    light_depth,
-    FreeCAD.Vector(0, 0, bottom_height),
-    FreeCAD.Vector(0, 0, 1)
-)
+def light_hole(p):
+    return Part.makeCylinder(
+        p['light_radius'],
+        p['light_depth'],
+        FreeCAD.Vector(0, 0, p['bottom_height']),
+        FreeCAD.Vector(0, 0, 1)
+    )
 
-block = block.cut(light_hole)
 
 # ========================================================
 # STEP 5: Filter Pocket (below finger hole)
 # ========================================================
-filter_width = 18.0
-filter_depth = 30.0
-filter_height = 2.0
-
-filter_origin = FreeCAD.Vector(
-    -filter_width / 2,
-    - filter_depth + middle_length / 2,
-    bottom_height + 1  # centered in 4mm band
-)
+def filter_pocket(p):
+    filter_width = p['filter_width']
+    filter_depth = p['filter_depth']
+    filter_height = p['filter_height']
+
+    filter_origin = FreeCAD.Vector(
+        -filter_width / 2,
+        - filter_depth + p['middle_length'] / 2,
+        p['bottom_height'] + 1  # centered in 4mm band
+    )
 
-filter_cut = Part.makeBox(filter_width, filter_depth, filter_height, filter_origin)
+    return Part.makeBox(filter_width, filter_depth, filter_height, filter_origin)
 
-block = block.cut(filter_cut)
 
 # ========================================================
 # STEP 6: Finger Hole (cylinder across Y-axis)
 # ========================================================
-finger_radius = 10.0
-finger_length = middle_length
-finger_center_z = bottom_height + 4 + finger_radius  # 4mm spacing above filter pocket
-
-finger_hole = Part.makeCylinder(
-    finger_radius,
-    finger_length,
-    FreeCAD.Vector(0, -finger_length / 2, finger_center_z),
-    FreeCAD.Vector(0, 1, 0)  # horizontal cut
-)
+def finger_hole(p):
+    finger_length = p['middle_length']
+
+    return Part.makeCylinder(
+        p['finger_radius'],
+        finger_length,
+        FreeCAD.Vector(0, -finger_length / 2, finger_center_z(p)),
+        FreeCAD.Vector(0, 1, 0)  # horizontal cut
+    )
 
-block = block.cut(finger_hole)
 
 # ========================================================
 # STEP 7: Humidity Sensor Pocket (slot cut on left side)
 # ========================================================
-side_pocket_width = 10.0
-side_pocket_height = 18.0
-side_pocket_depth = 27.0
-
-side_pocket = Part.makeBox(
-    side_pocket_width,
-    side_pocket_depth,
-    side_pocket_height,
-    FreeCAD.Vector(
-        - finger_radius - 1 - side_pocket_width,
-        -middle_length / 2,
-        finger_center_z - side_pocket_height / 2
+def humidity_pocket(p):
+    side_pocket_width = p['side_pocket_width']
+    side_pocket_height = p['side_pocket_height']
+    side_pocket_depth = p['side_pocket_depth']
+
+    return Part.makeBox(
+        side_pocket_width,
+        side_pocket_depth,
+        side_pocket_height,
+        FreeCAD.Vector(
+            - p['finger_radius'] - 1 - side_pocket_width,
+            -p['middle_length'] / 2,
+            finger_center_z(p) - side_pocket_height / 2
+        )
     )
-)
 
-block = block.cut(side_pocket)
 
 # ========================================================
 # STEP 8: Humidity Sensor Window (left of finger hole)
 # ========================================================
-sensor_size = 7.0
-sensor_depth = finger_radius + 1  # through wall thickness
-
-sensor_cut = Part.makeBox(
-    sensor_depth,
-    sensor_size,
-    sensor_size,
-    FreeCAD.Vector(
-        -sensor_depth,
-        -sensor_depth / 2,
-        finger_center_z - sensor_size / 2
+def sensor_window(p):
+    sensor_size = p['sensor_size']
+    sensor_depth = p['finger_radius'] + 1  # through wall thickness
+
+    return Part.makeBox(
+        sensor_depth,
+        sensor_size,
+        sensor_size,
+        FreeCAD.Vector(
+            -sensor_depth,
+            -sensor_depth / 2,
+            finger_center_z(p) - sensor_size / 2
+        )
     )
-)
 
-block = block.cut(sensor_cut)
 
 # ========================================================
 # STEP 9: Top Pocket (clip clearance)
 # ========================================================
-top_cut_width = top_width - 3.8
-top_cut_depth = top_length - 3.8
-top_cut_height = top_height
-
-top_cut = Part.makeBox(
-    top_cut_width,
-    top_cut_depth,
-    top_cut_height,
-    FreeCAD.Vector(-top_cut_width / 2, -top_cut_depth / 2, bottom_height + middle_height)
-)
+def top_pocket(p):
+    top_cut_width = p['top_width'] - 2 * p['top_wall']
+    top_cut_depth = p['top_length'] - 2 * p['top_wall']
+    top_cut_height = p['top_height']
+
+    return Part.makeBox(
+        top_cut_width,
+        top_cut_depth,
+        top_cut_height,
+        FreeCAD.Vector(-top_cut_width / 2, -top_cut_depth / 2, p['bottom_height'] + p['middle_height'])
+    )
 
-block = block.cut(top_cut)
 
 # ========================================================
 # STEP 10: LED Light Window (top opening for 4 LEDs)
 # ========================================================
-led_window_width = 18.5
-led_window_length = 18.5
-led_window_height = 5.0  # vertical height
-
-led_window = Part.makeBox(
-    led_window_width,
-    led_window_length,
-    led_window_height,
-    FreeCAD.Vector(
-        -led_window_width / 2,
-        -led_window_length / 2,
-        bottom_height + middle_height - led_window_height # base of top tab
+def led_window(p):
+    led_window_width = p['led_window_width']
+    led_window_length = p['led_window_length']
+    led_window_height = p['led_window_height']
+
+    return Part.makeBox(
+        led_window_width,
+        led_window_length,
+        led_window_height,
+        FreeCAD.Vector(
+            -led_window_width / 2,
+            -led_window_length / 2,
+            p['bottom_height'] + p['middle_height'] - led_window_height # base of top tab
+        )
     )
+
+
+CUT_STEPS = (
+    ('STEP 3: Bottom Pocket', bottom_pocket),
+    ('STEP 4: Photodiode Light Hole', light_hole),
+    ('STEP 5: Filter Pocket', filter_pocket),
+    ('STEP 6: Finger Hole', finger_hole),
+    ('STEP 7: Humidity Sensor Pocket', humidity_pocket),
+    ('STEP 8: Humidity Sensor Window', sensor_window),
+    ('STEP 9: Top Pocket', top_pocket),
+    ('STEP 10: LED Light Window', led_window),
 )
 
-block = block.cut(led_window)
+
+def build(params=None, cut_mode='batched'):
+    p = dict(PARAMS, **(params or {}))
+    steps = [(label, step(p)) for label, step in CUT_STEPS]
+    return booleanOps.apply_cuts(build_base(p), steps, cut_mode)
+
 
 # ========================================================
 # STEP 11: Display the Final Model
 # ========================================================
-shape = Part.show(block, 'fingerHoleModule')
-shape.ViewObject.Transparency = 20
-shape.ViewObject.ShapeColor = (0.6, 0.6, 0.85)
+def show(block):
+    FreeCAD.newDocument('fingerHoleModule')
+    shape = Part.show(block, 'fingerHoleModule')
+    if not FreeCAD.GuiUp:
+        # Headless (FreeCADCmd): the document object only, no view setup
+        return shape
+
+    FreeCAD.Gui.runCommand('Std_DrawStyle', 6)
+    shape.ViewObject.Transparency = 20
+    shape.ViewObject.ShapeColor = (0.6, 0.6, 0.85)
+
+    FreeCAD.Gui.activeDocument().activeView().viewIsometric()
+    FreeCAD.Gui.SendMsgToActiveView("ViewFit")
+    return shape
+
 
-FreeCAD.Gui.activeDocument().activeView().viewIsometric()
-FreeCAD.Gui.SendMsgToActiveView("ViewFit")
+if __name__ == '__main__':
+    import kernelLoader
+    kernelLoader.run(__name__)
@@ -0,0 +1,148 @@
+"""Stand-in for the FreeCAD module on machines without FreeCAD.
+
+Covers what the builder scripts use outside show(): Vector, with
+FreeCAD's in-place normalize() and multiply(), Rotation and Placement
+for patternOps.py, BoundBox, and a headless GuiUp.
+Put this directory first on sys.path to use it together with the
+stand-in Part module (benchmarkSuite.py does so with --kernel shim):
+
+    sys.path.insert(0, 'freecadShim')
+    import FreeCAD, Part
+"""
+import math
+
+GuiUp = False
+
+
+def Version():
+    return ['0', '0', 'shim']
+
+
+class Vector:
+
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        if isinstance(x, (Vector, tuple, list)):
+            x, y, z = x
+        self.x, self.y, self.z = float(x), float(y), float(z)
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.z))
+
+    def __getitem__(self, i):
+        return (self.x, self.y, self.z)[i]
+
+    def __len__(self):
+        return 3
+
+    def __add__(self, other):
+        return Vector(self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other):
+        return Vector(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __neg__(self):
+        return Vector(-self.x, -self.y, -self.z)
+
+    def __mul__(self, other):
+        # Vector * Vector is the dot product, as in FreeCAD
+        if isinstance(other, Vector):
+            return self.dot(other)
+        return Vector(self.x * other, self.y * other, self.z * other)
+
+    __rmul__ = __mul__
+
+    def __eq__(self, other):
+        return isinstance(other, Vector) and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return 'Vector (%r, %r, %r)' % (self.x, self.y, self.z)
+
+    @property
+    def Length(self):
+        return math.sqrt(self.x ** 2 + self.y ** 2 + self.z ** 2)
+
+    def dot(self, other):
+        return self.x * other.x + self.y * other.y + self.z * other.z
+
+    def cross(self, other):
+        return Vector(self.y * other.z - self.z * other.y,
+                      self.z * other.x - self.x * other.z,
+                      self.x * other.y - self.y * other.x)
+
+    def normalize(self):
+        """Scale to unit length in place and return self."""
+        length = self.Length
+        self.x, self.y, self.z = self.x / length, self.y / length, self.z / length
+        return self
+
+    def multiply(self, factor):
+        """Scale in place and return self."""
+        self.x, self.y, self.z = self.x * factor, self.y * factor, self.z * factor
+        return self
+
+
+def _rotation_matrix(axis, degrees):
+    x, y, z = tuple(Vector(axis).normalize())
+    c, s = math.cos(math.radians(degrees)), math.sin(math.radians(degrees))
+    return [
+        [c + x * x * (1 - c), x * y * (1 - c) - z * s, x * z * (1 - c) + y * s],
+        [y * x * (1 - c) + z * s, c + y * y * (1 - c), y * z * (1 - c) - x * s],
+        [z * x * (1 - c) - y * s, z * y * (1 - c) + x * s, c + z * z * (1 - c)],
+    ]
+
+
+class Rotation:
+    """Rotation(axis, degrees), or Rotation(from_vector, to_vector)."""
+
+    def __init__(self, first=None, second=0.0):
+        if first is None:
+            self.matrix = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+        elif isinstance(second, (int, float)):
+            self.matrix = _rotation_matrix(first, second)
+        else:
+            a, b = Vector(first).normalize(), Vector(second).normalize()
+            axis = a.cross(b)
+            if axis.Length < 1e-12:
+                # Parallel: identity, or a half turn about any perpendicular axis
+                helper = Vector(1, 0, 0) if abs(a.x) < 0.9 else Vector(0, 1, 0)
+                axis = a.cross(helper) if a.dot(b) < 0 else Vector(0, 0, 1)
+            angle = math.degrees(math.atan2(a.cross(b).Length, a.dot(b)))
+            self.matrix = _rotation_matrix(axis, angle)
+
+    def multVec(self, v):
+        return Vector(*(row[0] * v[0] + row[1] * v[1] + row[2] * v[2] for row in self.matrix))
+
+
+class Matrix:
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @property
+    def A(self):
+        """The 16 elements, row by row, as in FreeCAD."""
+        return tuple(value for row in self.rows for value in row)
+
+
+class BoundBox:
+
+    def __init__(self, xmin=0.0, ymin=0.0, zmin=0.0, xmax=0.0, ymax=0.0, zmax=0.0):
+        self.XMin, self.YMin, self.ZMin = xmin, ymin, zmin
+        self.XMax, self.YMax, self.ZMax = xmax, ymax, zmax
+
+
+class Placement:
+    """Placement(base, rotation[, center]): x -> rotation(x - center) + center + base."""
+
+    def __init__(self, base=None, rotation=None, center=None):
+        rotation = rotation or Rotation()
+        center = Vector(center) if center is not None else Vector()
+        self.Rotation = rotation
+        self.Base = (Vector(base) if base is not None else Vector()) + center - rotation.multVec(center)
+
+    def multVec(self, v):
+        return self.Rotation.multVec(v) + self.Base
+
+    def toMatrix(self):
+        r, b = self.Rotation.matrix, self.Base
+        return Matrix([r[0] + [b.x], r[1] + [b.y], r[2] + [b.z], [0.0, 0.0, 0.0, 1.0]])
@@ -0,0 +1,413 @@
+"""Stand-in for FreeCAD's Part module (see FreeCAD.py next to it).
+
+Shapes are CSG trees of boxes and cylinders. Booleans only record the
+operation, so they cost microseconds instead of kernel time. Geometry
+queries answer from point membership in the tree:
+
+- Volume: exact for primitives and placed instances; Monte Carlo over
+  the bounding box with a fixed seed for booleans, so equal trees give
+  equal volumes (about 0.3 % noise)
+- CenterOfMass / MatrixOfInertia: exact for primitives and instances;
+  for booleans Monte Carlo with every sample mirrored through the box
+  center along each axis, so a tree symmetric about its box center gets
+  exactly symmetric moments
+- BoundBox, mirror(base, normal), and removeSplitter (a no-op: trees
+  have no seams)
+- tessellate / exportStl: the triangles of every primitive, split down
+  to MAX_EDGE, that lie on the boundary of the result; triangles are not
+  clipped along intersection curves, so edges of cut faces are ragged
+  (to about MAX_EDGE)
+- exportBrep / exportStep / importBrep: the tree as JSON
+- Faces / Edges / Solids: counted per primitive, for buildTrace.py
+- moved(placement): a placed instance sharing the original tree, whose
+  primitive triangles are computed once per tolerance for all instances
+
+Timings and sizes from the shim measure the Python side of the builders
+and scale with the same inputs as the kernel (tool count, tessellation
+tolerance), but the shapes are not the kernel's.
+"""
+import json
+import math
+
+import numpy as np
+
+import FreeCAD
+
+STL_TOLERANCE = 0.01    # linear deflection used by exportStl
+MAX_EDGE = 1.0          # triangles are split down to this edge length before trimming
+VOLUME_SAMPLES = 200000
+
+# Unit cube as 12 outward-facing triangles
+_CUBE = np.array([
+    [[0, 0, 0], [0, 1, 0], [1, 1, 0]], [[0, 0, 0], [1, 1, 0], [1, 0, 0]],
+    [[0, 0, 1], [1, 0, 1], [1, 1, 1]], [[0, 0, 1], [1, 1, 1], [0, 1, 1]],
+    [[0, 0, 0], [1, 0, 0], [1, 0, 1]], [[0, 0, 0], [1, 0, 1], [0, 0, 1]],
+    [[0, 1, 0], [0, 1, 1], [1, 1, 1]], [[0, 1, 0], [1, 1, 1], [1, 1, 0]],
+    [[0, 0, 0], [0, 0, 1], [0, 1, 1]], [[0, 0, 0], [0, 1, 1], [0, 1, 0]],
+    [[1, 0, 0], [1, 1, 0], [1, 1, 1]], [[1, 0, 0], [1, 1, 1], [1, 0, 1]],
+], dtype=np.float64)
+
+
+def _axis_rotation(axis, degrees):
+    axis = np.asarray(tuple(axis), dtype=np.float64)
+    axis /= np.linalg.norm(axis)
+    x, y, z = axis
+    c, s = math.cos(math.radians(degrees)), math.sin(math.radians(degrees))
+    return np.array([
+        [c + x * x * (1 - c), x * y * (1 - c) - z * s, x * z * (1 - c) + y * s],
+        [y * x * (1 - c) + z * s, c + y * y * (1 - c), y * z * (1 - c) - x * s],
+        [z * x * (1 - c) - y * s, z * y * (1 - c) + x * s, c + z * z * (1 - c)],
+    ])
+
+
+def _frame(direction):
+    """Rotation taking local Z onto direction."""
+    w = np.asarray(tuple(direction), dtype=np.float64)
+    w /= np.linalg.norm(w)
+    helper = np.array([1.0, 0.0, 0.0]) if abs(w[0]) < 0.9 else np.array([0.0, 1.0, 0.0])
+    u = np.cross(helper, w)
+    u /= np.linalg.norm(u)
+    return np.stack([u, np.cross(w, u), w], axis=1)
+
+
+def _cylinder_triangles(radius, height, tolerance):
+    # Enough segments to keep every chord within tolerance of the circle
+    ratio = 1 - tolerance / radius
+    segments = 3 if ratio <= -1 else max(3, int(math.ceil(math.pi / math.acos(max(ratio, -1.0)))))
+    angles = np.linspace(0, 2 * np.pi, segments + 1)
+    ring = np.stack([radius * np.cos(angles), radius * np.sin(angles), np.zeros(segments + 1)], axis=1)
+    bottom, top = ring, ring + [0.0, 0.0, height]
+    b0, b1, t0, t1 = bottom[:-1], bottom[1:], top[:-1], top[1:]
+    center_b = np.zeros((segments, 3))
+    center_t = np.tile([0.0, 0.0, height], (segments, 1))
+    return np.concatenate([
+        np.stack([b0, b1, t1], axis=1), np.stack([b0, t1, t0], axis=1),
+        np.stack([center_b, b1, b0], axis=1), np.stack([center_t, t0, t1], axis=1),
+    ])
+
+
+def _split_long_edges(tris, max_edge):
+    """Bisect the longest edge of triangles until no edge exceeds max_edge."""
+    done = []
+    while len(tris):
+        edges = np.linalg.norm(tris - tris[:, [1, 2, 0]], axis=2)
+        longest = edges.argmax(axis=1)
+        split = edges[np.arange(len(tris)), longest] > max_edge
+        done.append(tris[~split])
+        # Rotate corners so the longest edge runs from corner 0 to corner 1
+        t = tris[split]
+        order = (np.arange(3) + longest[split][:, None]) % 3
+        t = t[np.arange(len(t))[:, None], order]
+        mid = (t[:, 0] + t[:, 1]) / 2
+        tris = np.concatenate([np.stack([t[:, 0], mid, t[:, 2]], axis=1), np.stack([mid, t[:, 1], t[:, 2]], axis=1)])
+    return np.concatenate(done)
+
+
+class Shape:
+
+    def __init__(self, kind='empty', children=(), size=()):
+        self.kind = kind                # empty, box, cylinder, placed, fuse, cut or common
+        self.children = list(children)
+        self.size = tuple(size)         # box (x, y, z); cylinder (radius, height)
+        self.rotation = np.eye(3)       # primitives and placed instances only
+        self.translation = np.zeros(3)
+        self._volume = None
+        self._triangle_cache = {}
+
+    # ---------------------------------------
+    # Booleans and placement
+    # ---------------------------------------
+    def _boolean(self, kind, others):
+        others = list(others) if isinstance(others, (list, tuple)) else [others]
+        return Shape(kind, [self] + others)
+
+    def fuse(self, others):
+        return self._boolean('fuse', others)
+
+    def cut(self, others):
+        return self._boolean('cut', others)
+
+    def common(self, others):
+        return self._boolean('common', others)
+
+    def copy(self):
+        return Shape()._restore(self._state())
+
+    def removeSplitter(self):
+        return self
+
+    def mirror(self, base, normal):
+        """Mirror image in the plane through base with the given normal."""
+        n = np.asarray(tuple(normal), dtype=np.float64)
+        n /= np.linalg.norm(n)
+        shape = Shape('placed', [self])
+        shape.rotation = np.eye(3) - 2 * np.outer(n, n)
+        shape.translation = 2 * np.dot(n, np.asarray(tuple(base), dtype=np.float64)) * n
+        return shape
+
+    def moved(self, placement):
+        """New instance of this shape under placement, sharing its tree."""
+        matrix = np.array(placement.toMatrix().A).reshape(4, 4)
+        shape = Shape('placed', [self])
+        shape.rotation = matrix[:3, :3]
+        shape.translation = matrix[:3, 3]
+        return shape
+
+    def _leaves(self):
+        # Nodes that carry their own placement
+        if self.kind in ('box', 'cylinder', 'placed'):
+            return [self]
+        return [leaf for child in self.children for leaf in child._leaves()]
+
+    def rotate(self, center, axis, degrees):
+        """Rotate in place about the axis through center; returns self."""
+        r = _axis_rotation(axis, degrees)
+        c = np.asarray(tuple(center), dtype=np.float64)
+        for leaf in self._leaves():
+            leaf.rotation = r @ leaf.rotation
+            leaf.translation = r @ (leaf.translation - c) + c
+        self._invalidate()
+        return self
+
+    def translate(self, offset):
+        for leaf in self._leaves():
+            leaf.translation = leaf.translation + np.asarray(tuple(offset), dtype=np.float64)
+        self._invalidate()
+        return self
+
+    def _invalidate(self):
+        self._volume = None
+        self._triangle_cache = {}
+        if self.kind != 'placed':   # moving an instance leaves the shared original alone
+            for child in self.children:
+                child._invalidate()
+
+    # ---------------------------------------
+    # Point membership
+    # ---------------------------------------
+    def _bounds(self):
+        if self.kind == 'box':
+            corners = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)]) * self.size
+        elif self.kind == 'cylinder':
+            r, h = self.size
+            corners = np.array([[x, y, z] for x in (-r, r) for y in (-r, r) for z in (0, h)])
+        elif self.kind == 'empty':
+            return np.zeros(3), np.zeros(3)
+        elif self.kind == 'placed':
+            lo, hi = self.children[0]._bounds()
+            corners = np.array([[x, y, z] for x in (lo[0], hi[0]) for y in (lo[1], hi[1]) for z in (lo[2], hi[2])])
+        else:
+            bounds = [child._bounds() for child in self.children]
+            if self.kind == 'fuse':
+                return np.min([lo for lo, _hi in bounds], axis=0), np.max([hi for _lo, hi in bounds], axis=0)
+            if self.kind == 'cut':
+                return bounds[0]
+            lo = np.max([lo for lo, _hi in bounds], axis=0)
+            return lo, np.maximum(np.min([hi for _lo, hi in bounds], axis=0), lo)
+        points = corners @ self.rotation.T + self.translation
+        return points.min(axis=0), points.max(axis=0)
+
+    def inside(self, points):
+        """True for points inside the solid."""
+        if self.kind in ('box', 'cylinder'):
+            local = (points - self.translation) @ self.rotation
+            if self.kind == 'box':
+                return ((local >= 0) & (local <= self.size)).all(axis=1)
+            r, h = self.size
+            return (local[:, 0] ** 2 + local[:, 1] ** 2 <= r * r) & (local[:, 2] >= 0) & (local[:, 2] <= h)
+        if self.kind == 'empty':
+            return np.zeros(len(points), dtype=bool)
+        if self.kind == 'placed':
+            return self.children[0].inside((points - self.translation) @ self.rotation)
+        first = self.children[0].inside(points)
+        rest = [child.inside(points) for child in self.children[1:]]
+        if self.kind == 'fuse':
+            return np.logical_or.reduce([first] + rest)
+        if self.kind == 'cut':
+            return first & ~np.logical_or.reduce([np.zeros_like(first)] + rest)
+        return np.logical_and.reduce([first] + rest)
+
+    # Topology counts are per primitive (box 6 faces / 12 edges, cylinder
+    # 3 / 3), not of the B-rep a kernel would build from the tree
+    def _count(self, box, cylinder):
+        if self.kind in ('box', 'cylinder'):
+            return [self] * (box if self.kind == 'box' else cylinder)
+        return [item for child in self.children for item in child._count(box, cylinder)]
+
+    @property
+    def Faces(self):
+        return self._count(6, 3)
+
+    @property
+    def Edges(self):
+        return self._count(12, 3)
+
+    @property
+    def Solids(self):
+        return [self] if self.kind != 'empty' else []
+
+    @property
+    def BoundBox(self):
+        lo, hi = self._bounds()
+        return FreeCAD.BoundBox(*(lo.tolist() + hi.tolist()))
+
+    def _moments(self):
+        """(volume, center of mass, inertia tensor about it) at unit density."""
+        if self.kind == 'box':
+            a, b, c = self.size
+            volume = a * b * c
+            center = self.rotation @ (np.array(self.size) / 2) + self.translation
+            local = volume / 12 * np.diag([b * b + c * c, a * a + c * c, a * a + b * b])
+        elif self.kind == 'cylinder':
+            r, h = self.size
+            volume = math.pi * r * r * h
+            center = self.rotation @ np.array([0.0, 0.0, h / 2]) + self.translation
+            local = volume * np.diag([(3 * r * r + h * h) / 12, (3 * r * r + h * h) / 12, r * r / 2])
+        elif self.kind == 'placed':
+            volume, child_center, local = self.children[0]._moments()
+            center = self.rotation @ child_center + self.translation
+        elif self.kind == 'empty':
+            return 0.0, np.zeros(3), np.zeros((3, 3))
+        else:
+            lo, hi = self._bounds()
+            u = np.random.default_rng(0).random((VOLUME_SAMPLES // 8, 3))
+            flips = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)])
+            u = np.abs(flips[:, None] - u[None]).reshape(-1, 3)
+            points = lo + u * (hi - lo)
+            inside = points[self.inside(points)]
+            weight = float(np.prod(hi - lo)) / len(points)
+            volume = weight * len(inside)
+            if not len(inside):
+                return 0.0, (lo + hi) / 2, np.zeros((3, 3))
+            center = inside.mean(axis=0)
+            r = inside - center
+            tensor = weight * (np.einsum('ij,ij->', r, r) * np.eye(3) - r.T @ r)
+            return volume, center, tensor
+        return volume, center, self.rotation @ local @ self.rotation.T
+
+    @property
+    def CenterOfMass(self):
+        return FreeCAD.Vector(*self._moments()[1])
+
+    @property
+    def MatrixOfInertia(self):
+        tensor = self._moments()[2]
+        return FreeCAD.Matrix([list(row) + [0.0] for row in tensor.tolist()] + [[0.0, 0.0, 0.0, 1.0]])
+
+    @property
+    def Volume(self):
+        if self._volume is None and self.kind in ('box', 'cylinder', 'placed'):
+            self._volume = self._moments()[0]
+        if self._volume is None:
+            lo, hi = self._bounds()
+            box = float(np.prod(hi - lo))
+            if box <= 0:
+                self._volume = 0.0
+            else:
+                points = lo + np.random.default_rng(0).random((VOLUME_SAMPLES, 3)) * (hi - lo)
+                self._volume = box * float(self.inside(points).mean())
+        return self._volume
+
+    # ---------------------------------------
+    # Tessellation and export
+    # ---------------------------------------
+    def _primitive_triangles(self, tolerance, flip=False):
+        if self.kind == 'placed':
+            # Shared by every instance of the original
+            original = self.children[0]
+            key = (tolerance, flip)
+            if key not in original._triangle_cache:
+                original._triangle_cache[key] = original._primitive_triangles(tolerance, flip)
+            # A mirrored instance turns its triangles inside out; keep them facing outward
+            order = slice(None, None, -1) if np.linalg.det(self.rotation) < 0 else slice(None)
+            return [(tris @ self.rotation.T + self.translation)[:, order] for tris in original._triangle_cache[key]]
+        if self.kind in ('box', 'cylinder'):
+            if self.kind == 'box':
+                local = _CUBE * self.size
+            else:
+                local = _cylinder_triangles(self.size[0], self.size[1], tolerance)
+            tris = local @ self.rotation.T + self.translation
+            return [tris[:, ::-1] if flip else tris]
+        parts = []
+        for i, child in enumerate(self.children):
+            # Cut tools show their inside to the result
+            parts.extend(child._primitive_triangles(tolerance, flip != (self.kind == 'cut' and i > 0)))
+        return parts
+
+    def triangles(self, tolerance):
+        """(n, 3, 3) array of the boundary triangles."""
+        parts = self._primitive_triangles(tolerance)
+        if not parts:
+            return np.zeros((0, 3, 3))
+        tris = _split_long_edges(np.concatenate(parts), MAX_EDGE)
+        normals = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+        length = np.linalg.norm(normals, axis=1)
+        tris, normals, length = tris[length > 0], normals[length > 0], length[length > 0]
+        normals /= length[:, None]
+        lo, hi = self._bounds()
+        # Probe beyond the chord sag of curved faces (at most tolerance)
+        eps = 2 * tolerance + 1e-6 * max(float(np.max(hi - lo)), 1.0)
+        centers = tris.mean(axis=1)
+        keep = self.inside(centers - eps * normals) & ~self.inside(centers + eps * normals)
+        return tris[keep]
+
+    def tessellate(self, tolerance):
+        """Return (points, facets) like Part.Shape.tessellate: Vectors and index triples."""
+        tris = self.triangles(tolerance)
+        points, facets = np.unique(tris.reshape(-1, 3), axis=0, return_inverse=True)
+        return [FreeCAD.Vector(*point) for point in points], [tuple(f) for f in facets.reshape(-1, 3).tolist()]
+
+    def exportStl(self, path):
+        import stlIO
+        stlIO.write_stl(path, self.triangles(STL_TOLERANCE).astype(np.float32))
+
+    def _state(self):
+        return {
+            'kind': self.kind,
+            'size': list(self.size),
+            'rotation': self.rotation.tolist(),
+            'translation': self.translation.tolist(),
+            'children': [child._state() for child in self.children],
+        }
+
+    def _restore(self, state):
+        self.kind = state['kind']
+        self.size = tuple(state['size'])
+        self.rotation = np.array(state['rotation'])
+        self.translation = np.array(state['translation'])
+        self.children = [Shape()._restore(child) for child in state['children']]
+        self._volume = None
+        self._triangle_cache = {}
+        return self
+
+    def exportBrep(self, path):
+        with open(path, 'w') as f:
+            json.dump(self._state(), f)
+
+    exportStep = exportBrep
+
+    def importBrep(self, path):
+        with open(path) as f:
+            self._restore(json.load(f))
+
+
+def makeBox(length, width, height, origin=None, direction=None):
+    shape = Shape('box', size=(length, width, height))
+    if direction is not None:
+        shape.rotation = _frame(direction)
+    if origin is not None:
+        shape.translation = np.asarray(tuple(origin), dtype=np.float64)
+    return shape
+
+
+def makeCylinder(radius, height, base=None, direction=None):
+    shape = Shape('cylinder', size=(radius, height))
+    if direction is not None:
+        shape.rotation = _frame(direction)
+    if base is not None:
+        shape.translation = np.asarray(tuple(base), dtype=np.float64)
+    return shape
+
+
+def makeCompound(shapes):
+    return Shape('fuse', shapes)
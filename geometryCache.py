@@ -0,0 +1,208 @@
+"""Content-addressed on-disk cache of built module geometry.
+
+Entries are keyed by a SHA-256 of the module name, its BUILDER_VERSION,
+a digest of the module source and of the HELPER_MODULES it builds with,
+the kernel (FreeCAD version, or the freecadShim stand-in) and the full
+(default-merged) parameter set. Each entry stores the exact BREP and a tessellated STL, so an STL
+request is served by a file copy without running any kernel operation.
+
+The least recently used entries are evicted once the cache grows past
+max_bytes; recency is the entry's file modification time, which is
+refreshed on every hit, so several worker processes can share one cache
+directory without a shared index file. Files are written under a .tmp
+suffix and renamed into place, so no process sees a partial entry, and
+a file another process evicts in between is treated as a miss.
+"""
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import shutil
+import tempfile
+
+ENTRY_SUFFIXES = ('.brep', '.stl')
+TEMP_SUFFIX = '.tmp'
+HELPER_MODULES = ('booleanOps', 'patternOps', 'symmetryOps', 'ledGeometry')   # imported by the builders
+
+
+def _normalize(value):
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _source_digest(module):
+    """SHA-256 of the module source and the HELPER_MODULES sources.
+
+    The helpers are read from disk rather than imported, so an edited
+    helper changes the key even in a process that imported it earlier.
+    """
+    digest = hashlib.sha256()
+    try:
+        digest.update(inspect.getsource(module).encode('utf-8'))
+    except (OSError, TypeError):
+        pass
+    for name in HELPER_MODULES:
+        spec = importlib.util.find_spec(name)
+        if spec is None or not spec.origin or not os.path.isfile(spec.origin):
+            continue
+        with open(spec.origin, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _kernel_id():
+    """FreeCAD's version, so stand-in and real kernel entries never mix."""
+    import FreeCAD
+    return '.'.join(str(part) for part in FreeCAD.Version()[:4])
+
+
+class GeometryCache:
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        os.makedirs(root, exist_ok=True)
+
+    # ---------------------------------------
+    # Keys and paths
+    # ---------------------------------------
+    def key(self, module, params=None):
+        p = dict(module.PARAMS, **(params or {}))
+        payload = {
+            'module': module.__name__,
+            'version': getattr(module, 'BUILDER_VERSION', 0),
+            'source': _source_digest(module),
+            'kernel': _kernel_id(),
+            'params': {name: _normalize(value) for name, value in p.items()},
+        }
+        text = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def path(self, key, suffix):
+        return os.path.join(self.root, key[:2], key + suffix)
+
+    def _touch(self, key):
+        for suffix in ENTRY_SUFFIXES:
+            try:
+                os.utime(self.path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    # ---------------------------------------
+    # Lookups
+    # ---------------------------------------
+    def get_stl(self, key, dest=None):
+        """Return the cached STL path (copied to dest if given) or None."""
+        path = self.path(key, '.stl')
+        try:
+            if dest is not None:
+                shutil.copyfile(path, dest)
+            elif not os.path.exists(path):
+                raise FileNotFoundError(path)
+        except FileNotFoundError:
+            # Never stored, or evicted by another process
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        self._touch(key)
+        return path if dest is None else dest
+
+    def get_shape(self, key):
+        """Load the cached BREP as a Part.Shape, or return None."""
+        path = self.path(key, '.brep')
+        if not os.path.exists(path):
+            self.stats['misses'] += 1
+            return None
+        import Part
+        shape = Part.Shape()
+        try:
+            shape.importBrep(path)
+        except (OSError, RuntimeError):
+            # FreeCAD reports a missing file as its own (RuntimeError based) error
+            if os.path.exists(path):
+                raise
+            # Evicted by another process since the check
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        self._touch(key)
+        return shape
+
+    def put(self, key, shape, stl_dest=None):
+        """Store shape under key; stl_dest also gets a copy of the STL written."""
+        directory = os.path.dirname(self.path(key, '.brep'))
+        os.makedirs(directory, exist_ok=True)
+        for suffix, export in (('.brep', shape.exportBrep), ('.stl', shape.exportStl)):
+            # Write next to the final path and rename so readers never see
+            # partial files; the .tmp suffix keeps entries() and evict() off it
+            fd, tmp_path = tempfile.mkstemp(suffix=suffix + TEMP_SUFFIX, dir=directory)
+            os.close(fd)
+            try:
+                export(tmp_path)
+                if suffix == '.stl' and stl_dest is not None:
+                    # From the temporary file: the entry may be evicted as soon as it is renamed
+                    shutil.copyfile(tmp_path, stl_dest)
+                os.replace(tmp_path, self.path(key, suffix))
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        self.evict(keep=key)
+
+    def build(self, module, params=None, cut_mode='batched'):
+        """Return the module shape from the cache, building and storing it on a miss."""
+        key = self.key(module, params)
+        shape = self.get_shape(key)
+        if shape is None:
+            shape = module.build(params, cut_mode)
+            self.put(key, shape)
+        return shape
+
+    # ---------------------------------------
+    # Size bound
+    # ---------------------------------------
+    def entries(self):
+        """Return [(last_used, size, key)] for every complete entry."""
+        entries = {}
+        for directory, _dirs, files in os.walk(self.root):
+            for name in files:
+                stem, suffix = os.path.splitext(name)
+                if suffix not in ENTRY_SUFFIXES:
+                    continue
+                try:
+                    stat = os.stat(os.path.join(directory, name))
+                except FileNotFoundError:
+                    # Evicted by another process while walking
+                    continue
+                last_used, size = entries.get(stem, (0.0, 0))
+                entries[stem] = (max(last_used, stat.st_mtime), size + stat.st_size)
+        return sorted((last_used, size, key) for key, (last_used, size) in entries.items())
+
+    def size(self):
+        return sum(size for _last_used, size, _key in self.entries())
+
+    def evict(self, keep=None):
+        """Drop least recently used entries until the cache fits max_bytes."""
+        entries = self.entries()
+        total = sum(size for _last_used, size, _key in entries)
+        for _last_used, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for suffix in ENTRY_SUFFIXES:
+                try:
+                    os.remove(self.path(key, suffix))
+                except FileNotFoundError:
+                    # Never written, or another process evicted it first
+                    pass
+            total -= size
+            self.stats['evictions'] += 1
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
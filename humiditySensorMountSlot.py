@@ -1,84 +1,132 @@
-import FreeCAD, Part
+from kernelLoader import FreeCAD, Part
 
-# Create a new FreeCAD document and set visual style
-FreeCAD.newDocument('HumiditySensorMountModule')
-FreeCAD.Gui.runCommand('Std_DrawStyle', 6)
+import booleanOps
 
-# -------------------------------
-# 1. Base Plate (13 x 22 x 2 mm)
-# -------------------------------
-base_plate_width = 13.0               # 14.0 - 1 mm trimming
-base_plate_length = 22.0
-base_plate_thickness = 2.0
-
-#  Positioned slightly offset to the left (X) and centered on Y, bottom at Z=0
-base_plate_origin = FreeCAD.Vector(
-    -(base_plate_width - 1) / 2,
-    -base_plate_length / 2,
-    0
-)
+MODULE_NAME = 'HumiditySensorMountModule'
+BUILDER_VERSION = 1  # bump to invalidate cached geometry (see geometryCache.py)
 
-base_plate = Part.makeBox(
-    base_plate_width,
-    base_plate_length,
-    base_plate_thickness,
-    base_plate_origin
-)
+PARAMS = {
+    # Base plate (13 x 22 x 2 mm)
+    'base_plate_width': 13.0,       # 14.0 - 1 mm trimming
+    'base_plate_length': 22.0,
+    'base_plate_thickness': 2.0,
 
-# -----------------------------------------------
-# 2. Mounting Block (9.6 x 17.6 x 5 mm) on top of base
-# -----------------------------------------------
-mount_block_width = 9.6
-mount_block_length = 17.6
-mount_block_height = 5.0
-
-mount_block_origin = FreeCAD.Vector(
-    -mount_block_width / 2,
-    -mount_block_length / 2,
-    base_plate_thickness  # starts on top of base plate
-)
+    # Mounting block (9.6 x 17.6 x 5 mm) on top of base
+    'mount_block_width': 9.6,
+    'mount_block_length': 17.6,
+    'mount_block_height': 5.0,
+
+    # Sensor pocket (3 x 8 x 7 mm) subtracted from mounting block
+    'pocket_width': 3.0,
+    'pocket_length': 8.0,
+    'pocket_depth': 7.0,            # goes through base plate + mounting block
+}
+
+
+def build_base(p):
+    # -------------------------------
+    # 1. Base Plate (13 x 22 x 2 mm)
+    # -------------------------------
+    base_plate_width = p['base_plate_width']
+    base_plate_length = p['base_plate_length']
+    base_plate_thickness = p['base_plate_thickness']
+
+    #  Positioned slightly offset to the left (X) and centered on Y, bottom at Z=0
+    base_plate_origin = FreeCAD.Vector(
+        -(base_plate_width - 1) / 2,
+        -base_plate_length / 2,
+        0
+    )
+
+    base_plate = Part.makeBox(
+        base_plate_width,
+        base_plate_length,
+        base_plate_thickness,
+        base_plate_origin
+    )
+
+    # -----------------------------------------------
+    # 2. Mounting Block (9.6 x 17.6 x 5 mm) on top of base
+    # -----------------------------------------------
+    mount_block_width = p['mount_block_width']
+    mount_block_length = p['mount_block_length']
+    mount_block_height = p['mount_block_height']
+
+    mount_block_origin = FreeCAD.Vector(
+        -mount_block_width / 2,
+        -mount_block_length / 2,
+        base_plate_thickness  # starts on top of base plate
+    )
+
+    mount_block = Part.makeBox(
+        mount_block_width,
+        mount_block_length,
+        mount_block_height,
+        mount_block_origin
+    )
+
+    return base_plate.fuse(mount_block)
 
-mount_block = Part.makeBox(
-    mount_block_width,
-    mount_block_length,
-    mount_block_height,
-    mount_block_origin
-)
 
 # ---------------------------------------------------------
 # 3. Sensor Pocket (3 x 8 x 7 mm) subtracted from mounting block
 # ---------------------------------------------------------
-pocket_width = 3.0
-pocket_length = 8.0
-pocket_depth = 7.0  # goes through base plate + mounting block
-
-# Positioned slightly offset to the left (X) and centered on Y
-sensor_pocket_origin = FreeCAD.Vector(
-    -pocket_width / 2 - 1,         # shifted -1mm on X
-    -pocket_length / 2,            # centered on Y
-    0                              # starts on bottom of the base plate
-)
+def sensor_pocket(p):
+    pocket_width = p['pocket_width']
+    pocket_length = p['pocket_length']
+    pocket_depth = p['pocket_depth']
+
+    # Positioned slightly offset to the left (X) and centered on Y
+    sensor_pocket_origin = FreeCAD.Vector(
+        -pocket_width / 2 - 1,         # shifted -1mm on X
+        -pocket_length / 2,            # centered on Y
+        0                              # starts on bottom of the base plate
+    )
+
+    return Part.makeBox(
+        pocket_width,
+        pocket_length,
+        pocket_depth,
+        sensor_pocket_origin
+    )
 
-sensor_pocket = Part.makeBox(
-    pocket_width,
-    pocket_length,
-    pocket_depth,
-    sensor_pocket_origin
+
+CUT_STEPS = (
+    ('3. Sensor Pocket', sensor_pocket),
 )
 
+
 # -------------------------------
 # Combine and apply the cut
 # -------------------------------
-model = base_plate.fuse(mount_block)
-model = model.cut(sensor_pocket)
+def build(params=None, cut_mode='batched'):
+    p = dict(PARAMS, **(params or {}))
+    steps = [(label, step(p)) for label, step in CUT_STEPS]
+    return booleanOps.apply_cuts(build_base(p), steps, cut_mode)
+
 
 # -------------------------------
 # Display the result in FreeCAD
 # -------------------------------
-shape = Part.show(model, 'HumiditySensorMountModule')
-shape.ViewObject.Transparency = 40    # 0 = solid, 100 = fully transparent
-shape.ViewObject.ShapeColor = (0.2, 0.6, 0.8)  # soft blue color
+def show(model):
+    # Create a new FreeCAD document
+    FreeCAD.newDocument('HumiditySensorMountModule')
+    shape = Part.show(model, 'HumiditySensorMountModule')
+    if not FreeCAD.GuiUp:
+        # Headless (FreeCADCmd): the document object only, no view setup
+        return shape
+
+    # Shaded wireframe view
+    FreeCAD.Gui.runCommand('Std_DrawStyle', 6)
+    shape.ViewObject.Transparency = 40    # 0 = solid, 100 = fully transparent
+    shape.ViewObject.ShapeColor = (0.2, 0.6, 0.8)  # soft blue color
+
+    # Auto-fit and set to isometric view
+    FreeCAD.Gui.activeDocument().activeView().viewIsometric()
+    FreeCAD.Gui.SendMsgToActiveView("ViewFit")
+    return shape
+
 
-# Auto-fit and set to isometric view
-FreeCAD.Gui.activeDocument().activeView().viewIsometric()
-FreeCAD.Gui.SendMsgToActiveView("ViewFit")
+if __name__ == '__main__':
+    import kernelLoader
+    kernelLoader.run(__name__)
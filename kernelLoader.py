@@ -0,0 +1,79 @@
+"""Lazy FreeCAD and Part for the builder modules.
+
+The builders used to start with `import FreeCAD, Part`, which loads the
+whole kernel (and in the FreeCAD GUI, nothing less) before a single
+parameter is read. They now import these stand-ins instead:
+
+    from kernelLoader import FreeCAD, Part
+
+Each one imports the real module the first time one of its attributes
+is used, i.e. when geometry is actually built. Listing PARAMS, reading
+CUT_STEPS or the kit parameters never loads the kernel. Lookups go
+through sys.modules every time, so they follow whatever FreeCAD and Part
+resolve to when the geometry is built (FREECAD_LIB, or the stand-in
+kernel benchmarkSuite.py and sdfPreview.py switch to).
+
+    python3 ledHousing.py       # in the FreeCAD GUI: show it, otherwise: build and export it
+"""
+import importlib
+import os
+import sys
+
+
+def load(name):
+    """The module name resolves to now ('FreeCAD' or 'Part'), imported if need be."""
+    module = sys.modules.get(name)
+    if module is None:
+        # Same library path buildKit.py adds for headless builds
+        lib = os.environ.get('FREECAD_LIB')
+        if lib and lib not in sys.path:
+            sys.path.append(lib)
+        module = importlib.import_module(name)
+    return module
+
+
+class LazyModule:
+    """Module proxy that imports name on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(load(self._name), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._name in sys.modules else 'not loaded'
+        return '<lazy module %r (%s)>' % (self._name, state)
+
+
+FreeCAD = LazyModule('FreeCAD')
+Part = LazyModule('Part')
+
+
+def loaded():
+    """True once the kernel has been imported in this process."""
+    return 'FreeCAD' in sys.modules or 'Part' in sys.modules
+
+
+def gui_up():
+    """True inside the FreeCAD GUI, without importing FreeCAD to find out.
+
+    The GUI imports FreeCAD before it runs any macro, so when FreeCAD is
+    not loaded yet this is a plain interpreter.
+    """
+    module = sys.modules.get('FreeCAD')
+    return bool(module is not None and getattr(module, 'GuiUp', False))
+
+
+def run(name):
+    """`__main__` of a builder script: kernelLoader.run(__name__).
+
+    Shows the model in the FreeCAD GUI; anywhere else the module is built
+    and exported like `python3 buildKit.py <module>` would.
+    """
+    module = sys.modules[name]
+    if gui_up():
+        module.show(module.build())
+    else:
+        import buildKit
+        buildKit.main([os.path.splitext(os.path.basename(module.__file__))[0]])
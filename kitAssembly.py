@@ -0,0 +1,125 @@
+"""Placement of the five modules in the assembled box.
+
+Each module is modelled in its own frame (see the builder scripts). The
+stack, bottom to top:
+
+- photodiodeHousing stays at the origin, pocket facing up.
+- fingerHole is turned 90 degrees about Z so its 50 mm side runs along
+  Y; its bottom tab drops into the photodiode pocket and the middle
+  block rests on the housing rim.
+- ledHousing is flipped upside down onto the fingerHole top tab, the
+  tab sitting in the groove around the LED platform.
+- opticalFilterMountSlot slides into the fingerHole filter pocket, its
+  base plate covering the side of the stack.
+- humiditySensorMountSlot slides into the fingerHole side pocket, its
+  base plate flat against the fingerHole wall.
+
+Placements follow the module parameters, so parameter variants stay
+assembled:
+
+    placements({'fingerHole': {'bottom_height': 13.0}})
+    meshes = load_assembly('build')     # {module: placed (n, 3, 3) triangles}
+"""
+import os
+
+import numpy as np
+
+import stlIO
+from buildKit import MODULES, load_module
+from meshGeometry import as_triangles
+
+# Design fits checked by assemblyCheck.py
+MATING_PAIRS = (
+    ('photodiodeHousing', 'fingerHole'),
+    ('fingerHole', 'ledHousing'),
+    ('fingerHole', 'opticalFilterMountSlot'),
+    ('fingerHole', 'humiditySensorMountSlot'),
+    ('photodiodeHousing', 'opticalFilterMountSlot'),
+    ('ledHousing', 'opticalFilterMountSlot'),
+)
+
+
+def module_params(params=None):
+    """Full parameter dicts per module, given {module: overrides}."""
+    params = params or {}
+    return {name: dict(load_module(name).PARAMS, **params.get(name, {})) for name in MODULES}
+
+
+def rotation(axis, degrees):
+    """Rotation matrix about the X, Y or Z axis."""
+    c = np.cos(np.radians(degrees))
+    s = np.sin(np.radians(degrees))
+    i, j = {'x': (1, 2), 'y': (2, 0), 'z': (0, 1)}[axis]
+    matrix = np.eye(3)
+    matrix[i, i] = matrix[j, j] = c
+    matrix[i, j] = -s
+    matrix[j, i] = s
+    return np.round(matrix, 15)
+
+
+def compose(outer, inner):
+    """Placement applying inner first, then outer."""
+    (r_out, t_out), (r_in, t_in) = outer, inner
+    return r_out @ r_in, r_out @ t_in + t_out
+
+
+def transform(points, placement):
+    """Apply a (rotation, translation) placement to points or triangles."""
+    r, t = placement
+    return np.asarray(points, dtype=np.float64) @ r.T + t
+
+
+def placements(params=None):
+    """Return {module: (rotation matrix, translation)} for the assembled box."""
+    p = module_params(params)
+    photodiode = p['photodiodeHousing']
+    finger = p['fingerHole']
+    led = p['ledHousing']
+    humidity = p['humiditySensorMountSlot']
+
+    finger_z = photodiode['housing_height'] - finger['bottom_height']
+    finger_placement = (rotation('z', 90), np.array([0.0, 0.0, finger_z]))
+
+    led_z = finger_z + finger['bottom_height'] + finger['middle_height'] + led['box_height']
+
+    # Mount Z runs into the filter pocket (-Y of fingerHole), mount Y across its height
+    filter_in_finger = (
+        np.array([[-1.0, 0.0, 0.0], [0.0, 0.0, -1.0], [0.0, -1.0, 0.0]]),
+        np.array([0.0, finger['middle_length'] / 2, finger['bottom_height'] + 1 + finger['filter_height'] / 2]),
+    )
+
+    # Mount Z runs into the side pocket (+Y of fingerHole), mount Y along its height
+    humidity_in_finger = (
+        np.array([[1.0, 0.0, 0.0], [0.0, 0.0, 1.0], [0.0, -1.0, 0.0]]),
+        np.array([
+            -finger['finger_radius'] - 1 - finger['side_pocket_width'] / 2,
+            -finger['middle_length'] / 2 - humidity['base_plate_thickness'],
+            load_module('fingerHole').finger_center_z(finger),
+        ]),
+    )
+
+    return {
+        'photodiodeHousing': (np.eye(3), np.zeros(3)),
+        'fingerHole': finger_placement,
+        'ledHousing': (rotation('x', 180), np.array([0.0, 0.0, led_z])),
+        'opticalFilterMountSlot': compose(finger_placement, filter_in_finger),
+        'humiditySensorMountSlot': compose(finger_placement, humidity_in_finger),
+    }
+
+
+def mesh_path(mesh_dir, name):
+    return os.path.join(mesh_dir, load_module(name).MODULE_NAME + '.stl')
+
+
+def load_assembly(mesh_dir='.', params=None, meshes=None):
+    """Placed triangles of every module.
+
+    Meshes are read from <mesh_dir>/<MODULE_NAME>.stl unless given in
+    meshes ({module: stlIO array or triangles}), e.g. fresh sweep output.
+    """
+    meshes = meshes or {}
+    placed = {}
+    for name, placement in placements(params).items():
+        mesh = meshes[name] if name in meshes else stlIO.read_stl(mesh_path(mesh_dir, name))
+        placed[name] = transform(as_triangles(mesh), placement)
+    return placed
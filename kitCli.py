@@ -0,0 +1,103 @@
+"""One entry point for the kit, quick to start and free of the GUI.
+
+Commands import only what they use. The analysis commands never load
+FreeCAD (the builders get it through kernelLoader.py, on first use), so
+they answer in milliseconds; only build and show load the kernel:
+
+    python3 kitCli.py params                     # PARAMS of every module
+    python3 kitCli.py params ledHousing --json
+    python3 kitCli.py kit --set led_wall=2.4     # kitParams.py
+    python3 kitCli.py stats *.stl                # facet counts and sizes (stlIO.py)
+    python3 kitCli.py properties *.stl           # volume, mass, print time (meshProperties.py)
+    python3 kitCli.py build ledHousing --formats stl,3mf   # buildKit.py, same options
+    python3 kitCli.py show ledHousing            # FreeCAD GUI only
+"""
+import argparse
+import json
+import sys
+
+import booleanOps
+import buildKit
+from buildKit import MODULES
+
+
+def module_params(names):
+    """{module: PARAMS} without building anything."""
+    return {name: dict(buildKit.load_module(name).PARAMS) for name in names}
+
+
+def print_params(params):
+    for module, values in params.items():
+        print(module)
+        width = max(len(name) for name in values)
+        for name, value in values.items():
+            print('  %-*s %s' % (width, name, value))
+
+
+def cmd_params(args):
+    params = module_params(args.modules or MODULES)
+    if args.json:
+        json.dump(params, sys.stdout, indent=2)
+        print()
+    else:
+        print_params(params)
+    return 0
+
+
+def cmd_show(args):
+    import kernelLoader
+
+    if not kernelLoader.gui_up():
+        print('show needs the FreeCAD GUI; use "build" to export the part instead', file=sys.stderr)
+        return 2
+    module = buildKit.load_module(args.module)
+    module.show(module.build(cut_mode=args.cut_mode))
+    return 0
+
+
+# Commands that hand their arguments to another script's main()
+DELEGATED = (
+    ('kit', 'kitParams', 'shared kit parameters and what a change affects (no FreeCAD needed)'),
+    ('stats', 'stlIO', 'facet counts and bounding boxes of STL files (no FreeCAD needed)'),
+    ('properties', 'meshProperties', 'mass properties and print estimates of STL files (no FreeCAD needed)'),
+    ('build', 'buildKit', 'build and export modules headlessly'),
+)
+
+
+def _delegate(module_name, argv):
+    import importlib
+
+    result = importlib.import_module(module_name).main(argv)
+    return result if isinstance(result, int) else 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    scripts = {name: module_name for name, module_name, _help in DELEGATED}
+    if argv and argv[0] in scripts:
+        # Passed on unparsed: argparse.REMAINDER drops a leading option like --set
+        return _delegate(scripts[argv[0]], argv[1:])
+
+    parser = argparse.ArgumentParser(description='Kit commands: parameters, mesh statistics, builds.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    params = commands.add_parser('params', help='list module parameters (no FreeCAD needed)')
+    params.add_argument('modules', nargs='*', help='modules to list (default: all)')
+    params.add_argument('--json', action='store_true', help='print JSON')
+    params.set_defaults(run=cmd_params)
+
+    show = commands.add_parser('show', help='build a module and show it in the FreeCAD GUI')
+    show.add_argument('module', choices=MODULES)
+    show.add_argument('--cut-mode', default='batched', choices=booleanOps.CUT_MODES)
+    show.set_defaults(run=cmd_show)
+
+    for name, module_name, help_text in DELEGATED:
+        # Listed for --help only; main() hands these over before parsing
+        commands.add_parser(name, help='%s (%s.py arguments)' % (help_text, module_name))
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,272 @@
+"""One parameter model for the whole kit.
+
+The modules mate through dimensions that their scripts repeat as
+literals: the 34 x 50 footprint of ledHousing, fingerHole and
+photodiodeHousing, the fingerHole top tab ring 0.2 mm smaller than the
+46 x 30 LED groove and as wide as the groove between the walls and the
+42 x 26 platform, its bottom tab 0.8 mm smaller than the 46.6 x 30.6
+photodiode pocket, the 30 x 20 bottom pocket around the 12 mm photodiode
+mount, the filter mount 0.2 mm smaller than its 18 mm pocket. Here each of
+those is one base parameter (KIT), and DERIVED gives every module
+parameter that depends on them as an expression of the base ones:
+
+    kit = KitParams()
+    kit.module_params('fingerHole')          # {'middle_width': 50.0, 'top_width': 45.8, ...}
+    kit.dependencies()['ledHousing']         # base parameters ledHousing reads
+    kit.update({'led_wall': 2.4})            # ['fingerHole', 'ledHousing']: only these change
+
+A module's dependencies are recorded while its expressions run (as
+stepGraph records the parameters each step reads), so they cannot drift
+from the expressions. KitBuilder keeps one stepGraph.IncrementalBuilder
+per module and rebuilds only the modules, and within them only the
+steps, that a change reaches.
+
+The module scripts keep their literals so each still runs on its own in
+the FreeCAD console; `python3 kitParams.py` checks that they still agree
+with this model (exit status 1 when not).
+
+    python3 kitParams.py
+    python3 kitParams.py --set kit_width=36 filter_clearance=0.3
+    python3 buildKit.py --kit-set led_wall=2.4      # builds fingerHole and ledHousing only
+"""
+import argparse
+import sys
+
+from buildKit import MODULES, load_module, parse_overrides
+from stepGraph import IncrementalBuilder, TrackedParams
+
+# ---------------------------------------
+# Base parameters
+# ---------------------------------------
+KIT = {
+    # Footprint shared by ledHousing, fingerHole and photodiodeHousing
+    'kit_width': 34.0,
+    'kit_length': 50.0,
+
+    # Walls
+    'led_wall': 2.0,                # ledHousing side walls, and the groove inside them as wide
+    'photodiode_wall': 1.7,         # photodiodeHousing side walls
+    'photodiode_floor': 2.0,        # photodiodeHousing bottom plate
+
+    # Stack heights
+    'photodiode_height': 14.5,
+    'led_height': 16.0,
+    'led_base': 6.0,                # ledHousing floor below the groove
+
+    # The fingerHole top tab is this much smaller than the LED groove
+    'tab_clearance': 0.2,
+    # and its bottom tab this much smaller than the photodiodeHousing pocket
+    'photodiode_tab_clearance': 0.8,
+
+    # Photodiode mount cylinder, standing in the fingerHole bottom pocket,
+    # and the pocket's reach beyond it on each side
+    'photodiode_mount_radius': 6.0,
+    'mount_pocket_margin_length': 9.0,
+    'mount_pocket_margin_width': 4.0,
+
+    # Optical filter pocket in fingerHole and the mount sliding into it
+    'filter_width': 18.0,
+    'filter_thickness': 2.0,
+    'filter_depth': 30.0,
+    'filter_clearance': 0.2,
+
+    # Humidity sensor pocket in fingerHole and the mount block sliding into it
+    'humidity_pocket_width': 10.0,
+    'humidity_pocket_height': 18.0,
+    'humidity_clearance': 0.4,
+}
+
+# ---------------------------------------
+# Module parameters derived from KIT
+# ---------------------------------------
+DERIVED = {
+    'photodiodeHousing': {
+        'housing_width': lambda k: k['kit_width'],
+        'housing_length': lambda k: k['kit_length'],
+        'housing_height': lambda k: k['photodiode_height'],
+        'pocket_width': lambda k: k['kit_width'] - 2 * k['photodiode_wall'],
+        'pocket_length': lambda k: k['kit_length'] - 2 * k['photodiode_wall'],
+        'pocket_height': lambda k: k['photodiode_height'] - k['photodiode_floor'],
+        # The mount reaches the fingerHole bottom pocket ceiling
+        'mount_radius': lambda k: k['photodiode_mount_radius'],
+        'mount_height': lambda k: k['photodiode_height'] - k['photodiode_floor'],
+    },
+    'fingerHole': {
+        # Turned 90 degrees in the stack: its width runs along the kit length
+        'middle_width': lambda k: k['kit_length'],
+        'middle_length': lambda k: k['kit_width'],
+        # The bottom tab clips into the photodiodeHousing pocket
+        'bottom_width': lambda k: k['kit_length'] - 2 * k['photodiode_wall'] - k['photodiode_tab_clearance'],
+        'bottom_length': lambda k: k['kit_width'] - 2 * k['photodiode_wall'] - k['photodiode_tab_clearance'],
+        'bottom_height': lambda k: k['photodiode_height'] - k['photodiode_floor'],
+        # and its pocket takes the photodiode mount
+        'bottom_cut_width': lambda k: 2 * (k['photodiode_mount_radius'] + k['mount_pocket_margin_length']),
+        'bottom_cut_depth': lambda k: 2 * (k['photodiode_mount_radius'] + k['mount_pocket_margin_width']),
+        'top_width': lambda k: k['kit_length'] - 2 * k['led_wall'] - k['tab_clearance'],
+        'top_length': lambda k: k['kit_width'] - 2 * k['led_wall'] - k['tab_clearance'],
+        'top_height': lambda k: k['led_height'] - k['led_base'],
+        # The tab ring fills the groove, tab_clearance / 2 short of its inner side
+        'top_wall': lambda k: k['led_wall'] - k['tab_clearance'] / 2,
+        'filter_width': lambda k: k['filter_width'],
+        'filter_height': lambda k: k['filter_thickness'],
+        'filter_depth': lambda k: k['filter_depth'],
+        'side_pocket_width': lambda k: k['humidity_pocket_width'],
+        'side_pocket_height': lambda k: k['humidity_pocket_height'],
+    },
+    'ledHousing': {
+        'box_width': lambda k: k['kit_width'],
+        'box_length': lambda k: k['kit_length'],
+        'box_height': lambda k: k['led_height'],
+        'wall_thickness': lambda k: k['led_wall'],
+        'base_thickness': lambda k: k['led_base'],
+        # The groove between the side walls and the platform is led_wall wide
+        'platform_inset': lambda k: 2 * k['led_wall'],
+    },
+    'opticalFilterMountSlot': {
+        'mount_width': lambda k: k['filter_width'] - k['filter_clearance'],
+        'mount_length': lambda k: k['filter_thickness'] - k['filter_clearance'] / 2,
+        'mount_height': lambda k: k['filter_depth'] - k['filter_clearance'],
+        # The base plate covers the fingerHole side it slides into
+        'base_width': lambda k: k['kit_length'],
+    },
+    'humiditySensorMountSlot': {
+        'mount_block_width': lambda k: k['humidity_pocket_width'] - k['humidity_clearance'],
+        'mount_block_length': lambda k: k['humidity_pocket_height'] - k['humidity_clearance'],
+    },
+}
+
+
+class KitParams:
+    """Base parameter values and the module parameters derived from them."""
+
+    def __init__(self, values=None):
+        unknown = sorted(set(values or ()) - set(KIT))
+        if unknown:
+            raise ValueError('no kit parameter(s) %s' % ', '.join(unknown))
+        self.values = dict(KIT, **(values or {}))
+        self._derived, self._reads = self._evaluate(self.values)
+
+    @staticmethod
+    def _evaluate(values):
+        derived, reads = {}, {}
+        for module in MODULES:
+            tracked = TrackedParams(values)
+            derived[module] = {name: expression(tracked) for name, expression in DERIVED.get(module, {}).items()}
+            reads[module] = tracked.reads
+        return derived, reads
+
+    def module_params(self, module):
+        """Parameter overrides of one module (derived parameters only)."""
+        return dict(self._derived[module])
+
+    def params(self):
+        """{module: overrides} for all five modules, as buildKit and kitAssembly take them."""
+        return {module: self.module_params(module) for module in MODULES}
+
+    def dependencies(self):
+        """{module: sorted base parameters it reads}."""
+        return {module: sorted(reads) for module, reads in self._reads.items()}
+
+    def dependents(self, name):
+        """Modules reading base parameter name."""
+        return [module for module in MODULES if name in self._reads[module]]
+
+    def affected(self, changes):
+        """Modules whose derived parameters a change of base values would alter."""
+        derived, _reads = self._evaluate(dict(self.values, **changes))
+        return [module for module in MODULES if derived[module] != self._derived[module]]
+
+    def update(self, changes):
+        """Apply base value changes; returns the affected modules."""
+        unknown = sorted(set(changes) - set(KIT))
+        if unknown:
+            raise ValueError('no kit parameter(s) %s' % ', '.join(unknown))
+        affected = self.affected(changes)
+        self.values.update(changes)
+        self._derived, self._reads = self._evaluate(self.values)
+        return affected
+
+    def drift(self, tolerance=1e-9):
+        """[(module, parameter, script value, model value)] where a script's literal disagrees."""
+        mismatches = []
+        for module in MODULES:
+            defaults = load_module(module).PARAMS
+            for name, value in self._derived[module].items():
+                if abs(defaults[name] - value) > tolerance:
+                    mismatches.append((module, name, defaults[name], value))
+        return mismatches
+
+
+class KitBuilder:
+    """Builds the five modules from one KitParams, rebuilding only what a change reaches.
+
+        kit = KitBuilder()
+        shapes = kit.build()                            # all five
+        shapes = kit.build({'filter_clearance': 0.3})   # opticalFilterMountSlot only
+        kit.last_built                                  # ['opticalFilterMountSlot']
+    """
+
+    def __init__(self, kit=None, module_overrides=None):
+        self.kit = kit or KitParams()
+        # Per module parameters outside the kit model (e.g. tilt_angle_deg)
+        self.module_overrides = module_overrides or {}
+        self.builders = {module: IncrementalBuilder(load_module(module)) for module in MODULES}
+        self.shapes = {}
+        self.last_built = []
+
+    def params(self, module):
+        return dict(self.kit.module_params(module), **self.module_overrides.get(module, {}))
+
+    def build(self, changes=None):
+        """Apply base value changes and return {module: shape} of the whole kit."""
+        stale = self.kit.update(changes) if changes else []
+        self.last_built = []
+        for module in MODULES:
+            if module not in self.shapes or module in stale:
+                self.shapes[module] = self.builders[module].build(self.params(module))
+                self.last_built.append(module)
+        return dict(self.shapes)
+
+    def set_module_params(self, module, overrides):
+        """Change parameters of one module outside the kit model; only that module rebuilds."""
+        self.module_overrides[module] = dict(self.module_overrides.get(module, {}), **overrides)
+        self.shapes.pop(module, None)
+
+
+def kit_jobs(changes, modules=None):
+    """buildKit jobs for the modules a change of base values affects (all of modules if given)."""
+    kit = KitParams()
+    affected = kit.affected(changes)
+    kit.update(changes)
+    return [{'module': module, 'name': load_module(module).MODULE_NAME, 'params': kit.module_params(module)}
+            for module in (modules or affected)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Show the kit parameter model and what a change affects.')
+    parser.add_argument('--set', nargs='*', default=[], metavar='NAME=VALUE', help='base parameter changes')
+    args = parser.parse_args(argv)
+
+    kit = KitParams()
+    width = max(len(name) for name in KIT)
+    for name, value in kit.values.items():
+        print('%-*s %8g  -> %s' % (width, name, value, ', '.join(kit.dependents(name)) or '-'))
+
+    mismatches = kit.drift()
+    for module, name, script, model in mismatches:
+        print('DRIFT %s.%s: script %g, kit model %g' % (module, name, script, model))
+
+    changes = parse_overrides(args.set)
+    if changes:
+        before = kit.params()
+        affected = kit.update(changes)
+        print('rebuild: %s' % (', '.join(affected) or 'nothing'))
+        for module in affected:
+            after = kit.module_params(module)
+            print('  %s: %s' % (module, ', '.join('%s %g -> %g' % (name, before[module][name], value)
+                                                 for name, value in after.items() if before[module][name] != value)))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
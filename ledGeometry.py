@@ -0,0 +1,272 @@
+"""LED bore layout of ledHousing.py in NumPy, without FreeCAD.
+
+The LEDs sit on one or more tilted rings, each bore aimed at
+target_point. By default there is one ring of led_count LEDs built from
+ledHousing's scalar parameters (four at 90 degree steps). led_rings
+lists rings instead, e.g. one per wavelength band, each a dict with
+count, an optional phase_deg (azimuth of its first LED) and any of the
+RING_PARAMS it sets differently from the housing:
+
+    'led_rings': [{'count': 8, 'led_distance': 8.5},
+                  {'count': 8, 'led_distance': 11.0, 'tilt_angle_deg': 18.0,
+                   'phase_deg': 22.5, 'led_radius': 2.6}]
+
+Everything is computed for all LEDs of all rings at once, in LED order
+(ring by ring, counter-clockwise from phase_deg). Coordinates are in the
+ledHousing frame (before the housing is flipped into the assembly, see
+kitAssembly.py).
+
+Parameters may also be arrays, one entry per candidate design
+(target_point then has shape (n, 3)); results gain the same leading
+dimensions, so a whole parameter sweep is laid out in one call:
+
+    centers, beams = led_layout(ledHousing.PARAMS)
+    centers, beams = led_layout(dict(ledHousing.PARAMS, tilt_angle_deg=np.linspace(8, 16, 100)))
+    collisions(dict(ledHousing.PARAMS, led_count=8))     # bores that touch, or come closer than MIN_WALL
+
+    python3 ledGeometry.py --count 8 --distance 9.5     # layout and clearances of one ring
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+
+LED_COUNT = 4
+
+# ledHousing parameters a ring may set for its own LEDs
+RING_PARAMS = ('led_distance', 'tilt_angle_deg', 'led_plane_z', 'led_radius', 'led_depth',
+               'pin_radius', 'pin_spacing', 'pin_depth_actual')
+
+# Thinnest wall accepted between two holes, in mm (as designSweep.MIN_WALL)
+MIN_WALL = 0.8
+
+
+# ---------------------------------------
+# Rings
+# ---------------------------------------
+
+def rings(p):
+    """The LED rings of p as dicts: count, phase_deg and every RING_PARAMS value."""
+    specs = p.get('led_rings', ())
+    if len(specs) == 0:
+        specs = ({},)
+    result = []
+    for spec in specs:
+        ring = {
+            'count': int(np.asarray(spec.get('count', p.get('led_count', LED_COUNT))).item()),
+            'phase_deg': spec.get('phase_deg', 0.0),
+        }
+        for name in RING_PARAMS:
+            ring[name] = spec[name] if name in spec else p.get(name)
+        result.append(ring)
+    return result
+
+
+def led_count(p):
+    return sum(ring['count'] for ring in rings(p))
+
+
+def ring_index(p):
+    """Ring of each LED, (LED count,)."""
+    return np.repeat(np.arange(len(rings(p))), [ring['count'] for ring in rings(p)])
+
+
+def per_led(p, name):
+    """A RING_PARAMS value for every LED, (..., LED count); candidate arrays broadcast."""
+    ring_list = rings(p)
+    # Trailing axis for the LEDs, so candidate arrays broadcast against them
+    columns = [np.asarray(ring[name], dtype=np.float64)[..., None] for ring in ring_list]
+    lead = np.broadcast_shapes(*(column.shape[:-1] for column in columns))
+    return np.concatenate([np.broadcast_to(column, lead + (ring['count'],))
+                           for column, ring in zip(columns, ring_list)], axis=-1)
+
+
+def led_angles(p):
+    """Azimuth of each LED around the Z axis, in radians (0, 90, 180, 270 degrees by default)."""
+    return np.concatenate([np.radians(ring['phase_deg'] + np.arange(ring['count']) * 360.0 / ring['count'])
+                           for ring in rings(p)])
+
+
+# ---------------------------------------
+# Layout
+# ---------------------------------------
+
+def led_frames(p):
+    """All LED geometry in one pass, as arrays over (..., LED count):
+
+    centers (..., 3)         bore start, on the tilted ring
+    beams (..., 3)           unit bore axis, towards target_point
+    pin_lines (..., 3)       unit direction of the line the two pins sit on
+    pin_starts (..., 2, 3)   start of both pin holes
+    pin_directions (..., 3)  unit pin hole axis
+
+    The pins sit on the ring tangent, half pin_spacing either side
+    shortened by cos(tilt). For LEDs on the X and Y axes that is the
+    (sin, cos, 0) line ledHousing's original loop used. Both pin holes
+    run along -beam, as in that loop, which flipped the beam vector in
+    place (FreeCAD's Vector.multiply) for the first pin and reused it
+    for the second.
+    """
+    tilt = np.radians(per_led(p, 'tilt_angle_deg'))
+    distance = per_led(p, 'led_distance')
+    angles = led_angles(p)
+
+    centers = np.stack(np.broadcast_arrays(
+        distance * np.cos(angles) * np.cos(tilt),
+        distance * np.sin(angles) * np.cos(tilt),
+        per_led(p, 'led_plane_z') + distance * np.sin(tilt),
+    ), axis=-1)
+    beams = np.asarray(p['target_point'], dtype=np.float64)[..., None, :] - centers
+    beams /= np.linalg.norm(beams, axis=-1, keepdims=True)
+
+    pin_lines = np.stack(np.broadcast_arrays(-np.sin(angles), np.cos(angles), 0.0), axis=-1)
+    offsets = np.array([-1.0, 1.0]) * (per_led(p, 'pin_spacing') * np.cos(tilt) / 2)[..., None]
+    pin_starts = centers[..., None, :] + offsets[..., None] * pin_lines[..., None, :]
+    return {
+        'centers': centers,
+        'beams': beams,
+        'pin_lines': np.broadcast_to(pin_lines, centers.shape),
+        'pin_starts': pin_starts,
+        'pin_directions': -beams,
+    }
+
+
+def led_layout(p):
+    """Return (bore centers, unit beam directions), both (..., LED count, 3)."""
+    frames = led_frames(p)
+    return frames['centers'], frames['beams']
+
+
+def pin_layout(p):
+    """Return (pin hole starts (..., LED count, 2, 3), unit directions (..., LED count, 3))."""
+    frames = led_frames(p)
+    return frames['pin_starts'], frames['pin_directions']
+
+
+# ---------------------------------------
+# Clearance between holes
+# ---------------------------------------
+
+def segment_distance(a, u, b, v):
+    """Closest distance between segments a -> a + u and b -> b + v (..., 3), broadcasting."""
+    r = a - b
+    uu = np.einsum('...k,...k', u, u)
+    vv = np.einsum('...k,...k', v, v)
+    uv = np.einsum('...k,...k', u, v)
+    ur = np.einsum('...k,...k', u, r)
+    vr = np.einsum('...k,...k', v, r)
+    denom = uu * vv - uv * uv
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Parallel axes have no unique closest pair; any s works, take 0
+        s = np.where(denom > 1e-12 * uu * vv, np.clip((uv * vr - ur * vv) / denom, 0.0, 1.0), 0.0)
+        t = (uv * s + vr) / vv
+        s = np.where(t < 0, np.clip(-ur / uu, 0.0, 1.0), np.where(t > 1, np.clip((uv - ur) / uu, 0.0, 1.0), s))
+        t = np.clip(t, 0.0, 1.0)
+    return np.linalg.norm(r + s[..., None] * u - t[..., None] * v, axis=-1)
+
+
+def holes(p):
+    """Every bore and pin hole as (starts, axes, radii, LED of each hole).
+
+    starts and axes are (..., holes, 3), an axis running the full hole
+    depth; radii are (..., holes). Bores come first, then the pins of
+    each LED in turn.
+    """
+    frames = led_frames(p)
+    count = frames['centers'].shape[-2]
+    bores = frames['beams'] * per_led(p, 'led_depth')[..., None]
+    pins = frames['pin_directions'] * per_led(p, 'pin_depth_actual')[..., None]
+    led_radius, pin_radius = per_led(p, 'led_radius'), per_led(p, 'pin_radius')
+    lead = np.broadcast_shapes(bores.shape[:-2], pins.shape[:-2], frames['pin_starts'].shape[:-3],
+                               led_radius.shape[:-1], pin_radius.shape[:-1])
+
+    def fit(values, tail):
+        return np.broadcast_to(values, lead + tail)
+
+    starts = np.concatenate([fit(frames['centers'], (count, 3)),
+                             fit(frames['pin_starts'], (count, 2, 3)).reshape(lead + (2 * count, 3))], axis=-2)
+    axes = np.concatenate([fit(bores, (count, 3)), np.repeat(fit(pins, (count, 3)), 2, axis=-2)], axis=-2)
+    radii = np.concatenate([fit(led_radius, (count,)), np.repeat(fit(pin_radius, (count,)), 2, axis=-1)], axis=-1)
+    owner = np.concatenate([np.arange(count), np.repeat(np.arange(count), 2)])
+    return starts, axes, radii, owner
+
+
+def _clip_to_housing(p, starts, axes):
+    # Only material between the housing bottom and top matters: two bores
+    # that meet in the air above the platform leave no thin wall
+    z0, dz = starts[..., 2], axes[..., 2]
+    height = np.asarray(p['box_height'], dtype=np.float64)[..., None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        low, high = -z0 / dz, (height - z0) / dz
+    flat = np.abs(dz) < 1e-12
+    inside = (z0 >= 0) & (z0 <= height)
+    t0 = np.where(flat, np.where(inside, 0.0, 1.0), np.clip(np.minimum(low, high), 0.0, 1.0))
+    t1 = np.where(flat, np.where(inside, 1.0, 0.0), np.clip(np.maximum(low, high), 0.0, 1.0))
+    return starts + t0[..., None] * axes, (t1 - t0)[..., None] * axes, t1 > t0
+
+
+def clearances(p):
+    """Wall left between every two holes, (..., holes, holes) in mm (negative: they cut into each other).
+
+    Each hole is taken as the capsule around its axis segment, clipped
+    to the housing height, which encloses the cylinder: a clearance is
+    never overestimated. Holes of the same LED (its pins start inside
+    its bore) and holes wholly outside the housing count as infinitely
+    far apart.
+    """
+    starts, axes, radii, owner = holes(p)
+    starts, axes, present = _clip_to_housing(p, starts, axes)
+    gap = (segment_distance(starts[..., :, None, :], axes[..., :, None, :], starts[..., None, :, :], axes[..., None, :, :])
+           - radii[..., :, None] - radii[..., None, :])
+    apart = (owner[:, None] == owner[None, :]) | ~(present[..., :, None] & present[..., None, :])
+    return np.where(apart, np.inf, gap)
+
+
+def min_clearance(p):
+    """Thinnest wall between holes of different LEDs, per candidate."""
+    return clearances(p).min(axis=(-2, -1))
+
+
+def collisions(p, min_wall=MIN_WALL):
+    """[(hole, hole, clearance)] of hole pairs closer than min_wall, for one design.
+
+    Holes are named 'LED 3' or 'LED 3 pin 1' (LEDs and pins counted from 0).
+    """
+    gap = clearances(p)
+    count = led_count(p)
+    names = ['LED %d' % i for i in range(count)] + ['LED %d pin %d' % (i, k) for i in range(count) for k in (0, 1)]
+    first, second = np.nonzero(np.triu(gap < min_wall, 1))
+    return [(names[i], names[j], float(gap[i, j])) for i, j in zip(first, second)]
+
+
+def main(argv=None):
+    import buildKit
+
+    parser = argparse.ArgumentParser(description='Lay out the LED bores and check the walls between them.')
+    parser.add_argument('--count', type=int, help='LEDs on the ring (default: led_count)')
+    parser.add_argument('--distance', type=float, help='ring radius, led_distance')
+    parser.add_argument('--tilt', type=float, help='tilt_angle_deg')
+    parser.add_argument('--rings', help='JSON list of rings, as the led_rings parameter')
+    parser.add_argument('--min-wall', type=float, default=MIN_WALL, help='default: %s mm' % MIN_WALL)
+    args = parser.parse_args(argv)
+
+    p = dict(buildKit.load_module('ledHousing').PARAMS)
+    for name, value in (('led_count', args.count), ('led_distance', args.distance), ('tilt_angle_deg', args.tilt)):
+        if value is not None:
+            p[name] = value
+    if args.rings:
+        p['led_rings'] = json.loads(args.rings)
+
+    frames = led_frames(p)
+    for i, (ring, center, beam) in enumerate(zip(ring_index(p), frames['centers'], frames['beams'])):
+        print('LED %2d  ring %d  center %7.3f %7.3f %7.3f  beam %6.3f %6.3f %6.3f' % ((i, ring) + tuple(center) + tuple(beam)))
+    problems = collisions(p, args.min_wall)
+    print('thinnest wall between LEDs: %.3f mm' % min_clearance(p))
+    for first, second, gap in problems:
+        print('%s / %s: %.3f mm' % (first, second, gap))
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,473 @@
+"""Bounding-volume hierarchy over triangle meshes with batched queries.
+
+The tree is stored as flat NumPy arrays (node boxes, children, facet
+ranges). Queries never recurse per point: they advance a frontier of
+(query, node) pairs one level at a time, pruning whole batches with
+vectorized box tests, so thousands of points are answered together.
+
+    bvh = MeshBVH(tris)
+    distance, facet, closest = bvh.closest_points(points)
+    inside = bvh.contains(points)
+    near = bvh.proximity(other_bvh, max_distance=2.0)
+"""
+import numpy as np
+
+from meshGeometry import closest_points_on_triangles, ray_triangle_hits, triangle_distances, triangles_overlap
+
+# Generic directions for inside tests: never parallel to the axis-aligned
+# faces of the parts, and voted over so a ray grazing an edge cannot flip
+# the result
+INSIDE_DIRECTIONS = np.array([
+    [0.5773, 0.5774, 0.5775],
+    [-0.6123, 0.3137, 0.7258],
+    [0.2911, -0.8147, -0.5016],
+])
+
+# Facets face each other across a gap when both outward normals are within
+# 30 degrees of the gap direction; this keeps the corner between a face
+# resting on a floor and the floor itself from counting as a gap
+FACING_COS = np.cos(np.radians(30))
+
+
+def box_distances(points, lo, hi):
+    """Distance from points[i] to the axis-aligned box (lo[i], hi[i])."""
+    delta = np.maximum(np.maximum(lo - points, points - hi), 0.0)
+    return np.linalg.norm(delta, axis=1)
+
+
+def box_pair_distances(lo1, hi1, lo2, hi2):
+    """Distance between paired axis-aligned boxes (0 when they touch or overlap)."""
+    delta = np.maximum(np.maximum(lo1 - hi2, lo2 - hi1), 0.0)
+    return np.linalg.norm(delta, axis=1)
+
+
+def ray_box_entry(origins, inv_directions, lo, hi):
+    """Slab test: ray parameter where rays (with 1 / direction given) enter boxes, inf on a miss."""
+    with np.errstate(invalid='ignore'):
+        t1 = (lo - origins) * inv_directions
+        t2 = (hi - origins) * inv_directions
+    # fmin / fmax skip the NaN of a ray lying in a slab plane (0 * inf)
+    near = np.fmin(t1, t2)
+    far = np.fmax(t1, t2)
+    near = np.fmax(np.fmax(np.fmax(near[:, 0], near[:, 1]), near[:, 2]), 0.0)
+    far = np.fmin(np.fmin(far[:, 0], far[:, 1]), far[:, 2])
+    return np.where(far >= near, near, np.inf)
+
+
+def ray_box_hits(origins, inv_directions, lo, hi):
+    """Slab test: True where rays (with 1 / direction given) hit boxes at t >= 0."""
+    return np.isfinite(ray_box_entry(origins, inv_directions, lo, hi))
+
+
+def _unit_normals(tris):
+    normals = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return normals / np.where(lengths > 0, lengths, 1.0)
+
+
+class Proximity:
+    """Result of MeshBVH.proximity for one pair of meshes.
+
+    gap is the smallest distance between facing surfaces, facets in front
+    of each other's outward side that neither touch nor cross (None when
+    nothing is within max_distance); gap_points are the two closest points.
+    contact and crossing are (n, 2) arrays of facet index pairs that touch
+    within contact_tol or cross each other.
+    """
+
+    def __init__(self, gap, gap_points, gap_facets, contact, crossing):
+        self.gap = gap
+        self.gap_points = gap_points
+        self.gap_facets = gap_facets
+        self.contact = contact
+        self.crossing = crossing
+
+
+class MeshBVH:
+
+    def __init__(self, tris, leaf_size=4):
+        self.tris = np.asarray(tris, dtype=np.float64)
+        self.leaf_size = leaf_size
+        self._build()
+
+    # ---------------------------------------
+    # Construction
+    # ---------------------------------------
+    def _build(self):
+        # Built breadth first: every node of a level is split in one pass
+        tris = self.tris
+        n = len(tris)
+        facet_lo = tris.min(axis=1) if n else np.zeros((0, 3))
+        facet_hi = tris.max(axis=1) if n else np.zeros((0, 3))
+        centers = (facet_lo + facet_hi) / 2
+
+        order = np.arange(n)
+        lo, hi, left, right, starts, counts = [], [], [], [], [], []
+        level_start = np.zeros(1, dtype=np.intp)
+        level_count = np.array([n], dtype=np.intp)
+        first_id = 0
+
+        while len(level_start):
+            ids = np.arange(first_id, first_id + len(level_start))
+            nonempty = level_count > 0
+            level_lo = np.zeros((len(ids), 3))
+            level_hi = np.zeros((len(ids), 3))
+            if nonempty.any():
+                at = level_start[nonempty]
+                level_lo[nonempty] = np.minimum.reduceat(facet_lo[order], at, axis=0)
+                level_hi[nonempty] = np.maximum.reduceat(facet_hi[order], at, axis=0)
+            lo.append(level_lo)
+            hi.append(level_hi)
+            starts.append(level_start)
+            counts.append(level_count)
+
+            split = level_count > self.leaf_size
+            level_left = np.full(len(ids), -1, dtype=np.intp)
+            level_right = np.full(len(ids), -1, dtype=np.intp)
+            if split.any():
+                s_start, s_count = level_start[split], level_count[split]
+                # Positions (into order) covered by the nodes being split
+                owner = np.repeat(np.arange(len(s_start)), s_count)
+                offsets = np.cumsum(s_count) - s_count
+                positions = s_start[owner] + np.arange(s_count.sum()) - np.repeat(offsets, s_count)
+                c = centers[order[positions]]
+                spread = np.maximum.reduceat(c, offsets, axis=0) - np.minimum.reduceat(c, offsets, axis=0)
+                axis = spread.argmax(axis=1)
+                # Median split along the widest axis of the facet centers
+                key = c[np.arange(len(c)), axis[owner]]
+                order[positions] = order[positions[np.lexsort((key, owner))]]
+
+                half = s_count // 2
+                child_start = np.stack([s_start, s_start + half], axis=1).ravel()
+                child_count = np.stack([half, s_count - half], axis=1).ravel()
+                next_id = first_id + len(ids)
+                level_left[split] = next_id + 2 * np.arange(len(s_start))
+                level_right[split] = level_left[split] + 1
+            else:
+                child_start = child_count = np.zeros(0, dtype=np.intp)
+            left.append(level_left)
+            right.append(level_right)
+            first_id += len(ids)
+            level_start, level_count = child_start, child_count
+        self.depth = len(lo)
+
+        self.order = order
+        self.node_lo = np.concatenate(lo)
+        self.node_hi = np.concatenate(hi)
+        self.node_left = np.concatenate(left)
+        self.node_right = np.concatenate(right)
+        self.node_start = np.concatenate(starts)
+        self.node_count = np.concatenate(counts)
+
+    def _leaf_facets(self, nodes):
+        """Expand leaf nodes into (position in `nodes`, facet id) pairs."""
+        counts = self.node_count[nodes]
+        owner = np.repeat(np.arange(len(nodes)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return owner, self.order[self.node_start[nodes][owner] + offsets]
+
+    # ---------------------------------------
+    # Closest point queries
+    # ---------------------------------------
+    def _descend(self, points):
+        """Greedy walk to one leaf per point, giving a first distance bound."""
+        nodes = np.zeros(len(points), dtype=np.intp)
+        while True:
+            inner = self.node_left[nodes] >= 0
+            if not inner.any():
+                break
+            idx = np.flatnonzero(inner)
+            l, r = self.node_left[nodes[idx]], self.node_right[nodes[idx]]
+            dl = box_distances(points[idx], self.node_lo[l], self.node_hi[l])
+            dr = box_distances(points[idx], self.node_lo[r], self.node_hi[r])
+            nodes[idx] = np.where(dl <= dr, l, r)
+        owner, facets = self._leaf_facets(nodes)
+        dist = np.linalg.norm(points[owner] - closest_points_on_triangles(points[owner], self.tris[facets]),
+                              axis=1)
+        best = np.full(len(points), np.inf)
+        np.minimum.at(best, owner, dist)
+        return best
+
+    def closest_points(self, points, upper=None, chunk=8192):
+        """Exact nearest surface point for each query point.
+
+        upper optionally gives a known upper bound per point (e.g. from a
+        KD-tree over surface samples) to prune the traversal from the start.
+        Returns (distance, facet index, closest point).
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        results = [self._closest(points[i:i + chunk], None if upper is None else upper[i:i + chunk])
+                   for i in range(0, len(points), chunk)]
+        if not results:
+            return np.zeros(0), np.zeros(0, dtype=np.intp), np.zeros((0, 3))
+        return tuple(np.concatenate(parts) for parts in zip(*results))
+
+    def _closest(self, points, upper):
+        m = len(points)
+        best = self._descend(points) if upper is None else np.asarray(upper, dtype=np.float64).copy()
+        # Keep a hair of slack so facets exactly at the bound are still visited
+        best = best * (1 + 1e-9) + 1e-12
+        best_facet = np.full(m, -1, dtype=np.intp)
+        best_point = np.zeros((m, 3))
+
+        qi = np.arange(m)
+        ni = np.zeros(m, dtype=np.intp)
+        while len(qi):
+            keep = box_distances(points[qi], self.node_lo[ni], self.node_hi[ni]) <= best[qi]
+            qi, ni = qi[keep], ni[keep]
+            leaf = self.node_left[ni] < 0
+
+            if leaf.any():
+                owner, facets = self._leaf_facets(ni[leaf])
+                lq = qi[leaf][owner]
+                closest = closest_points_on_triangles(points[lq], self.tris[facets])
+                dist = np.linalg.norm(points[lq] - closest, axis=1)
+                # Smallest distance per query within this batch, then merge
+                order = np.lexsort((dist, lq))
+                first = np.ones(len(order), dtype=bool)
+                first[1:] = lq[order][1:] != lq[order][:-1]
+                pick = order[first]
+                better = dist[pick] <= best[lq[pick]]
+                pick = pick[better]
+                best[lq[pick]] = dist[pick]
+                best_facet[lq[pick]] = facets[pick]
+                best_point[lq[pick]] = closest[pick]
+
+            inner = ~leaf
+            qi = np.repeat(qi[inner], 2)
+            ni = np.stack([self.node_left[ni[inner]], self.node_right[ni[inner]]], axis=1).ravel()
+        return best, best_facet, best_point
+
+    # ---------------------------------------
+    # Mesh against mesh
+    # ---------------------------------------
+    def _leaf_pair_facets(self, other, na, nb):
+        """Expand leaf node pairs into all (facet of self, facet of other) pairs."""
+        ca, cb = self.node_count[na], other.node_count[nb]
+        sizes = ca * cb
+        owner = np.repeat(np.arange(len(na)), sizes)
+        local = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        ia, ib = np.divmod(local, cb[owner])
+        return (self.order[self.node_start[na][owner] + ia],
+                other.order[other.node_start[nb][owner] + ib])
+
+    def proximity(self, other, max_distance=np.inf, contact_tol=1e-4, batch=16384):
+        """Contacts, crossings and the smallest facing gap between this mesh and other.
+
+        Both trees are walked together as a frontier of node pairs; a pair
+        is dropped once its boxes are further apart than the best gap found
+        so far. Leaf pairs are compared nearest first, in batches, so the
+        bound tightens before the bulk of the candidates is looked at.
+        """
+        state = {
+            'best': float(max_distance), 'gap_points': None, 'gap_facets': None,
+            'contact': [], 'crossing': [],
+        }
+        normals_a = _unit_normals(self.tris)
+        normals_b = _unit_normals(other.tris)
+
+        na = np.zeros(1, dtype=np.intp)
+        nb = np.zeros(1, dtype=np.intp)
+        while len(na):
+            lb = box_pair_distances(self.node_lo[na], self.node_hi[na], other.node_lo[nb], other.node_hi[nb])
+            keep = lb <= max(state['best'], contact_tol)
+            na, nb, lb = na[keep], nb[keep], lb[keep]
+            leaf_a = self.node_left[na] < 0
+            leaf_b = other.node_left[nb] < 0
+
+            leaves = np.flatnonzero(leaf_a & leaf_b)
+            leaves = leaves[np.argsort(lb[leaves], kind='stable')]
+            sizes = np.cumsum(self.node_count[na[leaves]] * other.node_count[nb[leaves]])
+            done = 0
+            while done < len(leaves):
+                stop = max(np.searchsorted(sizes, sizes[done] - sizes[done] % batch + batch), done + 1)
+                chunk = leaves[done:stop]
+                chunk = chunk[lb[chunk] <= max(state['best'], contact_tol)]
+                fa, fb = self._leaf_pair_facets(other, na[chunk], nb[chunk])
+                self._compare_facets(other, fa, fb, normals_a, normals_b, contact_tol, state)
+                done = stop
+
+            # Split the node with more facets, or whichever is not a leaf
+            inner = ~(leaf_a & leaf_b)
+            na, nb = na[inner], nb[inner]
+            leaf_a, leaf_b = leaf_a[inner], leaf_b[inner]
+            split_a = ~leaf_a & (leaf_b | (self.node_count[na] >= other.node_count[nb]))
+            sa, sb = na[split_a], nb[split_a]
+            ta, tb = na[~split_a], nb[~split_a]
+            na = np.concatenate([self.node_left[sa], self.node_right[sa], ta, ta])
+            nb = np.concatenate([sb, sb, other.node_left[tb], other.node_right[tb]])
+
+        empty = np.zeros((0, 2), dtype=np.intp)
+        return Proximity(
+            state['best'] if state['gap_points'] is not None else None, state['gap_points'], state['gap_facets'],
+            np.concatenate(state['contact']) if state['contact'] else empty,
+            np.concatenate(state['crossing']) if state['crossing'] else empty,
+        )
+
+    def _compare_facets(self, other, fa, fb, normals_a, normals_b, contact_tol, state):
+        # Facet boxes prune most pairs before any exact test
+        ta, tb = self.tris[fa], other.tris[fb]
+        lb = box_pair_distances(ta.min(axis=1), ta.max(axis=1), tb.min(axis=1), tb.max(axis=1))
+        near = np.flatnonzero(lb <= max(state['best'], contact_tol))
+        fa, fb, ta, tb, lb = fa[near], fb[near], ta[near], tb[near], lb[near]
+
+        crosses = np.zeros(len(fa), dtype=bool)
+        touching = np.flatnonzero(lb <= contact_tol)
+        crosses[touching] = triangles_overlap(ta[touching], tb[touching], contact_tol)
+        dist, pa, pb = triangle_distances(ta, tb)
+        touches = ~crosses & (dist <= contact_tol)
+        state['crossing'].append(np.stack([fa[crosses], fb[crosses]], axis=1))
+        state['contact'].append(np.stack([fa[touches], fb[touches]], axis=1))
+
+        # A gap is measured between surfaces facing each other across it
+        offset = (pb - pa) / np.maximum(dist, 1e-300)[:, None]
+        facing = ((np.einsum('ij,ij->i', offset, normals_a[fa]) > FACING_COS)
+                  & (np.einsum('ij,ij->i', offset, normals_b[fb]) < -FACING_COS))
+        gaps = np.flatnonzero(~crosses & ~touches & facing)
+        if len(gaps):
+            i = gaps[dist[gaps].argmin()]
+            if dist[i] < state['best']:
+                state['best'] = float(dist[i])
+                state['gap_points'] = (pa[i], pb[i])
+                state['gap_facets'] = (int(fa[i]), int(fb[i]))
+
+    # ---------------------------------------
+    # Ray queries
+    # ---------------------------------------
+    def ray_intersections(self, origins, directions, chunk=8192):
+        """Every facet hit by every ray (t > 0).
+
+        Returns (ray index, ray parameter t, facet index) arrays sorted by
+        ray, then t.
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.broadcast_to(np.asarray(directions, dtype=np.float64), origins.shape)
+        parts = [self._ray_intersections(origins[i:i + chunk], directions[i:i + chunk], i)
+                 for i in range(0, len(origins), chunk)]
+        if not parts:
+            return np.zeros(0, dtype=np.intp), np.zeros(0), np.zeros(0, dtype=np.intp)
+        rays, t, facets = (np.concatenate(p) for p in zip(*parts))
+        order = np.lexsort((t, rays))
+        return rays[order], t[order], facets[order]
+
+    def _ray_intersections(self, origins, directions, offset):
+        with np.errstate(divide='ignore'):
+            inv = 1.0 / directions
+        rays, params, hit_facets = [np.zeros(0, dtype=np.intp)], [np.zeros(0)], [np.zeros(0, dtype=np.intp)]
+        qi = np.arange(len(origins))
+        ni = np.zeros(len(origins), dtype=np.intp)
+        while len(qi):
+            keep = ray_box_hits(origins[qi], inv[qi], self.node_lo[ni], self.node_hi[ni])
+            qi, ni = qi[keep], ni[keep]
+            leaf = self.node_left[ni] < 0
+            if leaf.any():
+                owner, facets = self._leaf_facets(ni[leaf])
+                lq = qi[leaf][owner]
+                t = ray_triangle_hits(origins[lq], directions[lq], self.tris[facets])
+                hit = np.isfinite(t)
+                rays.append(lq[hit] + offset)
+                params.append(t[hit])
+                hit_facets.append(facets[hit])
+            inner = ~leaf
+            qi = np.repeat(qi[inner], 2)
+            ni = np.stack([self.node_left[ni[inner]], self.node_right[ni[inner]]], axis=1).ravel()
+        return np.concatenate(rays), np.concatenate(params), np.concatenate(hit_facets)
+
+    def first_hits(self, origins, directions, t_max=np.inf, chunk=8192):
+        """Nearest facet hit by each ray (0 < t <= t_max, scalar or per ray).
+
+        Returns (t, facet index), with t = inf and facet = -1 for misses.
+        Every ray walks the tree depth first with its own stack, nearer
+        child first, and skips boxes entered beyond its nearest hit so
+        far (or beyond t_max, which keeps shadow rays cheap). All rays
+        take one step per iteration.
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.broadcast_to(np.asarray(directions, dtype=np.float64), origins.shape)
+        t_max = np.broadcast_to(np.asarray(t_max, dtype=np.float64), len(origins))
+        t = np.full(len(origins), np.inf)
+        facets = np.full(len(origins), -1, dtype=np.intp)
+        for i in range(0, len(origins), chunk):
+            t[i:i + chunk], facets[i:i + chunk] = self._first_hits(origins[i:i + chunk], directions[i:i + chunk],
+                                                                   t_max[i:i + chunk])
+        return t, facets
+
+    def _first_hits(self, origins, directions, t_max):
+        m = len(origins)
+        with np.errstate(divide='ignore'):
+            inv = 1.0 / directions
+        best = t_max.copy()
+        best_facet = np.full(m, -1, dtype=np.intp)
+
+        def test_leaves(rays, nodes):
+            owner, facets = self._leaf_facets(nodes)
+            lq = rays[owner]
+            t = ray_triangle_hits(origins[lq], directions[lq], self.tris[facets])
+            better = t < best[lq]
+            # Write the nearest of several hits per ray last
+            order = np.argsort(-t[better], kind='stable')
+            lq = lq[better][order]
+            best[lq] = t[better][order]
+            best_facet[lq] = facets[better][order]
+
+        # One stack row per ray; depth first needs at most one slot per level
+        stack = np.zeros((m, self.depth + 1), dtype=np.intp)
+        stack_t = np.zeros((m, self.depth + 1))
+        size = np.ones(m, dtype=np.intp)
+        stack_t[:, 0] = ray_box_entry(origins, inv, self.node_lo[[0] * m], self.node_hi[[0] * m])
+
+        active = np.flatnonzero(stack_t[:, 0] < np.inf)
+        while len(active) > max(256, m // 64):
+            size[active] -= 1
+            node = stack[active, size[active]]
+            visit = stack_t[active, size[active]] <= best[active]
+            rays, node = active[visit], node[visit]
+            leaf = self.node_left[node] < 0
+            if leaf.any():
+                test_leaves(rays[leaf], node[leaf])
+
+            rays, node = rays[~leaf], node[~leaf]
+            if len(rays):
+                left, right = self.node_left[node], self.node_right[node]
+                t_left = ray_box_entry(origins[rays], inv[rays], self.node_lo[left], self.node_hi[left])
+                t_right = ray_box_entry(origins[rays], inv[rays], self.node_lo[right], self.node_hi[right])
+                swap = t_right < t_left
+                # Push the far child first so the near one is popped next
+                for child, t_child in ((np.where(swap, left, right), np.maximum(t_left, t_right)),
+                                       (np.where(swap, right, left), np.minimum(t_left, t_right))):
+                    push = (t_child < np.inf) & (t_child <= best[rays])
+                    r = rays[push]
+                    stack[r, size[r]] = child[push]
+                    stack_t[r, size[r]] = t_child[push]
+                    size[r] += 1
+            active = np.flatnonzero(size > 0)
+
+        # The few rays still walking (grazing long runs of boxes) finish
+        # breadth first from their pending stack entries
+        slots = np.arange(self.depth + 1)[None, :] < size[active, None]
+        qi = np.repeat(active, size[active])
+        ni = stack[active][slots]
+        while len(qi):
+            entry = ray_box_entry(origins[qi], inv[qi], self.node_lo[ni], self.node_hi[ni])
+            keep = (entry < np.inf) & (entry <= best[qi])
+            qi, ni = qi[keep], ni[keep]
+            leaf = self.node_left[ni] < 0
+            if leaf.any():
+                test_leaves(qi[leaf], ni[leaf])
+            inner = ~leaf
+            qi = np.repeat(qi[inner], 2)
+            ni = np.stack([self.node_left[ni[inner]], self.node_right[ni[inner]]], axis=1).ravel()
+        best[best_facet < 0] = np.inf
+        return best, best_facet
+
+    def ray_hits(self, origins, directions):
+        """Number of facets hit by each ray (t > 0)."""
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        rays = self.ray_intersections(origins, directions)[0]
+        return np.bincount(rays, minlength=len(origins))
+
+    def contains(self, points):
+        """True for points inside the (closed) mesh, by majority vote of ray parity."""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        votes = sum(self.ray_hits(points, direction) % 2 for direction in INSIDE_DIRECTIONS)
+        return votes >= 2
@@ -0,0 +1,158 @@
+"""Geometric regression check of regenerated meshes against committed STLs.
+
+For each pair of meshes the surface of one is sampled and every sample
+is matched to the exact nearest point of the other surface: a KD-tree
+nearest-neighbour query over surface samples bounds the distance and a
+BVH finishes the search (see SurfaceIndex). Both directions together give the
+symmetric Hausdorff and mean surface distances; volume and bounding-box
+deltas come straight from the triangles.
+
+    python3 buildKit.py --out build
+    python3 meshCompare.py build            # compare build/*.stl with ./*.stl
+    python3 meshCompare.py build --tolerance 0.01 --json report.json
+
+The exit status is 1 when any part drifts beyond the tolerance, or when
+no candidate has a reference to compare with, so the command can gate CI.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+import stlIO
+from meshBVH import MeshBVH
+from meshGeometry import (as_triangles, bounds, cover_points, point_triangle_distances, sample_surface,
+                          signed_volume, triangle_areas)
+
+
+class SurfaceIndex:
+    """Exact point-to-surface distances for one mesh.
+
+    A KD-tree over covering surface samples (see meshGeometry.cover_points)
+    finds the k nearest samples of each query; the exact distance to
+    their facets is an upper bound within 2 * spacing of the true value.
+    A BVH traversal seeded with that bound then prunes almost everything
+    and returns the exact nearest facet.
+    """
+
+    def __init__(self, tris, spacing, k=2):
+        self.tris = tris
+        self.k = k
+        self.points, self.facets = cover_points(tris, spacing)
+        self.tree = cKDTree(self.points)
+        self._bvh = None
+
+    @property
+    def bvh(self):
+        # Built on first use: identical meshes rarely need it
+        if self._bvh is None:
+            self._bvh = MeshBVH(self.tris)
+        return self._bvh
+
+    def upper_bounds(self, query):
+        k = min(self.k, len(self.points))
+        _dist, idx = self.tree.query(query, k=k)
+        candidates = self.facets[idx.reshape(len(query), k)]
+        bound = point_triangle_distances(np.repeat(query, k, axis=0), self.tris[candidates.ravel()])
+        return bound.reshape(len(query), k).min(axis=1)
+
+    def distances(self, query):
+        dist = self.upper_bounds(query)
+        # A zero bound is already exact; only the rest need the BVH
+        refine = np.flatnonzero(dist > 1e-12)
+        if len(refine):
+            dist[refine] = self.bvh.closest_points(query[refine], upper=dist[refine])[0]
+        return dist
+
+
+def default_spacing(*meshes, samples=10000):
+    """Sample spacing giving roughly `samples` points on the larger mesh."""
+    area = max(triangle_areas(tris).sum() for tris in meshes)
+    return float(np.sqrt(area / samples)) if area > 0 else 1.0
+
+
+def compare_meshes(candidate, reference, samples=10000, seed=0):
+    """Compare two meshes (stlIO arrays or (n, 3, 3) triangles) and return a report dict."""
+    a = as_triangles(candidate)
+    b = as_triangles(reference)
+    spacing = default_spacing(a, b, samples=samples)
+    rng = np.random.default_rng(seed)
+
+    # Random surface samples plus every corner, so sharp features are never missed
+    query_a = np.concatenate([sample_surface(a, samples, rng)[0], a.reshape(-1, 3)])
+    query_b = np.concatenate([sample_surface(b, samples, rng)[0], b.reshape(-1, 3)])
+    a_to_b = SurfaceIndex(b, spacing).distances(query_a)
+    b_to_a = SurfaceIndex(a, spacing).distances(query_b)
+
+    volume_a = signed_volume(a)
+    volume_b = signed_volume(b)
+    lo_a, hi_a = bounds(a)
+    lo_b, hi_b = bounds(b)
+    return {
+        'facets': [len(a), len(b)],
+        'hausdorff': float(max(a_to_b.max(), b_to_a.max())),
+        'mean_distance': float((a_to_b.mean() + b_to_a.mean()) / 2),
+        'volume': [float(volume_a), float(volume_b)],
+        'volume_delta': float(volume_a - volume_b),
+        'volume_delta_rel': float((volume_a - volume_b) / volume_b) if volume_b else float('inf'),
+        'bbox_min_delta': (lo_a - lo_b).tolist(),
+        'bbox_max_delta': (hi_a - hi_b).tolist(),
+    }
+
+
+def compare_files(candidate_path, reference_path, **kwargs):
+    return compare_meshes(stlIO.read_stl(candidate_path), stlIO.read_stl(reference_path), **kwargs)
+
+
+def drifted(report, tolerance):
+    bbox = max(np.abs(report['bbox_min_delta']).max(), np.abs(report['bbox_max_delta']).max())
+    return report['hausdorff'] > tolerance or bbox > tolerance
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare regenerated STLs with reference STLs.')
+    parser.add_argument('candidates', help='directory (or single STL) of regenerated meshes')
+    parser.add_argument('--reference', default='.', help='directory of reference STLs (default: .)')
+    parser.add_argument('--tolerance', type=float, default=0.01,
+                        help='allowed Hausdorff / bounding box drift in mm (default: 0.01)')
+    parser.add_argument('--samples', type=int, default=10000, help='surface samples per mesh')
+    parser.add_argument('--json', help='write the full report to this file')
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.candidates):
+        candidates = sorted(glob.glob(os.path.join(args.candidates, '*.stl')))
+    else:
+        candidates = [args.candidates]
+
+    reports = {}
+    failed = False
+    for path in candidates:
+        name = os.path.basename(path)
+        reference = os.path.join(args.reference, name)
+        if not os.path.exists(reference):
+            print('%-36s no reference mesh, skipped' % name)
+            continue
+        report = compare_files(path, reference, samples=args.samples)
+        report['drifted'] = drifted(report, args.tolerance)
+        failed = failed or report['drifted']
+        reports[name] = report
+        print('%-36s hausdorff %8.4f  mean %8.4f  volume %+9.3f mm3 (%+.3f%%)  %s' % (
+            name, report['hausdorff'], report['mean_distance'], report['volume_delta'],
+            100 * report['volume_delta_rel'], 'DRIFT' if report['drifted'] else 'ok'))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+    if not reports:
+        # Nothing compared is no proof of anything: fail rather than pass a CI gate
+        print('no candidate mesh has a reference in %s' % args.reference, file=sys.stderr)
+        return 1
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""Indexed mesh export: welded vertices, 3MF / PLY / OBJ output.
+
+An STL repeats every corner once per facet. Welding merges corners that
+fall within a tolerance of each other into one shared vertex, so a mesh
+becomes a vertex array plus (n, 3) face indices, and the indexed formats
+store each vertex once:
+
+- 3mf: one zip with every part as a named object (optionally placed in
+  the assembled box, see kitAssembly.py)
+- ply: binary little-endian, float32 vertices, int32 faces
+- obj: text, for tools that read nothing else
+
+Inputs are module names, built and tessellated at the given deflection
+(MeshPart when FreeCAD has it, Shape.tessellate otherwise), or existing
+STL files, which are only welded:
+
+    python3 meshExport.py --out export --formats 3mf,ply --linear 0.05 --angular 0.3
+    python3 meshExport.py *.stl --formats ply,obj --compress
+    python3 meshExport.py --formats 3mf --assembly      # one 3MF of the stacked box
+
+With --compress, PLY, OBJ and STL files are gzipped (.ply.gz, ...); a
+3MF is always a deflated zip.
+"""
+import argparse
+import gzip
+import io
+import os
+import struct
+import sys
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+import stlIO
+
+FORMATS = ('3mf', 'ply', 'obj', 'stl')
+
+DEFAULT_LINEAR = 0.1
+DEFAULT_ANGULAR = 0.5
+DEFAULT_WELD = 1e-5
+
+# Large primes for the spatial hash of quantized coordinates
+HASH_PRIMES = np.array([73856093, 19349663, 83492791], dtype=np.int64)
+
+
+# ---------------------------------------
+# Tessellation and welding
+# ---------------------------------------
+
+def shape_mesh(shape, linear=DEFAULT_LINEAR, angular=DEFAULT_ANGULAR):
+    """(vertices, faces) of a Part.Shape at the given deflection.
+
+    linear is the largest chord deviation in mm, angular the largest
+    angle in radians between adjacent facets of a curved face. Without
+    MeshPart only the linear deflection applies.
+    """
+    try:
+        import MeshPart
+    except ImportError:
+        points, facets = shape.tessellate(linear)
+    else:
+        mesh = MeshPart.meshFromShape(Shape=shape, LinearDeflection=linear,
+                                      AngularDeflection=angular, Relative=False)
+        points, facets = mesh.Topology
+    vertices = np.array([(p.x, p.y, p.z) for p in points], dtype=np.float64).reshape(-1, 3)
+    faces = np.array(facets, dtype=np.int64).reshape(-1, 3)
+    return vertices, faces
+
+
+def triangle_mesh(tris):
+    """Unwelded (vertices, faces) of (n, 3, 3) triangles."""
+    tris = np.asarray(tris, dtype=np.float64).reshape(-1, 3, 3)
+    return tris.reshape(-1, 3), np.arange(3 * len(tris), dtype=np.int64).reshape(-1, 3)
+
+
+def _unique_rows(keys):
+    """(first index, inverse) of the unique rows of an (n, 3) int64 array.
+
+    Rows are hashed to one int64 each, so the unique pass is a 1-D sort.
+    A hash collision merging two different rows is detected and falls
+    back to the exact (slower) row-wise unique.
+    """
+    hashes = keys @ HASH_PRIMES
+    hashes ^= hashes >> 29
+    _, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    if np.array_equal(keys[first][inverse], keys):
+        return first, inverse
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    return first, inverse.reshape(-1)
+
+
+def weld(vertices, faces, tolerance=DEFAULT_WELD):
+    """Merge vertices within tolerance, drop collapsed faces and unused vertices.
+
+    Coordinates are snapped to a tolerance grid, so two corners closer
+    than tolerance can still land in neighbouring cells; tessellators
+    repeat shared corners bit for bit, which is the case that matters.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    keys = np.floor(vertices / tolerance + 0.5).astype(np.int64)
+    first, inverse = _unique_rows(keys)
+    faces = inverse[faces]
+    faces = faces[(faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])]
+
+    used, faces = np.unique(faces, return_inverse=True)
+    return vertices[first[used]], faces.reshape(-1, 3)
+
+
+def corner_ids(tris, tolerance=DEFAULT_WELD):
+    """(n, 3) welded vertex index of every corner of (n, 3, 3) triangles, facets kept as they are."""
+    keys = np.floor(np.asarray(tris, dtype=np.float64).reshape(-1, 3) / tolerance + 0.5).astype(np.int64)
+    return _unique_rows(keys)[1].reshape(-1, 3)
+
+
+def stl_mesh(path, tolerance=DEFAULT_WELD):
+    """Welded (vertices, faces) of an STL file."""
+    return weld(*triangle_mesh(stlIO.read_stl(path)['vertices']), tolerance)
+
+
+# ---------------------------------------
+# Writers
+# ---------------------------------------
+
+def ply_bytes(vertices, faces, comment='written by meshExport.py', face_properties=()):
+    """Binary PLY; face_properties is a list of (name, PLY type, values) stored per face."""
+    types = {'uchar': 'u1', 'int': '<i4', 'float': '<f4'}
+    header = '\n'.join([
+        'ply',
+        'format binary_little_endian 1.0',
+        'comment %s' % comment,
+        'element vertex %d' % len(vertices),
+        'property float x',
+        'property float y',
+        'property float z',
+        'element face %d' % len(faces),
+        'property list uchar int vertex_indices',
+    ] + ['property %s %s' % (kind, name) for name, kind, _values in face_properties] + [
+        'end_header',
+    ]) + '\n'
+    records = np.empty(len(faces), dtype=np.dtype([('count', 'u1'), ('indices', '<i4', (3,))]
+                                                  + [(name, types[kind]) for name, kind, _values in face_properties]))
+    records['count'] = 3
+    records['indices'] = faces
+    for name, _kind, values in face_properties:
+        records[name] = values
+    return (header.encode('ascii') + np.ascontiguousarray(vertices, dtype='<f4').tobytes()
+            + records.tobytes())
+
+
+def obj_bytes(vertices, faces, name=None):
+    out = io.StringIO()
+    out.write('# written by meshExport.py\n')
+    if name:
+        out.write('o %s\n' % name)
+    np.savetxt(out, vertices, fmt='v %.6g %.6g %.6g')
+    np.savetxt(out, faces + 1, fmt='f %d %d %d')
+    return out.getvalue().encode('ascii')
+
+
+def stl_bytes(vertices, faces):
+    out = io.BytesIO()
+    facets = stlIO.make_facets(vertices[faces].astype(np.float32))
+    out.write(stlIO._header_bytes(stlIO.DEFAULT_HEADER))
+    out.write(struct.pack('<I', len(facets)))
+    out.write(facets.tobytes())
+    return out.getvalue()
+
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+    '</Types>'
+)
+
+RELATIONSHIPS = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+    'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+    '</Relationships>'
+)
+
+
+def _xml_rows(fmt, rows):
+    """Every row of a 2-D array formatted with fmt, one line each."""
+    out = io.StringIO()
+    np.savetxt(out, rows, fmt=fmt)
+    return out.getvalue()
+
+
+def _transform_attr(placement):
+    """3MF transform of a (rotation, translation) placement (row vectors, 4x3)."""
+    rotation, translation = placement
+    values = np.concatenate([np.asarray(rotation, dtype=np.float64).T.ravel(), translation]) + 0.0
+    return ' '.join('%.9g' % value for value in values)
+
+
+def model_xml(parts, placements=None):
+    """3MF model document of parts [(name, vertices, faces)].
+
+    placements ({name: (rotation, translation)}) positions build items;
+    parts without one are placed where they are. A list of placements
+    builds the part once per entry, all items sharing one mesh.
+    """
+    placements = placements or {}
+    out = io.StringIO()
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+              '<model unit="millimeter" xml:lang="en-US" '
+              'xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">\n<resources>\n')
+    for index, (name, vertices, faces) in enumerate(parts, 1):
+        out.write('<object id="%d" name="%s" type="model"><mesh><vertices>\n' % (index, escape(name, {'"': '&quot;'})))
+        out.write(_xml_rows('<vertex x="%.6g" y="%.6g" z="%.6g"/>', vertices))
+        out.write('</vertices><triangles>\n')
+        out.write(_xml_rows('<triangle v1="%d" v2="%d" v3="%d"/>', faces))
+        out.write('</triangles></mesh></object>\n')
+    out.write('</resources>\n<build>\n')
+    for index, (name, _vertices, _faces) in enumerate(parts, 1):
+        if name in placements:
+            instances = placements[name] if isinstance(placements[name], list) else [placements[name]]
+            for placement in instances:
+                out.write('<item objectid="%d" transform="%s"/>\n' % (index, _transform_attr(placement)))
+        else:
+            out.write('<item objectid="%d"/>\n' % index)
+    out.write('</build>\n</model>\n')
+    return out.getvalue()
+
+
+def write_3mf(path, parts, placements=None):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', RELATIONSHIPS)
+        archive.writestr('3D/3dmodel.model', model_xml(parts, placements))
+    return path
+
+
+def write_mesh(path_stem, fmt, vertices, faces, name=None, compress=False):
+    """Write one mesh as <path_stem>.<fmt>[.gz] and return the path."""
+    if fmt == '3mf':
+        return write_3mf(path_stem + '.3mf', [(name or os.path.basename(path_stem), vertices, faces)])
+    if fmt == 'ply':
+        data = ply_bytes(vertices, faces)
+    elif fmt == 'obj':
+        data = obj_bytes(vertices, faces, name)
+    elif fmt == 'stl':
+        data = stl_bytes(vertices, faces)
+    else:
+        raise ValueError('unsupported format %r, expected one of %s' % (fmt, ', '.join(FORMATS)))
+    path = '%s.%s' % (path_stem, fmt)
+    if compress:
+        path += '.gz'
+        # mtime=0 keeps the output byte-identical between runs
+        with gzip.GzipFile(path, 'wb', mtime=0) as f:
+            f.write(data)
+    else:
+        with open(path, 'wb') as f:
+            f.write(data)
+    return path
+
+
+def export_shape(shape, path_stem, fmt, linear=DEFAULT_LINEAR, angular=DEFAULT_ANGULAR,
+                 tolerance=DEFAULT_WELD, compress=False):
+    """Tessellate, weld and write a Part.Shape in one indexed format."""
+    vertices, faces = weld(*shape_mesh(shape, linear, angular), tolerance)
+    return write_mesh(path_stem, fmt, vertices, faces, os.path.basename(path_stem), compress)
+
+
+# ---------------------------------------
+# Command line
+# ---------------------------------------
+
+def load_parts(inputs, linear, angular, tolerance):
+    """[(module or None, name, vertices, faces)] for module names and STL paths."""
+    parts = []
+    for item in inputs:
+        if item.lower().endswith('.stl'):
+            name = os.path.splitext(os.path.basename(item))[0]
+            parts.append((None, name, *stl_mesh(item, tolerance)))
+        else:
+            # Imported here: buildKit itself exports through this module
+            from buildKit import load_module
+            module = load_module(item)
+            vertices, faces = weld(*shape_mesh(module.build(), linear, angular), tolerance)
+            parts.append((item, module.MODULE_NAME, vertices, faces))
+    return parts
+
+
+def assembly_placements(parts):
+    """{part name: placement} in the assembled box, matched by module or MODULE_NAME."""
+    from buildKit import MODULES, load_module
+    from kitAssembly import placements
+
+    by_name = {load_module(module).MODULE_NAME: module for module in MODULES}
+    placed = placements()
+    result = {}
+    for module, name, _vertices, _faces in parts:
+        module = module or by_name.get(name)
+        if module in placed:
+            result[name] = placed[module]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Export the box modules as welded, indexed meshes.')
+    parser.add_argument('inputs', nargs='*',
+                        help='module names or STL files (default: build all five modules)')
+    parser.add_argument('--out', default='export', help='output directory (default: export)')
+    parser.add_argument('--formats', default='3mf,ply',
+                        help='comma separated formats: %s (default: 3mf,ply)' % ', '.join(FORMATS))
+    parser.add_argument('--linear', type=float, default=DEFAULT_LINEAR,
+                        help='linear deflection in mm (default: %g)' % DEFAULT_LINEAR)
+    parser.add_argument('--angular', type=float, default=DEFAULT_ANGULAR,
+                        help='angular deflection in radians, MeshPart only (default: %g)' % DEFAULT_ANGULAR)
+    parser.add_argument('--weld-tolerance', type=float, default=DEFAULT_WELD,
+                        help='merge vertices closer than this, in mm (default: %g)' % DEFAULT_WELD)
+    parser.add_argument('--compress', action='store_true', help='gzip PLY, OBJ and STL output')
+    parser.add_argument('--assembly', action='store_true',
+                        help='place the parts at their positions in the box in the 3MF file')
+    parser.add_argument('--name', default='box', help='name of the combined 3MF file (default: box)')
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip().lower() for fmt in args.formats.split(',') if fmt.strip()]
+    for fmt in formats:
+        if fmt not in FORMATS:
+            parser.error('unsupported format %r' % fmt)
+    if not args.inputs:
+        from buildKit import MODULES
+        args.inputs = list(MODULES)
+
+    os.makedirs(args.out, exist_ok=True)
+    parts = load_parts(args.inputs, args.linear, args.angular, args.weld_tolerance)
+    for _module, name, vertices, faces in parts:
+        paths = [write_mesh(os.path.join(args.out, name), fmt, vertices, faces, name, args.compress)
+                 for fmt in formats if fmt != '3mf']
+        print('%-32s %7d vertices %7d faces  %s' % (name, len(vertices), len(faces), '  '.join(
+            '%s %.1f KB' % (os.path.basename(path), os.path.getsize(path) / 1024.0) for path in paths)))
+
+    if '3mf' in formats:
+        placements = assembly_placements(parts) if args.assembly else None
+        path = write_3mf(os.path.join(args.out, args.name + '.3mf'),
+                         [(name, vertices, faces) for _module, name, vertices, faces in parts], placements)
+        print('%-32s %d object(s)  %.1f KB' % (os.path.basename(path), len(parts), os.path.getsize(path) / 1024.0))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
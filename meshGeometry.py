@@ -0,0 +1,276 @@
+"""Vectorized triangle primitives shared by the mesh tools.
+
+Triangles are (n, 3, 3) arrays: n facets, 3 corners, xyz. Every function
+works on whole arrays at once; nothing loops over facets in Python.
+"""
+import numpy as np
+
+
+def as_triangles(data):
+    """Return float64 (n, 3, 3) triangles from an stlIO facet array or raw triangles."""
+    data = np.asarray(data)
+    if data.dtype.names and 'vertices' in data.dtype.names:
+        data = data['vertices']
+    return np.asarray(data, dtype=np.float64).reshape(-1, 3, 3)
+
+
+def triangle_areas(tris):
+    cross = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+    return 0.5 * np.linalg.norm(cross, axis=1)
+
+
+def signed_volume(tris):
+    """Enclosed volume of a closed, outward-oriented mesh (divergence theorem)."""
+    return np.einsum('ij,ij->i', tris[:, 0], np.cross(tris[:, 1], tris[:, 2])).sum() / 6.0
+
+
+def bounds(tris):
+    points = tris.reshape(-1, 3)
+    return points.min(axis=0), points.max(axis=0)
+
+
+def sample_surface(tris, count, rng=None):
+    """Draw area-weighted uniform points on the surface.
+
+    Returns (points, facet index of each point).
+    """
+    rng = np.random.default_rng(0) if rng is None else rng
+    areas = triangle_areas(tris)
+    total = areas.sum()
+    if count <= 0 or total <= 0:
+        return np.zeros((0, 3)), np.zeros(0, dtype=np.intp)
+    facets = rng.choice(len(tris), size=count, p=areas / total)
+    u = rng.random(count)
+    v = rng.random(count)
+    # Fold points from the far half of the unit square back into the triangle
+    outside = u + v > 1
+    u[outside] = 1 - u[outside]
+    v[outside] = 1 - v[outside]
+    t = tris[facets]
+    points = t[:, 0] + u[:, None] * (t[:, 1] - t[:, 0]) + v[:, None] * (t[:, 2] - t[:, 0])
+    return points, facets
+
+
+def cover_points(tris, spacing):
+    """Deterministic surface samples with every surface point within 2 * spacing of one.
+
+    Each facet gets a grid spanned by its shortest edge and the edge to
+    its third corner, with steps of at most spacing along each, so long
+    slivers get a row of points rather than a dense patch. Returns
+    (points, facet index of each point).
+    """
+    edges = np.stack([
+        np.linalg.norm(tris[:, 1] - tris[:, 0], axis=1),
+        np.linalg.norm(tris[:, 2] - tris[:, 1], axis=1),
+        np.linalg.norm(tris[:, 0] - tris[:, 2], axis=1),
+    ], axis=1)
+    # Rotate corners so that corner 0 -> corner 1 is the shortest edge
+    shift = edges.argmin(axis=1)
+    order = (np.arange(3)[None, :] + shift[:, None]) % 3
+    t = tris[np.arange(len(tris))[:, None], order]
+    e1 = t[:, 1] - t[:, 0]
+    e2 = t[:, 2] - t[:, 0]
+    ma = np.maximum(np.ceil(np.linalg.norm(e1, axis=1) / spacing), 1).astype(np.intp)
+    mb = np.maximum(np.ceil(np.linalg.norm(e2, axis=1) / spacing), 1).astype(np.intp)
+
+    # Rows i = 0..ma of every facet, then columns j = 0..floor(mb * (1 - i / ma))
+    row_facet = np.repeat(np.arange(len(t)), ma + 1)
+    row_start = np.cumsum(ma + 1) - (ma + 1)
+    row_i = np.arange(len(row_facet)) - np.repeat(row_start, ma + 1)
+    u = row_i / ma[row_facet]
+    columns = np.floor(mb[row_facet] * (1 - u) + 1e-9).astype(np.intp) + 1
+
+    point_facet = np.repeat(row_facet, columns)
+    point_u = np.repeat(u, columns)
+    col_start = np.cumsum(columns) - columns
+    point_j = np.arange(len(point_facet)) - np.repeat(col_start, columns)
+    point_v = point_j / mb[point_facet]
+
+    points = (t[point_facet, 0]
+              + point_u[:, None] * e1[point_facet]
+              + point_v[:, None] * e2[point_facet])
+    return points, point_facet
+
+
+def closest_points_on_triangles(points, tris):
+    """Closest point on tris[i] to points[i] for paired (m, 3) / (m, 3, 3) arrays.
+
+    Region-based algorithm from Ericson, Real-Time Collision Detection 5.1.5,
+    evaluated for every pair at once.
+    """
+    a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+    ab = b - a
+    ac = c - a
+    ap = points - a
+    bp = points - b
+    cp = points - c
+
+    def dot(x, y):
+        return np.einsum('ij,ij->i', x, y)
+
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+
+    # Default: projection inside the face
+    denom = va + vb + vc
+    safe = np.where(denom == 0, 1.0, denom)
+    v = vb / safe
+    w = vc / safe
+    result = a + ab * v[:, None] + ac * w[:, None]
+
+    def assign(mask, values):
+        result[mask] = values[mask]
+
+    # Edge regions (assigned first so vertex regions take precedence)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mask = (va <= 0) & ((d4 - d3) >= 0) & ((d5 - d6) >= 0)
+        t = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        assign(mask, b + (c - b) * t[:, None])
+
+        mask = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        t = d2 / (d2 - d6)
+        assign(mask, a + ac * t[:, None])
+
+        mask = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        t = d1 / (d1 - d3)
+        assign(mask, a + ab * t[:, None])
+
+    # Vertex regions
+    assign((d6 >= 0) & (d5 <= d6), c)
+    assign((d3 >= 0) & (d4 <= d3), b)
+    assign((d1 <= 0) & (d2 <= 0), a)
+
+    # Degenerate (zero area) triangles fall back to the nearest corner
+    degenerate = denom == 0
+    if degenerate.any():
+        corners = tris[degenerate]
+        dist = np.linalg.norm(corners - points[degenerate][:, None], axis=2)
+        result[degenerate] = corners[np.arange(len(corners)), dist.argmin(axis=1)]
+    return result
+
+
+def point_triangle_distances(points, tris):
+    """Distance from points[i] to tris[i] for paired arrays."""
+    return np.linalg.norm(points - closest_points_on_triangles(points, tris), axis=1)
+
+
+def closest_points_on_segments(p1, q1, p2, q2):
+    """Closest points between paired segments p1-q1 and p2-q2 ((m, 3) arrays each).
+
+    Ericson, Real-Time Collision Detection 5.1.9. Returns (points on the
+    first segments, points on the second segments).
+    """
+    d1 = q1 - p1
+    d2 = q2 - p2
+    r = p1 - p2
+    a = np.einsum('ij,ij->i', d1, d1)
+    e = np.einsum('ij,ij->i', d2, d2)
+    f = np.einsum('ij,ij->i', d2, r)
+    c = np.einsum('ij,ij->i', d1, r)
+    b = np.einsum('ij,ij->i', d1, d2)
+    denom = a * e - b * b
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Parallel segments (denom == 0) start from s = 0
+        s = np.where(denom > 1e-12 * a * e, np.clip((b * f - c * e) / denom, 0, 1), 0.0)
+        t = np.where(e > 0, (b * s + f) / e, 0.0)
+        # Clamp t to [0, 1] and recompute s for the clamped t
+        s = np.where(t < 0, np.clip(-c / a, 0, 1), np.where(t > 1, np.clip((b - c) / a, 0, 1), s))
+        t = np.clip(t, 0, 1)
+    s = np.where(a > 0, np.nan_to_num(s), 0.0)
+    return p1 + d1 * s[:, None], p2 + d2 * t[:, None]
+
+
+def triangles_overlap(tris1, tris2, tol=0.0):
+    """True where paired triangles cross each other by more than tol.
+
+    Each triangle must have corners strictly on both sides of the other's
+    plane, and the projections must overlap by more than tol on every
+    edge cross product and in-plane edge normal (the separating axes left
+    once the face normals are covered by the side test). Triangles that
+    merely touch, face on face or edge on edge, do not overlap.
+    """
+    e1 = np.roll(tris1, -1, axis=1) - tris1
+    e2 = np.roll(tris2, -1, axis=1) - tris2
+    n1 = np.cross(e1[:, 0], e1[:, 1])
+    n2 = np.cross(e2[:, 0], e2[:, 1])
+
+    # Signed corner heights over the other triangle's plane
+    len1 = np.linalg.norm(n1, axis=1)
+    len2 = np.linalg.norm(n2, axis=1)
+    side2 = np.einsum('mj,mvj->mv', n1, tris2 - tris1[:, :1])
+    side1 = np.einsum('mj,mvj->mv', n2, tris1 - tris2[:, :1])
+    crossing = ((side2.min(axis=1) < -tol * len1) & (side2.max(axis=1) > tol * len1)
+                & (side1.min(axis=1) < -tol * len2) & (side1.max(axis=1) > tol * len2))
+
+    axes = np.concatenate([
+        np.cross(e1[:, :, None], e2[:, None, :]).reshape(-1, 9, 3),
+        np.cross(n1[:, None], e1),
+        np.cross(n2[:, None], e2),
+    ], axis=1)
+    length = np.linalg.norm(axes, axis=2)
+    proj1 = np.einsum('mkj,mvj->mkv', axes, tris1)
+    proj2 = np.einsum('mkj,mvj->mkv', axes, tris2)
+    overlap = np.minimum(proj1.max(axis=2), proj2.max(axis=2)) - np.maximum(proj1.min(axis=2), proj2.min(axis=2))
+    # Near-zero axes (parallel edges) cannot separate anything
+    valid = length > 1e-9 * np.maximum(length.max(axis=1, keepdims=True), 1e-300)
+    # Parallel edges also turn cross products into face normals, along which
+    # crossing triangles only touch; those are left to the side test
+    along_normal = ((np.linalg.norm(np.cross(axes, n1[:, None]), axis=2) <= 1e-9 * length * len1[:, None])
+                    | (np.linalg.norm(np.cross(axes, n2[:, None]), axis=2) <= 1e-9 * length * len2[:, None]))
+    separated = (valid & np.where(along_normal, overlap < -tol * length, overlap <= tol * length)).any(axis=1)
+    return crossing & ~separated
+
+
+def triangle_distances(tris1, tris2):
+    """Distance between paired triangles that do not intersect.
+
+    The minimum is attained at a corner of one triangle or between two
+    edges, so it is the smallest of six point-triangle and nine
+    segment-segment distances. Returns (distance, point on tris1, point
+    on tris2).
+    """
+    m = len(tris1)
+    candidates_a = []
+    candidates_b = []
+    for k in range(3):
+        candidates_a.append(tris1[:, k])
+        candidates_b.append(closest_points_on_triangles(tris1[:, k], tris2))
+        candidates_a.append(closest_points_on_triangles(tris2[:, k], tris1))
+        candidates_b.append(tris2[:, k])
+    for i in range(3):
+        for j in range(3):
+            pa, pb = closest_points_on_segments(tris1[:, i], tris1[:, (i + 1) % 3],
+                                                tris2[:, j], tris2[:, (j + 1) % 3])
+            candidates_a.append(pa)
+            candidates_b.append(pb)
+    pa = np.stack(candidates_a, axis=1)
+    pb = np.stack(candidates_b, axis=1)
+    dist = np.linalg.norm(pa - pb, axis=2)
+    best = dist.argmin(axis=1)
+    rows = np.arange(m)
+    return dist[rows, best], pa[rows, best], pb[rows, best]
+
+
+def ray_triangle_hits(origins, directions, tris):
+    """Ray parameter t of the hit of paired rays and triangles, inf on a miss.
+
+    Moller-Trumbore; hits behind the origin (t <= 0) count as misses.
+    """
+    e1 = tris[:, 1] - tris[:, 0]
+    e2 = tris[:, 2] - tris[:, 0]
+    pvec = np.cross(directions, e2)
+    det = np.einsum('ij,ij->i', e1, pvec)
+    ok = np.abs(det) > 1e-12
+    inv = np.where(ok, 1.0 / np.where(ok, det, 1.0), 0.0)
+    tvec = origins - tris[:, 0]
+    u = np.einsum('ij,ij->i', tvec, pvec) * inv
+    qvec = np.cross(tvec, e1)
+    v = np.einsum('ij,ij->i', directions, qvec) * inv
+    t = np.einsum('ij,ij->i', e2, qvec) * inv
+    hit = ok & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > 0)
+    return np.where(hit, t, np.inf)
@@ -0,0 +1,273 @@
+"""Volume, area, centroid, inertia and a print estimate straight from STL triangles.
+
+Every integral over the solid is turned into a sum over its facets by
+the divergence theorem (polyhedral mass properties after D. Eberly), so
+one vectorized pass over the triangles gives volume, centroid and
+inertia tensor. The sums are additive, so large files are read in
+chunks with bounded memory.
+
+    props = mesh_properties(stlIO.read_stl('ledHousingModule.stl'))
+    props['volume'], props['centroid'], props['print']['minutes']
+
+    python3 meshProperties.py *.stl
+    python3 meshProperties.py sweep --density 1.04 --infill 0.15 --csv costs.csv
+
+The print estimate is a layer model, not a slicer: perimeters along
+the side walls, solid skins on the up- and down-facing area, sparse
+infill in the rest of the volume, a fixed volumetric flow and a pause
+per layer. Use it to compare and cost variants; a slicer still gives
+the real time.
+"""
+import argparse
+import csv
+import glob
+import json
+import math
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import stlIO
+from meshGeometry import as_triangles
+
+# PLA on a 0.4 mm nozzle
+PRINT = {
+    'density': 1.24,            # g/cm3
+    'layer_height': 0.2,        # mm
+    'line_width': 0.45,         # mm
+    'perimeters': 2,
+    'skin_layers': 4,           # solid layers at top and bottom
+    'infill': 0.2,              # sparse infill fraction
+    'speed': 60.0,              # mm/s along the extrusion path
+    'layer_seconds': 2.0,       # layer change, travel and retraction per layer
+    'filament_diameter': 1.75,  # mm
+}
+
+# Facets steeper than this (|normal z|) print as top or bottom skin
+SKIN_NORMAL_Z = math.cos(math.radians(45))
+
+
+# ---------------------------------------
+# Facet integrals
+# ---------------------------------------
+
+def _subexpressions(w0, w1, w2):
+    temp0 = w0 + w1
+    f1 = temp0 + w2
+    temp1 = w0 * w0
+    temp2 = temp1 + w1 * temp0
+    f2 = temp2 + w2 * f1
+    f3 = w0 * temp1 + w1 * temp2 + w2 * f2
+    g0 = f2 + w0 * (f1 + w0)
+    g1 = f2 + w1 * (f1 + w1)
+    g2 = f2 + w2 * (f1 + w2)
+    return f1, f2, f3, g0, g1, g2
+
+
+def facet_sums(tris, origin):
+    """Additive sums of one batch of (n, 3, 3) triangles, coordinates taken from origin.
+
+    Returns the ten polyhedral integrals (1, x, y, z, x2, y2, z2, xy, yz,
+    zx, unscaled), the surface area, the skin (steep) area, and the
+    bounding box of the batch.
+    """
+    tris = tris - origin
+    p0, p1, p2 = tris[:, 0], tris[:, 1], tris[:, 2]
+    d = np.cross(p1 - p0, p2 - p0)
+    x = _subexpressions(p0[:, 0], p1[:, 0], p2[:, 0])
+    y = _subexpressions(p0[:, 1], p1[:, 1], p2[:, 1])
+    z = _subexpressions(p0[:, 2], p1[:, 2], p2[:, 2])
+
+    integrals = np.array([
+        d[:, 0] @ x[0],
+        d[:, 0] @ x[1],
+        d[:, 1] @ y[1],
+        d[:, 2] @ z[1],
+        d[:, 0] @ x[2],
+        d[:, 1] @ y[2],
+        d[:, 2] @ z[2],
+        d[:, 0] @ (p0[:, 1] * x[3] + p1[:, 1] * x[4] + p2[:, 1] * x[5]),
+        d[:, 1] @ (p0[:, 2] * y[3] + p1[:, 2] * y[4] + p2[:, 2] * y[5]),
+        d[:, 2] @ (p0[:, 0] * z[3] + p1[:, 0] * z[4] + p2[:, 0] * z[5]),
+    ])
+
+    double_area = np.linalg.norm(d, axis=1)
+    steep = np.abs(d[:, 2]) >= SKIN_NORMAL_Z * double_area
+    points = tris.reshape(-1, 3)
+    return {
+        'integrals': integrals,
+        'area': 0.5 * double_area.sum(),
+        'skin_area': 0.5 * double_area[steep].sum(),
+        'lo': points.min(axis=0) + origin if len(points) else np.full(3, np.inf),
+        'hi': points.max(axis=0) + origin if len(points) else np.full(3, -np.inf),
+    }
+
+
+def _add(total, part):
+    if total is None:
+        return part
+    return {
+        'integrals': total['integrals'] + part['integrals'],
+        'area': total['area'] + part['area'],
+        'skin_area': total['skin_area'] + part['skin_area'],
+        'lo': np.minimum(total['lo'], part['lo']),
+        'hi': np.maximum(total['hi'], part['hi']),
+    }
+
+
+INTEGRAL_SCALE = np.array([1 / 6, 1 / 24, 1 / 24, 1 / 24, 1 / 60, 1 / 60, 1 / 60, 1 / 120, 1 / 120, 1 / 120])
+
+
+def _properties(sums, origin, settings):
+    integrals = sums['integrals'] * INTEGRAL_SCALE
+    volume = integrals[0]
+    c = integrals[1:4] / volume if volume else np.zeros(3)
+
+    # Second moments about the centroid, per unit density (mm^5)
+    xx = integrals[5] + integrals[6] - volume * (c[1] ** 2 + c[2] ** 2)
+    yy = integrals[4] + integrals[6] - volume * (c[2] ** 2 + c[0] ** 2)
+    zz = integrals[4] + integrals[5] - volume * (c[0] ** 2 + c[1] ** 2)
+    xy = -(integrals[7] - volume * c[0] * c[1])
+    yz = -(integrals[8] - volume * c[1] * c[2])
+    zx = -(integrals[9] - volume * c[2] * c[0])
+    inertia = np.array([[xx, xy, zx], [xy, yy, yz], [zx, yz, zz]])
+
+    density = settings['density'] / 1000.0  # g/mm3
+    lo, hi = sums['lo'], sums['hi']
+    return {
+        'volume': float(volume),
+        'area': float(sums['area']),
+        'centroid': (c + origin).tolist(),
+        'mass': float(volume * density),
+        'inertia': (inertia * density).tolist(),
+        'bbox_min': lo.tolist(),
+        'bbox_max': hi.tolist(),
+        'size': (hi - lo).tolist(),
+        'print': print_estimate(volume, sums['area'], sums['skin_area'], hi[2] - lo[2], settings),
+    }
+
+
+# ---------------------------------------
+# Print estimate
+# ---------------------------------------
+
+def print_estimate(volume, area, skin_area, height, settings=None):
+    """Extruded volume, filament, mass and time of one part (see the module docstring)."""
+    s = dict(PRINT, **(settings or {}))
+    layers = max(int(math.ceil(height / s['layer_height'] - 1e-9)), 1) if height > 0 else 0
+    walls = (area - skin_area) * s['perimeters'] * s['line_width']
+    skins = skin_area * s['skin_layers'] * s['layer_height']
+    shell = min(walls + skins, volume)
+    extruded = shell + (volume - shell) * s['infill']
+
+    flow = s['line_width'] * s['layer_height'] * s['speed']  # mm3/s
+    seconds = extruded / flow + layers * s['layer_seconds']
+    filament = extruded / (math.pi * (s['filament_diameter'] / 2) ** 2)
+    return {
+        'layers': layers,
+        'extruded': float(extruded),
+        'filament_m': float(filament / 1000.0),
+        'filament_g': float(extruded * s['density'] / 1000.0),
+        'minutes': float(seconds / 60.0),
+    }
+
+
+# ---------------------------------------
+# Meshes and files
+# ---------------------------------------
+
+def mesh_properties(mesh, settings=None):
+    """Properties of an stlIO array or (n, 3, 3) triangles."""
+    tris = as_triangles(mesh)
+    origin = tris[0, 0] if len(tris) else np.zeros(3)
+    return _properties(facet_sums(tris, origin), origin, dict(PRINT, **(settings or {})))
+
+
+def file_properties(path, settings=None, chunk_facets=1 << 20):
+    """Properties of an STL file, streamed in chunks of chunk_facets."""
+    if not stlIO.is_binary_stl(path):
+        return mesh_properties(stlIO.read_stl(path), settings)
+    sums = origin = None
+    for chunk in stlIO.iter_stl(path, chunk_facets):
+        tris = as_triangles(chunk)
+        if origin is None and len(tris):
+            # Sums are taken about a point on the part, which keeps the
+            # high powers of distant coordinates from cancelling badly
+            origin = tris[0, 0]
+        if len(tris):
+            sums = _add(sums, facet_sums(tris, origin))
+    if sums is None:
+        return mesh_properties(np.zeros((0, 3, 3)), settings)
+    return _properties(sums, origin, dict(PRINT, **(settings or {})))
+
+
+def stl_paths(inputs):
+    """STL files of the inputs; directories (e.g. sweep or build output) contribute their *.stl."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, '*.stl'))))
+        else:
+            paths.append(item)
+    return paths
+
+
+def batch_properties(paths, settings=None, workers=None):
+    """{path: properties} of many STL files, across worker processes when there are several."""
+    if workers == 1 or len(paths) < 2:
+        return {path: file_properties(path, settings) for path in paths}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {path: pool.submit(file_properties, path, settings) for path in paths}
+        return {path: future.result() for path, future in futures.items()}
+
+
+CSV_COLUMNS = ('volume', 'area', 'mass', 'centroid', 'size')
+PRINT_COLUMNS = ('layers', 'extruded', 'filament_m', 'filament_g', 'minutes')
+
+
+def write_csv(path, results):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['file'] + list(CSV_COLUMNS) + ['print_' + name for name in PRINT_COLUMNS])
+        for stl, props in results.items():
+            writer.writerow([stl] + [json.dumps(props[name]) for name in CSV_COLUMNS]
+                            + [props['print'][name] for name in PRINT_COLUMNS])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Mass properties and print estimates of STL files.')
+    parser.add_argument('inputs', nargs='*', default=['.'],
+                        help='STL files or directories of them (default: .)')
+    for name, value in PRINT.items():
+        parser.add_argument('--' + name.replace('_', '-'), type=type(value), default=value,
+                            help='default: %s' % value)
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--json', help='write all properties to this file')
+    parser.add_argument('--csv', help='write one row per file to this CSV table')
+    args = parser.parse_args(argv)
+
+    settings = {name: getattr(args, name) for name in PRINT}
+    results = batch_properties(stl_paths(args.inputs), settings, args.jobs)
+    total = {'filament_g': 0.0, 'minutes': 0.0}
+    for path, props in results.items():
+        estimate = props['print']
+        total['filament_g'] += estimate['filament_g']
+        total['minutes'] += estimate['minutes']
+        print('%-36s %10.1f mm3 %9.1f mm2  %7.2f g  %5d layers  %6.2f g filament  %6.1f min' % (
+            os.path.basename(path), props['volume'], props['area'], props['mass'],
+            estimate['layers'], estimate['filament_g'], estimate['minutes']))
+    if len(results) > 1:
+        print('%d part(s): %.2f g filament, %.1f min' % (len(results), total['filament_g'], total['minutes']))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.csv:
+        write_csv(args.csv, results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
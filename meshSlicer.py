@@ -0,0 +1,262 @@
+"""Cross-sections of STL meshes at many Z heights in one streaming pass.
+
+Each facet meets only the planes between its lowest and highest corner,
+so the (facet, plane) pairs come straight from two searchsorted calls
+over the sorted plane heights, and all of a chunk's intersections are
+computed at once. Segments are oriented with the solid on their left
+and stitched into closed polylines per plane: counter-clockwise loops
+are outer boundaries, clockwise ones holes (bores, pockets).
+
+    sections = slice_file('ledHousingModule.stl', [5.0, 6.73])
+    sections[5.0]['loops']          # [(k, 2) arrays], closed polylines
+    sections[5.0]['area']           # material area of the section, mm2
+
+    python3 meshSlicer.py ledHousingModule.stl --led-planes --svg sections
+    python3 meshSlicer.py fingerHoleModule.stl --step 2 --json sections.json
+
+--led-planes slices at the two heights of the LED debug planes that
+ledHousing.show() draws (led_plane_z and the LED bore centers), so the
+bore placement can be checked without the GUI.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+import stlIO
+from meshGeometry import as_triangles
+
+EDGES = ((0, 1), (1, 2), (2, 0))
+
+
+# ---------------------------------------
+# Facet / plane intersection
+# ---------------------------------------
+
+def plane_pairs(tris, heights):
+    """(facet index, plane index) of every facet crossing a plane.
+
+    heights must be sorted. A corner on a plane counts as above it, so a
+    facet crosses z when its lowest corner is below z and its highest is
+    at or above it; each crossing facet has exactly two crossing edges.
+    """
+    z = tris[:, :, 2]
+    first = np.searchsorted(heights, z.min(axis=1), side='right')
+    last = np.searchsorted(heights, z.max(axis=1), side='right')
+    counts = np.maximum(last - first, 0)
+    facets = np.repeat(np.arange(len(tris)), counts)
+    offsets = np.repeat(np.cumsum(counts) - counts, counts)
+    return facets, first[facets] + np.arange(len(facets)) - offsets
+
+
+def section_segments(tris, heights):
+    """(plane index, (m, 2, 2) xy segments) of a batch of triangles.
+
+    Every segment runs with the solid on its left (seen from +Z) for an
+    outward-oriented mesh. Crossing points are always interpolated from
+    the lower to the upper corner of their edge, so the two facets
+    sharing an edge produce bit-identical endpoints.
+    """
+    facets, planes = plane_pairs(tris, heights)
+    v = tris[facets]
+    z = heights[planes]
+    above = v[:, :, 2] >= z[:, None]
+
+    points = np.empty((len(v), 3, 3))
+    crossing = np.empty((len(v), 3), dtype=bool)
+    for k, (a, b) in enumerate(EDGES):
+        crossing[:, k] = above[:, a] != above[:, b]
+        lo = np.where(above[:, a, None], v[:, b], v[:, a])
+        hi = np.where(above[:, a, None], v[:, a], v[:, b])
+        dz = hi[:, 2] - lo[:, 2]
+        t = np.divide(z - lo[:, 2], dz, out=np.zeros_like(dz), where=dz != 0)
+        points[:, k] = lo + t[:, None] * (hi - lo)
+
+    # The two crossing edges, in edge order
+    order = np.argsort(~crossing, axis=1, kind='stable')[:, :2]
+    rows = np.arange(len(v))[:, None]
+    segments = points[rows, order][:, :, :2]
+
+    normals = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+    left = np.stack([-normals[:, 1], normals[:, 0]], axis=1)  # Z x normal
+    flip = np.einsum('ij,ij->i', segments[:, 1] - segments[:, 0], left) < 0
+    segments[flip] = segments[flip, ::-1]
+    return planes, segments
+
+
+# ---------------------------------------
+# Stitching
+# ---------------------------------------
+
+def polygon_area(loop):
+    """Signed shoelace area: positive counter-clockwise."""
+    x, y = loop[:, 0], loop[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+
+def stitch(segments, tolerance=1e-6):
+    """Chain (m, 2, 2) segments into polylines; returns (closed loops, open chains).
+
+    Endpoints closer than tolerance are merged. A closed loop does not
+    repeat its first point; open chains only appear when the mesh has
+    holes or non-manifold edges.
+    """
+    if not len(segments):
+        return [], []
+    points = segments.reshape(-1, 2)
+    keys = np.floor(points / tolerance + 0.5).astype(np.int64)
+    _, first, ids = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    ids = ids.reshape(-1, 2)
+    ids = ids[ids[:, 0] != ids[:, 1]]
+    vertices = points[first]
+
+    following = dict(zip(ids[:, 0].tolist(), range(len(ids))))
+    ends = set(ids[:, 1].tolist())
+    used = np.zeros(len(ids), dtype=bool)
+    # Chain heads (a start that no segment ends at) first, then the closed loops
+    heads = [i for i, start in enumerate(ids[:, 0].tolist()) if start not in ends]
+    loops, chains = [], []
+    for seed in heads + list(range(len(ids))):
+        if used[seed]:
+            continue
+        path = [int(ids[seed, 0])]
+        current = seed
+        while current is not None and not used[current]:
+            used[current] = True
+            path.append(int(ids[current, 1]))
+            current = following.get(path[-1])
+        if path[-1] == path[0] and len(path) > 3:
+            loops.append(vertices[path[:-1]])
+        else:
+            chains.append(vertices[path])
+    return loops, chains
+
+
+def section_summary(z, loops, chains):
+    areas = [polygon_area(loop) for loop in loops]
+    return {
+        'z': float(z),
+        'loops': loops,
+        'open': chains,
+        'area': float(sum(areas)),
+        'perimeter': float(sum(np.linalg.norm(np.roll(loop, -1, axis=0) - loop, axis=1).sum() for loop in loops)),
+        'outer': sum(1 for area in areas if area > 0),
+        'holes': sum(1 for area in areas if area < 0),
+    }
+
+
+# ---------------------------------------
+# Meshes and files
+# ---------------------------------------
+
+def _sections(batches, heights, tolerance):
+    order = np.argsort(heights)
+    sorted_heights = np.asarray(heights, dtype=np.float64)[order]
+    per_plane = [[] for _ in sorted_heights]
+    for tris in batches:
+        planes, segments = section_segments(tris, sorted_heights)
+        grouping = np.argsort(planes, kind='stable')
+        planes, segments = planes[grouping], segments[grouping]
+        bounds = np.searchsorted(planes, np.arange(len(sorted_heights) + 1))
+        for i in range(len(sorted_heights)):
+            if bounds[i + 1] > bounds[i]:
+                per_plane[i].append(segments[bounds[i]:bounds[i + 1]])
+    result = {}
+    for i, z in enumerate(sorted_heights):
+        segments = np.concatenate(per_plane[i]) if per_plane[i] else np.zeros((0, 2, 2))
+        result[float(z)] = section_summary(z, *stitch(segments, tolerance))
+    return result
+
+
+def slice_mesh(mesh, heights, tolerance=1e-6):
+    """{z: section} of an stlIO array or (n, 3, 3) triangles."""
+    return _sections([as_triangles(mesh)], heights, tolerance)
+
+
+def slice_file(path, heights, tolerance=1e-6, chunk_facets=1 << 20):
+    """{z: section} of an STL file, streamed in chunks of chunk_facets."""
+    if stlIO.is_binary_stl(path):
+        batches = (as_triangles(chunk) for chunk in stlIO.iter_stl(path, chunk_facets))
+    else:
+        batches = [as_triangles(stlIO.read_stl(path))]
+    return _sections(batches, heights, tolerance)
+
+
+def led_planes(params=None):
+    """Heights of ledHousing's two debug planes: led_plane_z and the LED bore centers."""
+    from buildKit import load_module
+
+    p = dict(load_module('ledHousing').PARAMS, **(params or {}))
+    tilt = math.radians(p['tilt_angle_deg'])
+    return [p['led_plane_z'], p['led_plane_z'] + p['led_distance'] * math.sin(tilt)]
+
+
+def write_svg(path, section, margin=2.0):
+    """One section as an SVG in mm, material filled (even-odd), Y up."""
+    loops = section['loops'] + section['open']
+    if loops:
+        points = np.concatenate(loops)
+        lo, hi = points.min(axis=0) - margin, points.max(axis=0) + margin
+    else:
+        lo, hi = np.zeros(2), np.ones(2)
+    size = hi - lo
+    paths = ['M ' + ' L '.join('%.4f %.4f' % (x, y) for x, y in loop) + ' Z' for loop in section['loops']]
+    chains = ['M ' + ' L '.join('%.4f %.4f' % (x, y) for x, y in chain) for chain in section['open']]
+    with open(path, 'w') as f:
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" width="%.3fmm" height="%.3fmm" '
+                'viewBox="%.4f %.4f %.4f %.4f">\n' % (size[0], size[1], lo[0], -hi[1], size[0], size[1]))
+        f.write('<title>z = %.4f mm, area %.2f mm2</title>\n' % (section['z'], section['area']))
+        f.write('<g transform="scale(1,-1)" stroke-width="0.1">\n')
+        if paths:
+            f.write('<path fill="#c8c864" fill-rule="evenodd" stroke="#303030" d="%s"/>\n' % ' '.join(paths))
+        if chains:
+            f.write('<path fill="none" stroke="#d02020" d="%s"/>\n' % ' '.join(chains))
+        f.write('</g>\n</svg>\n')
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Slice STL meshes with horizontal planes.')
+    parser.add_argument('paths', nargs='+', help='STL files')
+    parser.add_argument('--z', type=float, nargs='*', default=[], help='plane heights in mm')
+    parser.add_argument('--step', type=float, help='also slice every STEP mm through the mesh height')
+    parser.add_argument('--led-planes', action='store_true',
+                        help='slice at the ledHousing debug plane heights (needs the module parameters)')
+    parser.add_argument('--svg', help='write one SVG per section into this directory')
+    parser.add_argument('--json', help='write all sections (polylines and summaries) to this file')
+    parser.add_argument('--tolerance', type=float, default=1e-6, help='endpoint merge distance in mm')
+    args = parser.parse_args(argv)
+
+    fixed = list(args.z) + (led_planes() if args.led_planes else [])
+    report = {}
+    for path in args.paths:
+        heights = list(fixed)
+        if args.step:
+            lo, hi = stlIO.bounding_box(path)
+            heights += np.arange(lo[2] + args.step / 2, hi[2], args.step).tolist()
+        if not heights:
+            parser.error('no planes: give --z, --step or --led-planes')
+        name = os.path.splitext(os.path.basename(path))[0]
+        sections = slice_file(path, sorted(set(heights)), args.tolerance)
+        for z, section in sections.items():
+            print('%-28s z %8.3f  %2d outer %3d holes  %9.2f mm2  perimeter %8.2f mm%s' % (
+                name, z, section['outer'], section['holes'], section['area'], section['perimeter'],
+                '  (%d open)' % len(section['open']) if section['open'] else ''))
+            if args.svg:
+                os.makedirs(args.svg, exist_ok=True)
+                write_svg(os.path.join(args.svg, '%s_z%.3f.svg' % (name, z)), section)
+        report[name] = {'%.4f' % z: dict(section, loops=[loop.tolist() for loop in section['loops']],
+                                         open=[chain.tolist() for chain in section['open']])
+                        for z, section in sections.items()}
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""Integrity checks of STL meshes before they go to the printer.
+
+Corners are welded (meshExport.corner_ids), every facet contributes its
+three directed edges, and one sort of the undirected edge keys gives the
+edge table: edges used once are open (boundary), more than twice
+non-manifold, and an edge whose two facets run it the same way joins
+facets of opposite orientation. Also reported: degenerate facets (zero
+area or collapsed corners), duplicate facets, stored STL normals that
+disagree with the winding, an inside-out mesh (negative volume) and
+self-intersections.
+
+Self-intersections are found with a uniform grid: every facet's bounding
+box is entered into the cells it covers, one sort groups the entries by
+cell, and only facets sharing a cell are tested against each other
+(meshGeometry.triangles_overlap, chunk by chunk), instead of all pairs.
+
+    report = validate_file('ledHousingModule.stl')
+    report['ok'], report['boundary_edges'], report['self_intersections']
+
+    python3 meshValidate.py *.stl
+    python3 meshValidate.py build sweep --jobs 4 --json validate.json
+
+The exit status is 1 when any file fails, so it can gate every build or
+sweep. --no-intersections skips the (slowest) self-intersection test.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import meshExport
+import stlIO
+from meshGeometry import as_triangles, signed_volume, triangles_overlap
+from meshProperties import stl_paths
+
+# Facets with twice their area below this fraction of the squared
+# longest edge are degenerate (needles and collapsed facets)
+DEGENERATE = 1e-12
+
+# Grid cells start at an eighth of the median facet size and are
+# coarsened until the facets cover at most this many cells each on average
+CELLS_PER_FACET = 32
+
+# Triangle pairs tested per triangles_overlap call
+PAIR_CHUNK = 1 << 15
+
+# Locations listed per kind of defect
+MAX_LOCATIONS = 20
+
+
+# ---------------------------------------
+# Edge table
+# ---------------------------------------
+
+def edge_table(ids):
+    """Edges of (n, 3) corner ids: (unique (m, 2) vertex pairs, use count, orientation sum).
+
+    The orientation sum is +1 per facet running the edge from its lower
+    to its higher vertex and -1 for the other way, so it is 0 for an
+    edge shared by two consistently oriented facets.
+    """
+    start = ids.reshape(-1)
+    end = ids[:, [1, 2, 0]].reshape(-1)
+    lo = np.minimum(start, end)
+    hi = np.maximum(start, end)
+    keys = lo * (int(ids.max()) + 1 if len(ids) else 1) + hi
+    unique, first, inverse, counts = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+    orientation = np.bincount(inverse.reshape(-1), weights=np.where(start < end, 1, -1), minlength=len(unique))
+    pairs = np.stack([lo[first], hi[first]], axis=1)
+    return pairs, counts, orientation.astype(np.int64)
+
+
+def degenerate_facets(tris, ids):
+    """True for facets with collapsed corners or (near) zero area."""
+    collapsed = (ids[:, 0] == ids[:, 1]) | (ids[:, 1] == ids[:, 2]) | (ids[:, 2] == ids[:, 0])
+    double_area = np.linalg.norm(np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0]), axis=1)
+    edges = np.roll(tris, -1, axis=1) - tris
+    longest = np.einsum('nkj,nkj->nk', edges, edges).max(axis=1)
+    return collapsed | (double_area <= DEGENERATE * longest)
+
+
+def duplicate_facets(ids):
+    """True for every facet after the first with the same three corners (either winding)."""
+    if not len(ids):
+        return np.zeros(0, dtype=bool)
+    corners = np.sort(ids, axis=1)
+    _, first = np.unique(corners, axis=0, return_index=True)
+    duplicate = np.ones(len(ids), dtype=bool)
+    duplicate[first] = False
+    return duplicate
+
+
+# ---------------------------------------
+# Self-intersections
+# ---------------------------------------
+
+def grid_pairs(lo, hi, cell):
+    """(i, j) pairs, i < j, of overlapping boxes lo..hi, found through a uniform grid of size cell.
+
+    Each pair is kept only in the cell holding the larger of its two box
+    minima, which both boxes cover when they overlap, so no pair comes
+    out twice and no unique pass is needed.
+    """
+    origin = lo.min(axis=0)
+    first = np.floor((lo - origin) / cell).astype(np.int64)
+    last = np.floor((hi - origin) / cell).astype(np.int64)
+    span = last - first + 1
+    dims = last.max(axis=0) + 1
+    counts = span.prod(axis=1)
+
+    # One entry per (box, covered cell), keyed by the linear cell index
+    boxes = np.repeat(np.arange(len(lo)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    s = span[boxes]
+    local = np.stack([offset // (s[:, 1] * s[:, 2]), offset // s[:, 2] % s[:, 1], offset % s[:, 2]], axis=1)
+    cells = first[boxes] + local
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+
+    order = np.argsort(keys, kind='stable')
+    keys, boxes = keys[order], boxes[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+    # Every entry pairs with the entries after it in its cell
+    later = np.repeat(ends, ends - starts) - np.arange(len(keys)) - 1
+    a = np.repeat(np.arange(len(keys)), later)
+    b = a + 1 + np.arange(later.sum()) - np.repeat(np.cumsum(later) - later, later)
+    i, j = boxes[a], boxes[b]
+
+    overlap = ((lo[i] <= hi[j]) & (lo[j] <= hi[i])).all(axis=1)
+    i, j, key = i[overlap], j[overlap], keys[a[overlap]]
+    home = np.maximum(first[i], first[j])
+    own = (home[:, 0] * dims[1] + home[:, 1]) * dims[2] + home[:, 2] == key
+    return np.sort(np.stack([i[own], j[own]], axis=1), axis=1)
+
+
+def grid_cell(lo, hi):
+    """Grid cell size for boxes lo..hi: a fraction of the median box size, coarsened until few cells per box."""
+    size = hi - lo
+    scale = float(np.max(hi.max(axis=0) - lo.min(axis=0))) or 1.0
+    cell = max(float(np.median(size.max(axis=1))) / 8, 1e-6 * scale)
+    while True:
+        covered = (np.floor(hi / cell) - np.floor(lo / cell) + 1).prod(axis=1).sum()
+        if covered <= CELLS_PER_FACET * len(lo):
+            return cell
+        cell *= 2
+
+
+def self_intersections(tris, ids, skip=None, tolerance=None):
+    """(k, 2) facet pairs crossing each other, neighbours sharing an edge excluded.
+
+    skip masks facets left out (e.g. degenerate ones). tolerance is the
+    crossing depth in mm below which a pair still counts as touching.
+    """
+    keep = np.flatnonzero(~skip) if skip is not None else np.arange(len(tris))
+    if len(keep) < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    if tolerance is None:
+        tolerance = 1e-6 * (float(np.ptp(tris[keep].reshape(-1, 3), axis=0).max()) or 1.0)
+    lo = tris[keep].min(axis=1) - tolerance
+    hi = tris[keep].max(axis=1) + tolerance
+
+    pairs = keep[grid_pairs(lo, hi, grid_cell(lo, hi))]
+    # Facets sharing an edge meet along it; they only touch
+    shared = (ids[pairs[:, 0]][:, :, None] == ids[pairs[:, 1]][:, None, :]).any(axis=2).sum(axis=1)
+    pairs = pairs[shared < 2]
+
+    # Cheap plane side test first: crossing facets have corners on both
+    # sides of each other's plane
+    normals = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    for a, b in ((0, 1), (1, 0)):
+        first, second = pairs[:, a], pairs[:, b]
+        heights = np.einsum('mj,mvj->mv', normals[first], tris[second] - tris[first, :1])
+        margin = tolerance * lengths[first]
+        pairs = pairs[(heights.min(axis=1) < -margin) & (heights.max(axis=1) > margin)]
+
+    crossing = np.zeros(len(pairs), dtype=bool)
+    for start in range(0, len(pairs), PAIR_CHUNK):
+        chunk = pairs[start:start + PAIR_CHUNK]
+        crossing[start:start + PAIR_CHUNK] = triangles_overlap(tris[chunk[:, 0]], tris[chunk[:, 1]], tolerance)
+    return pairs[crossing]
+
+
+# ---------------------------------------
+# Meshes and files
+# ---------------------------------------
+
+def _locations(points):
+    return np.asarray(points)[:MAX_LOCATIONS].tolist()
+
+
+def validate_mesh(mesh, tolerance=meshExport.DEFAULT_WELD, intersections=True):
+    """Report of an stlIO array or (n, 3, 3) triangles; report['ok'] is False on any defect."""
+    tris = as_triangles(mesh)
+    ids = meshExport.corner_ids(tris, tolerance) if len(tris) else np.zeros((0, 3), dtype=np.int64)
+    degenerate = degenerate_facets(tris, ids)
+    duplicate = duplicate_facets(ids)
+
+    # Collapsed facets carry no edges of their own
+    collapsed = (ids[:, 0] == ids[:, 1]) | (ids[:, 1] == ids[:, 2]) | (ids[:, 2] == ids[:, 0])
+    pairs, counts, orientation = edge_table(ids[~collapsed])
+    corners = tris.reshape(-1, 3)[np.unique(ids.reshape(-1), return_index=True)[1]]
+    midpoints = corners[pairs].mean(axis=1) if len(pairs) else np.zeros((0, 3))
+    boundary = counts == 1
+    nonmanifold = counts > 2
+    inconsistent = (counts == 2) & (orientation != 0)
+
+    # Stored STL normals, where the input has them, against the winding
+    data = np.asarray(mesh)
+    if data.dtype.names and 'normal' in data.dtype.names:
+        normals = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+        stored = np.asarray(data['normal'], dtype=np.float64).reshape(-1, 3)
+        mismatch = (np.einsum('ij,ij->i', stored, normals) < 0) & ~degenerate
+    else:
+        mismatch = np.zeros(len(tris), dtype=bool)
+
+    volume = float(signed_volume(tris))
+    crossing = (self_intersections(tris, ids, degenerate | duplicate) if intersections
+                else np.zeros((0, 2), dtype=np.int64))
+    crossed = np.unique(crossing)
+
+    report = {
+        'facets': int(len(tris)),
+        'vertices': int(len(corners)),
+        'edges': int(len(pairs)),
+        'boundary_edges': int(boundary.sum()),
+        'nonmanifold_edges': int(nonmanifold.sum()),
+        'inconsistent_edges': int(inconsistent.sum()),
+        'degenerate_facets': int(degenerate.sum()),
+        'duplicate_facets': int(duplicate.sum()),
+        'normal_mismatches': int(mismatch.sum()),
+        'volume': volume,
+        'inside_out': volume < 0,
+        'self_intersections': int(len(crossing)) if intersections else None,
+        'intersecting_facets': int(len(crossed)) if intersections else None,
+        'locations': {
+            'boundary_edges': _locations(midpoints[boundary]),
+            'nonmanifold_edges': _locations(midpoints[nonmanifold]),
+            'inconsistent_edges': _locations(midpoints[inconsistent]),
+            'degenerate_facets': _locations(tris[degenerate].mean(axis=1)),
+            'self_intersections': _locations(tris[crossed].mean(axis=1)),
+        },
+    }
+    report['watertight'] = not report['boundary_edges'] and not report['nonmanifold_edges']
+    report['ok'] = bool(report['watertight'] and not report['inconsistent_edges']
+                        and not report['degenerate_facets'] and not report['duplicate_facets']
+                        and not report['normal_mismatches'] and not report['inside_out']
+                        and not report['self_intersections'])
+    return report
+
+
+def validate_file(path, tolerance=meshExport.DEFAULT_WELD, intersections=True):
+    return validate_mesh(stlIO.read_stl(path), tolerance, intersections)
+
+
+PROBLEMS = (
+    ('boundary_edges', 'open edges'),
+    ('nonmanifold_edges', 'non-manifold edges'),
+    ('inconsistent_edges', 'flipped neighbours'),
+    ('degenerate_facets', 'degenerate facets'),
+    ('duplicate_facets', 'duplicate facets'),
+    ('normal_mismatches', 'stored normals against winding'),
+    ('self_intersections', 'crossing facet pairs'),
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check STL meshes for open, non-manifold and crossing facets.')
+    parser.add_argument('inputs', nargs='*', default=['.'], help='STL files or directories of them (default: .)')
+    parser.add_argument('--tolerance', type=float, default=meshExport.DEFAULT_WELD,
+                        help='corners closer than this (mm) are one vertex (default: %(default)s)')
+    parser.add_argument('--no-intersections', action='store_true', help='skip the self-intersection test')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--json', help='write the full report to this file')
+    args = parser.parse_args(argv)
+
+    paths = stl_paths(args.inputs)
+    options = (args.tolerance, not args.no_intersections)
+    if args.jobs == 1 or len(paths) < 2:
+        reports = {path: validate_file(path, *options) for path in paths}
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = {path: pool.submit(validate_file, path, *options) for path in paths}
+            reports = {path: future.result() for path, future in futures.items()}
+
+    failed = False
+    for path, report in reports.items():
+        failed = failed or not report['ok']
+        problems = ['%d %s' % (report[key], label) for key, label in PROBLEMS if report[key]]
+        if report['inside_out']:
+            problems.append('inside out')
+        print('%-36s %7d facets  %s' % (os.path.basename(path), report['facets'], ', '.join(problems) or 'ok'))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
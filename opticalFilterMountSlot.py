@@ -1,87 +1,130 @@
-import FreeCAD, Part
+from kernelLoader import FreeCAD, Part
+
+import booleanOps
+
+MODULE_NAME = 'opticalFilterMountModule'
+BUILDER_VERSION = 1  # bump to invalidate cached geometry (see geometryCache.py)
+
+PARAMS = {
+    # Filter mount block (17.8 x 1.9 x 29.8 mm)
+    'mount_width': 18 - 0.2,        # along X
+    'mount_length': 2 - 0.1,        # along Y
+    'mount_height': 30 - 0.2,       # along Z
+
+    # Base plate (50 x 60.5 x 2 mm)
+    'base_width': 50.0,
+    'base_length': 60.5,
+    'base_height': 2.0,
+    'plate_offset_y': -13.75,
+
+    # Horizontal cylinder hole (for optical filter)
+    'hole_radius': 5.2,
+}
+
+
+def build_base(p):
+    # -------------------------------------------------------
+    # 1. Filter Mount Block (17.8 x 1.9 x 29.8 mm)
+    #     - Centered at (0, 0), starts at Z = 0
+    # -------------------------------------------------------
+    mount_width = p['mount_width']
+    mount_length = p['mount_length']
+    mount_height = p['mount_height']
+
+    mount_origin = FreeCAD.Vector(
+        -mount_width / 2,
+        -mount_length / 2,
+        0
+    )
+
+    mount = Part.makeBox(
+        mount_width,
+        mount_length,
+        mount_height,
+        mount_origin
+    )
+
+    # -------------------------------------------------------
+    # 2. Base Plate (50 x 60.5 x 2 mm)
+    #     - Shifted so the base is offset at Y = -13.75 from mount center
+    # -------------------------------------------------------
+    base_width = p['base_width']
+    base_length = p['base_length']
+    base_height = p['base_height']
+
+    plate_offset_y = p['plate_offset_y']
+
+    plate_origin = FreeCAD.Vector(
+        -base_width / 2,
+        -base_length / 2 + plate_offset_y,
+        -base_height  # moved to be under the mount: Z = -2
+    )
+
+    plate = Part.makeBox(
+        base_width,
+        base_length,
+        base_height,
+        plate_origin
+    )
+
+    # Combine base and mount
+    return plate.fuse(mount)
 
-# -------------------------------------------------------
-# Create new FreeCAD document and set shaded wireframe
-# -------------------------------------------------------
-FreeCAD.newDocument('opticalFilterMountModel')
-FreeCAD.Gui.runCommand('Std_DrawStyle', 6)
 
 # -------------------------------------------------------
-# 1. Filter Mount Block (17.8 x 1.9 x 29.8 mm)
-#     - Centered at (0, 0), starts at Z = 0
+# 3. Horizontal Cylinder Hole (for optical filter)
+#     - Centered on mount
+#     - 17 mm up from base plate (Z=2)
 # -------------------------------------------------------
-mount_width =  18 - 0.2       # along X
-mount_length = 2 - 0.1      # along Y
-mount_height = 30 - 0.2      # along Z
-
-mount_origin = FreeCAD.Vector(
-    -mount_width / 2,
-    -mount_length / 2,
-    0
-)
+def filter_hole(p):
+    hole_length = p['mount_length'] + 0.2
 
+    hole_center_x = 0
+    hole_center_z = p['base_height'] + 15  # from bottom
 
-mount = Part.makeBox(
-    mount_width,
-    mount_length,
-    mount_height,
-    mount_origin
-)
+    hole_position = FreeCAD.Vector(
+        hole_center_x,
+        -1,  # slightly inside for guaranteed cut
+        hole_center_z
+    )
 
-# -------------------------------------------------------
-# 2. Base Plate (50 x 60.5 x 2 mm)
-#     - Shifted so the base is offset at Y = -13.75 from mount center
-# -------------------------------------------------------
-base_width = 50.0
-base_length = 60.5
-base_height = 2.0
+    hole_direction = FreeCAD.Vector(0, 1, 0)  # Y direction
 
-plate_offset_y = -13.75
+    return Part.makeCylinder(p['hole_radius'], hole_length, hole_position, hole_direction)
 
-plate_origin = FreeCAD.Vector(
-    -base_width / 2,
-    -base_length / 2 + plate_offset_y,
-    -base_height  # moved to be under the mount: Z = -2
-)
 
-plate = Part.makeBox(
-    base_width,
-    base_length,
-    base_height,
-    plate_origin
+CUT_STEPS = (
+    ('3. Horizontal Cylinder Hole', filter_hole),
 )
 
-# Combine base and mount
-model = plate.fuse(mount)
 
-# -------------------------------------------------------
-# 3. Horizontal Cylinder Hole (for optical filter)
-#     - Centered on mount
-#     - 17 mm up from base plate (Z=2)
-# -------------------------------------------------------
-hole_radius =5.2
-hole_length = mount_length + 0.2
+def build(params=None, cut_mode='batched'):
+    p = dict(PARAMS, **(params or {}))
+    steps = [(label, step(p)) for label, step in CUT_STEPS]
+    return booleanOps.apply_cuts(build_base(p), steps, cut_mode)
 
-hole_center_x = 0
-hole_center_z = base_height + 15  # from bottom
-
-hole_position = FreeCAD.Vector(
-    hole_center_x,
-    -1,  # slightly inside for guaranteed cut
-    hole_center_z
-)
-
-hole_direction = FreeCAD.Vector(0, 1, 0)  # Y direction
-
-hole_cylinder = Part.makeCylinder(hole_radius, hole_length, hole_position, hole_direction)
-model = model.cut(hole_cylinder)
 
 # -------------------------------------------------------
 # 4. Show Result in FreeCAD
 # -------------------------------------------------------
-shape = Part.show(model, 'opticalFilterMountModel')
-shape.ViewObject.Transparency = 0
-shape.ViewObject.ShapeColor = (0.2, 0.6, 0.8)
-
-FreeCAD.Gui.activeDocument().activeView().viewIsometric()
-FreeCAD.Gui.SendMsgToActiveView("ViewFit")
+def show(model):
+    # Create new FreeCAD document
+    FreeCAD.newDocument('opticalFilterMountModel')
+    shape = Part.show(model, 'opticalFilterMountModel')
+    if not FreeCAD.GuiUp:
+        # Headless (FreeCADCmd): the document object only, no view setup
+        return shape
+
+    # Shaded wireframe view
+    FreeCAD.Gui.runCommand('Std_DrawStyle', 6)
+    shape.ViewObject.Transparency = 0
+    shape.ViewObject.ShapeColor = (0.2, 0.6, 0.8)
+
+    FreeCAD.Gui.activeDocument().activeView().viewIsometric()
+    FreeCAD.Gui.SendMsgToActiveView("ViewFit")
+    return shape
+
+
+if __name__ == '__main__':
+    import kernelLoader
+    kernelLoader.run(__name__)
@@ -0,0 +1,376 @@
+"""Monte Carlo light path from the LEDs to the photodiode.
+
+Rays leave each LED (bore positions and beam directions from
+ledGeometry.py) in a cone around its bore axis, are clipped by the bore
+analytically and traced through the assembled box (kitAssembly.py)
+against one BVH of the parts below the LED housing. A ray is captured
+when it reaches the photodiode window, the top of the photodiode hole,
+without hitting any part on the way; otherwise the part that blocked it
+is recorded.
+
+Per LED the report gives the capture fraction, the fractions lost in the
+bore, missing the window and blocked by each part, and capture /
+occlusion maps over the emission cone (angle off the beam x azimuth
+around it, azimuth 0 along the LED pin line).
+
+The model is absorb-only: no reflections off the walls and no finger or
+filter in the light path, so capture fractions rank housing variants
+rather than predict signal levels.
+
+Configurations are traced several at a time, their rays through one BVH
+query, so the cost is the ray count: on one core about 330 four-LED
+configurations a minute at the default 5000 rays per LED, about 1700 at
+1000 rays, and proportionally more with --jobs. Raise --rays to confirm
+the best few.
+
+    python3 opticalTrace.py --rays 1000000
+    python3 opticalTrace.py --tilt 10 12.4 15 --jobs 4 --json optics.json
+    python3 opticalTrace.py --configs variants.json --rays 1000 --jobs 8
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import kitAssembly
+from ledGeometry import led_count, led_layout, per_led
+from meshBVH import MeshBVH
+
+OPTICS = {
+    'half_angle_deg': 15.0,     # LED emission cone around the bore axis (uniform in solid angle)
+    'emitter_radius': 1.0,      # Emitting disk at the bottom of the bore
+    'emitter_offset': 0.0,      # Emitter distance from the bore start along the beam
+    'detector_depth': 0.0,      # Photodiode face below the top of its hole
+}
+
+# Map bins: angle off the beam x azimuth around it
+MAP_BINS = (8, 24)
+
+# Rays per LED and configuration: capture fractions to about +-0.5 % (one sigma)
+DEFAULT_RAYS = 5000
+
+
+class OpticalScene:
+    """The parts below the LED housing in one BVH, plus the photodiode window.
+
+    Built once and reused for every LED configuration: only the LED
+    housing changes between configurations and its bores are handled
+    analytically (see bore_exit), so it is not part of the BVH.
+    """
+
+    def __init__(self, meshes, params=None, detector_depth=0.0):
+        self.params = params or {}
+        self.parts = [name for name in meshes if name != 'ledHousing']
+        tris = [meshes[name] for name in self.parts]
+        self.facet_part = np.repeat(np.arange(len(self.parts)), [len(t) for t in tris])
+        self.bvh = MeshBVH(np.concatenate(tris))
+
+        photodiode = kitAssembly.module_params(self.params)['photodiodeHousing']
+        rotation, _ = placement = kitAssembly.placements(self.params)['photodiodeHousing']
+        mount_top = photodiode['housing_height'] - photodiode['pocket_height'] + photodiode['mount_height']
+        self.window_center = kitAssembly.transform([0.0, 0.0, mount_top - detector_depth], placement)
+        self.window_normal = rotation @ [0.0, 0.0, 1.0]
+        self.window_radius = photodiode['hole_radius']
+
+    def window_hits(self, origins, directions):
+        """Ray parameter where rays cross the photodiode window, inf where they miss it."""
+        facing = directions @ self.window_normal
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = ((self.window_center - origins) @ self.window_normal) / facing
+        points = origins + t[:, None] * directions
+        inside = np.linalg.norm(points - self.window_center, axis=1) <= self.window_radius
+        return np.where((facing < 0) & (t > 0) & inside, t, np.inf)
+
+
+def beam_frames(beams):
+    """Unit vectors (u, v) across each beam, u along the LED pin line."""
+    u = np.cross([0.0, 0.0, 1.0], beams)
+    # A beam along Z has no pin line; any perpendicular will do
+    u[np.linalg.norm(u, axis=1) < 1e-12] = [1.0, 0.0, 0.0]
+    u /= np.linalg.norm(u, axis=1, keepdims=True)
+    return u, np.cross(beams, u)
+
+
+def emit(p, optics, count, rng):
+    """Sample count rays per LED in the ledHousing frame.
+
+    Returns origins and directions (LEDs, count, 3) and the emission
+    angles theta (off the beam) and phi (around it), (LEDs, count).
+    """
+    centers, beams = led_layout(p)
+    leds = len(centers)
+    u, v = beam_frames(beams)
+    u, v, w = u[:, None], v[:, None], beams[:, None]
+
+    radius = optics['emitter_radius'] * np.sqrt(rng.random((leds, count, 1)))
+    angle = 2 * np.pi * rng.random((leds, count, 1))
+    origins = (centers[:, None] + optics['emitter_offset'] * w
+               + radius * (np.cos(angle) * u + np.sin(angle) * v))
+
+    cos_theta = 1 - rng.random((leds, count)) * (1 - np.cos(np.radians(optics['half_angle_deg'])))
+    theta = np.arccos(cos_theta)
+    phi = 2 * np.pi * rng.random((leds, count))
+    sin_theta = np.sin(theta)[..., None]
+    directions = (cos_theta[..., None] * w
+                  + sin_theta * (np.cos(phi)[..., None] * u + np.sin(phi)[..., None] * v))
+    return origins, directions, theta, phi
+
+
+def bore_exit(p, origins, directions):
+    """Where rays leave the LED bores through the platform top (z = box_height).
+
+    Returns (exit points, mask of rays that clear the bore wall). Both
+    the emitter and the exit point lie inside the convex bore cylinder
+    exactly when the whole segment does, so checking the exit point
+    against the bore radius is enough.
+    """
+    centers, beams = led_layout(p)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = (p['box_height'] - origins[..., 2]) / directions[..., 2]
+    exits = origins + s[..., None] * directions
+    offset = exits - centers[:, None]
+    along = np.einsum('lnk,lk->ln', offset, beams)
+    radial = np.linalg.norm(offset - along[..., None] * beams[:, None], axis=-1)
+    clear = ((directions[..., 2] > 0) & (radial <= per_led(p, 'led_radius')[:, None])
+             & (along <= per_led(p, 'led_depth')[:, None]))
+    return exits, clear
+
+
+def empty_counts(parts, leds):
+    shape = (leds,) + MAP_BINS
+    return {
+        'emitted': np.zeros(leds, dtype=np.int64),
+        'bore': np.zeros(leds, dtype=np.int64),
+        'missed': np.zeros(leds, dtype=np.int64),
+        'captured': np.zeros(leds, dtype=np.int64),
+        'blocked': np.zeros((leds, len(parts)), dtype=np.int64),
+        'emitted_map': np.zeros(shape, dtype=np.int64),
+        'captured_map': np.zeros(shape, dtype=np.int64),
+        'blocked_map': np.zeros(shape, dtype=np.int64),
+    }
+
+
+def launch(scene, led_params, optics, count, rng):
+    """Emit count rays per LED of one LED housing variant up to the BVH query.
+
+    Returns the rays' LED and map cell, the mask clearing the bore, and
+    for the rays aimed at the photodiode window their indices, start
+    points, headings and distances to the window.
+    """
+    params = dict(scene.params, ledHousing=dict(scene.params.get('ledHousing', {}), **(led_params or {})))
+    p = kitAssembly.module_params(params)['ledHousing']
+    placement = kitAssembly.placements(params)['ledHousing']
+
+    origins, directions, theta, phi = emit(p, optics, count, rng)
+    exits, clear = bore_exit(p, origins, directions)
+    leds = led_count(p)
+    cell = (np.minimum(theta / np.radians(optics['half_angle_deg']) * MAP_BINS[0], MAP_BINS[0] - 1).astype(np.intp)
+            * MAP_BINS[1] + (phi / (2 * np.pi) * MAP_BINS[1]).astype(np.intp) % MAP_BINS[1]).ravel()
+    clear = clear.ravel()
+
+    rays = np.flatnonzero(clear)
+    starts = kitAssembly.transform(exits.reshape(-1, 3)[rays], placement)
+    heading = directions.reshape(-1, 3)[rays] @ placement[0].T
+    t_window = scene.window_hits(starts, heading)
+
+    # Only rays aimed at the window need the scene: a shadow ray up to it
+    aimed = np.isfinite(t_window)
+    return {
+        'count': count,
+        'leds': leds,
+        'led': np.repeat(np.arange(leds), count),
+        'cell': cell,
+        'clear': clear,
+        'rays': rays,
+        'aimed': rays[aimed],
+        'starts': starts[aimed],
+        'heading': heading[aimed],
+        't_window': t_window[aimed],
+    }
+
+
+def tally(scene, rays, t_hit, facets):
+    """Counts (see empty_counts) of launched rays, given the first hit of each aimed one."""
+    leds, led, clear, aimed = rays['leds'], rays['led'], rays['clear'], rays['aimed']
+    blocked = np.isfinite(t_hit)
+
+    counts = empty_counts(scene.parts, leds)
+    bins = leds * MAP_BINS[0] * MAP_BINS[1]
+    flat_cell = led * MAP_BINS[0] * MAP_BINS[1] + rays['cell']
+
+    def _per_selected(selected):
+        return np.bincount(led[selected], minlength=leds)
+
+    def per_cell(selected):
+        return np.bincount(flat_cell[selected], minlength=bins).reshape((leds,) + MAP_BINS)
+
+    counts['emitted'] += rays['count']
+    counts['bore'] += _per_selected(~clear)
+    counts['missed'] += _per_selected(rays['rays']) - _per_selected(aimed)
+    counts['captured'] += _per_selected(aimed[~blocked])
+    np.add.at(counts['blocked'], (led[aimed[blocked]], scene.facet_part[facets[blocked]]), 1)
+    counts['emitted_map'] += per_cell(np.arange(len(led)))
+    counts['captured_map'] += per_cell(aimed[~blocked])
+    counts['blocked_map'] += per_cell(aimed[blocked])
+    return counts
+
+
+def trace_many(scene, configs, optics=None, count=100000, rng=None):
+    """Trace count rays per LED for every LED housing variant in configs.
+
+    configs are ledHousing overrides on top of the scene's parameters.
+    The aimed rays of all variants go through one BVH query, so many
+    small variants cost little more than one large one. Returns integer
+    counts (see empty_counts) per variant; summarize() turns them into
+    fractions. Counts of several calls can simply be added.
+    """
+    optics = dict(OPTICS, **(optics or {}))
+    rng = rng if rng is not None else np.random.default_rng()
+    launched = [launch(scene, led_params, optics, count, rng) for led_params in configs]
+
+    t_hit, facets = scene.bvh.first_hits(np.concatenate([rays['starts'] for rays in launched]),
+                                         np.concatenate([rays['heading'] for rays in launched]),
+                                         t_max=np.concatenate([rays['t_window'] for rays in launched]))
+    splits = np.cumsum([len(rays['aimed']) for rays in launched])[:-1]
+    return [tally(scene, rays, t, hit) for rays, t, hit in zip(launched, np.split(t_hit, splits),
+                                                               np.split(facets, splits))]
+
+
+def trace(scene, led_params=None, optics=None, count=100000, rng=None):
+    """Trace count rays per LED for one LED housing variant (see trace_many)."""
+    return trace_many(scene, [led_params], optics, count, rng)[0]
+
+
+def summarize(counts, parts):
+    """Fractions of emitted rays per LED, and capture / occlusion maps."""
+    emitted = counts['emitted'].astype(np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        capture_map = counts['captured_map'] / counts['emitted_map']
+        occlusion_map = counts['blocked_map'] / (counts['blocked_map'] + counts['captured_map'])
+    return {
+        'rays': counts['emitted'].tolist(),
+        'captured': (counts['captured'] / emitted).tolist(),
+        'bore': (counts['bore'] / emitted).tolist(),
+        'missed': (counts['missed'] / emitted).tolist(),
+        'blocked': {part: (counts['blocked'][:, i] / emitted).tolist() for i, part in enumerate(parts)},
+        # Fraction of rays per emission direction reaching the window,
+        # and of those aimed at it that a part blocks (nan: none aimed)
+        'capture_map': capture_map,
+        'occlusion_map': occlusion_map,
+    }
+
+
+# ---------------------------------------
+# Parallel runs: one scene per worker process, reused for every batch
+# ---------------------------------------
+_scene = None
+
+
+def _init_worker(meshes, params, detector_depth):
+    global _scene
+    _scene = OpticalScene(meshes, params, detector_depth)
+
+
+def _trace_batch(configs, optics, count, seed):
+    return trace_many(_scene, configs, optics, count, np.random.default_rng(seed))
+
+
+def trace_configs(meshes, configs, optics=None, rays=DEFAULT_RAYS, params=None, jobs=1, seed=0, batch=50000):
+    """Trace every LED housing variant in configs (list of ledHousing overrides).
+
+    meshes are placed triangles (kitAssembly.load_assembly) built with
+    params. Tasks of about batch rays per LED, spread over jobs worker
+    processes, take a slice of the rays of one config, or several whole
+    configs traced together. Returns one summary per config.
+    """
+    optics = dict(OPTICS, **(optics or {}))
+    init = (meshes, params, optics['detector_depth'])
+    group = max(1, min(batch // rays, -(-len(configs) // jobs)))
+    tasks = [(list(range(i, min(i + group, len(configs)))), min(batch, rays - start), [seed, i, start])
+             for i in range(0, len(configs), group) for start in range(0, rays, batch)]
+
+    if jobs > 1:
+        with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=init) as pool:
+            futures = [pool.submit(_trace_batch, [configs[i] for i in indices], optics, count, task_seed)
+                       for indices, count, task_seed in tasks]
+            results = [future.result() for future in futures]
+    else:
+        _init_worker(*init)
+        results = [_trace_batch([configs[i] for i in indices], optics, count, task_seed)
+                   for indices, count, task_seed in tasks]
+
+    parts = [name for name in meshes if name != 'ledHousing']
+    totals = [None] * len(configs)
+    for (indices, _count, _seed), task_counts in zip(tasks, results):
+        for i, counts in zip(indices, task_counts):
+            if totals[i] is None:
+                totals[i] = empty_counts(parts, len(counts['emitted']))
+            for key, value in counts.items():
+                totals[i][key] += value
+    return [summarize(counts, parts) for counts in totals]
+
+
+def _json_map(values):
+    # nan (no rays in the bin) becomes null
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Trace LED light to the photodiode through the assembled box.')
+    parser.add_argument('--meshes', default='.', help='directory with the module STLs (default: .)')
+    parser.add_argument('--params', help='JSON file of {module: parameter overrides} the meshes were built with')
+    parser.add_argument('--rays', type=int, default=DEFAULT_RAYS,
+                        help='rays per LED and configuration (default: %(default)s)')
+    parser.add_argument('--tilt', type=float, nargs='+', help='LED tilt angles in degrees to compare')
+    parser.add_argument('--configs', help='JSON file with a list of ledHousing overrides to compare')
+    parser.add_argument('--half-angle', type=float, default=OPTICS['half_angle_deg'],
+                        help='LED emission half angle in degrees (default: %(default)s)')
+    parser.add_argument('--emitter-radius', type=float, default=OPTICS['emitter_radius'],
+                        help='emitting disk radius in mm (default: %(default)s)')
+    parser.add_argument('--detector-depth', type=float, default=OPTICS['detector_depth'],
+                        help='photodiode face below the top of its hole in mm (default: %(default)s)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='worker processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write the full report, maps included, to this file')
+    args = parser.parse_args(argv)
+
+    params = None
+    if args.params:
+        with open(args.params) as f:
+            params = json.load(f)
+    configs = [{}]
+    if args.configs:
+        with open(args.configs) as f:
+            configs = json.load(f)
+    elif args.tilt:
+        configs = [{'tilt_angle_deg': tilt} for tilt in args.tilt]
+    optics = {
+        'half_angle_deg': args.half_angle,
+        'emitter_radius': args.emitter_radius,
+        'detector_depth': args.detector_depth,
+    }
+
+    meshes = kitAssembly.load_assembly(args.meshes, params)
+    reports = trace_configs(meshes, configs, optics, args.rays, params, args.jobs, args.seed)
+
+    for config, report in zip(configs, reports):
+        print(json.dumps(config, sort_keys=True) if config else 'default LED housing')
+        for i in range(len(report['captured'])):
+            blocked = sorted(((fractions[i], part) for part, fractions in report['blocked'].items()), reverse=True)
+            print('  LED %d  captured %6.2f%%  bore %6.2f%%  missed %6.2f%%  blocked %s' % (
+                i, 100 * report['captured'][i], 100 * report['bore'][i], 100 * report['missed'][i],
+                ', '.join('%s %.2f%%' % (part, 100 * fraction) for fraction, part in blocked if fraction) or '-'))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([dict(report, config=config, capture_map=_json_map(report['capture_map']),
+                            occlusion_map=_json_map(report['occlusion_map']))
+                       for config, report in zip(configs, reports)], f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""Placed copies of one tool shape for repeated features.
+
+A builder that needs the same hole several times makes the tool once,
+at the origin along +Z, and places instances of it. Instances come from
+Shape.moved(Placement), which shares the tool's geometry (the OCC
+TShape) and only adds a location, so the solid is built, and its faces
+triangulated, once however many copies the boolean subtracts.
+
+    pin = Part.makeCylinder(pin_radius, pin_depth)
+    pins = linear_pattern(pin, 2, FreeCAD.Vector(0, -2 * spacing, 0), FreeCAD.Vector(0, spacing, 0))
+    bores = polar_pattern(place(bore, center, beam), 4)
+"""
+from kernelLoader import FreeCAD
+
+Z_AXIS = (0.0, 0.0, 1.0)
+
+
+def placement(base=(0.0, 0.0, 0.0), direction=Z_AXIS):
+    """Placement taking the origin to base and +Z onto direction."""
+    rotation = FreeCAD.Rotation(FreeCAD.Vector(*Z_AXIS), FreeCAD.Vector(*direction))
+    return FreeCAD.Placement(FreeCAD.Vector(*base), rotation)
+
+
+def place(tool, base, direction=Z_AXIS):
+    """Instance of a +Z tool at base, pointing along direction (like makeCylinder's arguments)."""
+    return tool.moved(placement(base, direction))
+
+
+def polar_pattern(tool, count, axis=Z_AXIS, center=(0.0, 0.0, 0.0), angle=360.0):
+    """count instances of tool, turned in equal steps about axis through center.
+
+    angle is the full sweep: 360 spreads the instances around the circle,
+    anything less places the last one at angle.
+    """
+    step = angle / count if abs(angle) >= 360.0 else angle / max(count - 1, 1)
+    return [tool.moved(FreeCAD.Placement(FreeCAD.Vector(), FreeCAD.Rotation(FreeCAD.Vector(*axis), i * step),
+                                         FreeCAD.Vector(*center)))
+            for i in range(count)]
+
+
+def linear_pattern(tool, count, step, start=(0.0, 0.0, 0.0)):
+    """count instances of tool at start, start + step, start + 2 step, ..."""
+    return [tool.moved(FreeCAD.Placement(FreeCAD.Vector(*start) + FreeCAD.Vector(*step) * i, FreeCAD.Rotation()))
+            for i in range(count)]
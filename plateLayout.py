@@ -0,0 +1,279 @@
+"""Print-bed layout: many kits' parts packed onto plates, one file per plate.
+
+Every part's footprint is the bounding rectangle of its mesh projected
+onto the bed, for each allowed rotation about Z. The rectangles, grown
+by the gap between parts, are packed largest first with the MaxRects
+heuristic: each plate keeps the maximal free rectangles left on it, a
+part goes where it leaves the least slack, and a new plate starts only
+when a part fits none of the open ones. Three fit rules, with all
+rotations and with each alone, are packed and the layout needing the
+fewest plates is kept; each pass takes milliseconds.
+
+    python3 plateLayout.py *.stl --kits 4 --bed 250x210
+    python3 plateLayout.py --kits 10 --angles 0 90 --formats 3mf,stl --out plates
+    python3 plateLayout.py fingerHoleModule.stl ledHousingModule.stl --copies 6 --json layout.json
+
+Parts print as modelled (Z up), dropped onto the bed. A 3MF plate holds
+every distinct part once and places its copies as build items; an STL
+plate repeats the triangles of every copy. Module names instead of STL
+files are built and tessellated first (this needs FreeCAD, as for
+meshExport.py).
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+import meshExport
+import stlIO
+from kitAssembly import rotation, transform
+
+PLATE_FORMATS = ('3mf', 'stl')
+
+# 0.4 mm nozzle printers: bed, bed edge kept free, gap between parts (mm)
+BED = (220.0, 220.0)
+MARGIN = 5.0
+GAP = 5.0
+
+# MaxRects fit rules: least slack on the short side, least leftover
+# area of the free rectangle, lowest top edge
+RULES = ('short_side', 'area', 'bottom_left')
+
+
+# ---------------------------------------
+# Footprints
+# ---------------------------------------
+
+def footprints(vertices, angles):
+    """((A, 2) footprint sizes, (A, 2) footprint minima) of vertices turned by each angle about Z."""
+    xy = np.asarray(vertices, dtype=np.float64)[:, :2]
+    radians = np.radians(np.asarray(angles, dtype=np.float64))
+    c, s = np.cos(radians)[:, None], np.sin(radians)[:, None]
+    x = c * xy[:, 0] - s * xy[:, 1]
+    y = s * xy[:, 0] + c * xy[:, 1]
+    lo = np.stack([x.min(axis=1), y.min(axis=1)], axis=1)
+    hi = np.stack([x.max(axis=1), y.max(axis=1)], axis=1)
+    return hi - lo, lo
+
+
+# ---------------------------------------
+# MaxRects packing
+# ---------------------------------------
+
+class Plate:
+    """Free space of one plate as its maximal free rectangles (x, y, w, h)."""
+
+    def __init__(self, width, height):
+        self.size = (width, height)
+        self.free = np.array([[0.0, 0.0, width, height]])
+        self.items = []
+
+    def best_fit(self, sizes, rule='short_side'):
+        """(free rectangle, size index) of the best fit under rule (see RULES), None if nothing fits."""
+        w = self.free[:, 2, None] - sizes[None, :, 0]
+        h = self.free[:, 3, None] - sizes[None, :, 1]
+        fits = (w >= 0) & (h >= 0)
+        if not fits.any():
+            return None
+        x = np.broadcast_to(self.free[:, 0, None], w.shape)
+        y = np.broadcast_to(self.free[:, 1, None], w.shape)
+        if rule == 'short_side':
+            keys = (np.minimum(w, h), np.maximum(w, h))
+        elif rule == 'area':
+            keys = (self.free[:, 2, None] * self.free[:, 3, None] - sizes[None, :, 0] * sizes[None, :, 1],
+                    np.minimum(w, h))
+        elif rule == 'bottom_left':
+            keys = (y + sizes[None, :, 1], x)
+        else:
+            raise ValueError('unknown rule %r, expected one of %s' % (rule, ', '.join(RULES)))
+        # Ties go to the lowest, then leftmost position
+        primary, secondary = (np.where(fits, key, np.inf) for key in keys)
+        order = np.lexsort((x.ravel(), y.ravel(), secondary.ravel(), primary.ravel()))
+        rect, size = np.unravel_index(order[0], w.shape)
+        return int(rect), int(size)
+
+    def place(self, x, y, w, h):
+        """Take the rectangle at (x, y) out of the free space."""
+        f = self.free
+        right, top = x + w, y + h
+        hit = (f[:, 0] < right) & (f[:, 0] + f[:, 2] > x) & (f[:, 1] < top) & (f[:, 1] + f[:, 3] > y)
+        kept, cut = f[~hit], f[hit]
+        fx, fy, fw, fh = cut.T
+        pieces = np.concatenate([
+            np.stack([fx, fy, x - fx, fh], axis=1)[x > fx],
+            np.stack([np.full_like(fx, right), fy, fx + fw - right, fh], axis=1)[fx + fw > right],
+            np.stack([fx, fy, fw, y - fy], axis=1)[y > fy],
+            np.stack([fx, np.full_like(fy, top), fw, fy + fh - top], axis=1)[fy + fh > top],
+        ])
+        free = np.concatenate([kept, pieces])
+
+        # Drop rectangles inside another (of equal ones, all but the first)
+        lo, hi = free[:, :2], free[:, :2] + free[:, 2:]
+        inside = ((lo[:, None] >= lo[None]) & (hi[:, None] <= hi[None])).all(axis=2)
+        equal = inside & inside.T
+        np.fill_diagonal(inside, False)
+        inside &= ~equal | (np.arange(len(free))[:, None] > np.arange(len(free))[None])
+        self.free = free[~inside.any(axis=1)]
+
+
+def pack(parts, bed=BED, margin=MARGIN, gap=GAP, angles=(0.0, 90.0), rule='short_side'):
+    """Pack parts [(name, vertices)] onto as few plates as needed; a name stands for one mesh.
+
+    Returns [[{name, angle, x, y, size}]] per plate, (x, y) being the
+    lower left corner of the part's footprint on the bed.
+    """
+    usable = (bed[0] - 2 * margin + gap, bed[1] - 2 * margin + gap)
+    candidates, sizes_of = [], {}
+    for index, (name, vertices) in enumerate(parts):
+        if name not in sizes_of:
+            sizes_of[name] = footprints(vertices, angles)[0]
+        sizes = sizes_of[name]
+        candidates.append((float((sizes[:, 0] * sizes[:, 1]).min()), float(sizes.max()), index, name, sizes))
+    # Largest first; equal parts keep their input order
+    candidates.sort(key=lambda item: (-item[0], -item[1], item[2]))
+
+    plates = []
+    for _area, _side, _index, name, sizes in candidates:
+        grown = sizes + gap
+        for plate in plates:
+            fit = plate.best_fit(grown, rule)
+            if fit:
+                break
+        else:
+            plate = Plate(*usable)
+            fit = plate.best_fit(grown, rule)
+            if fit is None:
+                raise ValueError('%s (%.1f x %.1f mm) does not fit a %g x %g mm bed'
+                                 % (name, sizes[0, 0], sizes[0, 1], bed[0], bed[1]))
+            plates.append(plate)
+        rect, size = fit
+        x, y = plate.free[rect, :2]
+        plate.place(x, y, *grown[size])
+        plate.items.append({'name': name, 'angle': float(angles[size]), 'x': float(x + margin),
+                            'y': float(y + margin), 'size': sizes[size].tolist()})
+    return [plate.items for plate in plates]
+
+
+def best_layout(parts, bed=BED, margin=MARGIN, gap=GAP, angles=(0.0, 90.0)):
+    """The best of pack() under every rule, with all angles and with each angle alone.
+
+    Greedy packing mixing rotations can lose to a single rotation on
+    parts of equal size, and each rule has layouts it does badly on, so
+    all are tried: fewest plates win, then the emptiest last plate
+    (the others being fuller).
+    """
+    angle_sets = [list(angles)] + ([[angle] for angle in angles] if len(angles) > 1 else [])
+    best = None
+    for rule in RULES:
+        for subset in angle_sets:
+            try:
+                plates = pack(parts, bed, margin, gap, subset, rule)
+            except ValueError:
+                # A part may only fit the bed turned
+                continue
+            key = (len(plates), plate_fill(plates[-1], bed))
+            if best is None or key < best[0]:
+                best = key, plates
+    if best is None:
+        # Every attempt failed; let pack() explain which part does not fit
+        return pack(parts, bed, margin, gap, angles)
+    return best[1]
+
+
+def item_placement(vertices, item):
+    """(rotation, translation) putting a part where its layout item says, resting on the bed."""
+    r = rotation('z', item['angle'])
+    _sizes, mins = footprints(vertices, [item['angle']])
+    z = float(np.asarray(vertices)[:, 2].min())
+    return r, np.array([item['x'] - mins[0, 0], item['y'] - mins[0, 1], -z])
+
+
+def plate_fill(items, bed=BED):
+    """Fraction of the bed covered by the parts' footprints."""
+    return sum(item['size'][0] * item['size'][1] for item in items) / (bed[0] * bed[1])
+
+
+# ---------------------------------------
+# Plate files
+# ---------------------------------------
+
+def write_plate(path_stem, fmt, meshes, items):
+    """Write one plate from meshes {name: (vertices, faces)} and its layout items."""
+    if fmt == '3mf':
+        placements = {}
+        for item in items:
+            placements.setdefault(item['name'], []).append(item_placement(meshes[item['name']][0], item))
+        parts = [(name, *meshes[name]) for name in placements]
+        return meshExport.write_3mf(path_stem + '.3mf', parts, placements)
+    if fmt == 'stl':
+        tris = [transform(meshes[item['name']][0][meshes[item['name']][1]],
+                          item_placement(meshes[item['name']][0], item)) for item in items]
+        path = path_stem + '.stl'
+        stlIO.write_stl(path, np.concatenate(tris))
+        return path
+    raise ValueError('unsupported plate format %r, expected one of %s' % (fmt, ', '.join(PLATE_FORMATS)))
+
+
+def parse_bed(text):
+    width, _, depth = text.lower().partition('x')
+    return float(width), float(depth or width)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Pack kit parts onto print beds and write one file per plate.')
+    parser.add_argument('inputs', nargs='*',
+                        help='module names or STL files; repeat one to print it more often (default: all five modules)')
+    parser.add_argument('--kits', type=int, default=1, help='copies of the whole input list (default: 1)')
+    parser.add_argument('--copies', type=int, default=1, help='copies of each input within a kit (default: 1)')
+    parser.add_argument('--bed', type=parse_bed, default=BED, help='bed size WIDTHxDEPTH in mm (default: 220x220)')
+    parser.add_argument('--margin', type=float, default=MARGIN, help='free bed edge in mm (default: %(default)s)')
+    parser.add_argument('--gap', type=float, default=GAP, help='gap between parts in mm (default: %(default)s)')
+    parser.add_argument('--angles', type=float, nargs='+', default=[0.0, 90.0],
+                        help='allowed rotations about Z in degrees (default: 0 90)')
+    parser.add_argument('--out', default='plates', help='output directory (default: plates)')
+    parser.add_argument('--name', default='plate', help='file name stem of the plates (default: plate)')
+    parser.add_argument('--formats', default='3mf', help='comma separated: %s (default: 3mf)' % ', '.join(PLATE_FORMATS))
+    parser.add_argument('--linear', type=float, default=meshExport.DEFAULT_LINEAR,
+                        help='linear deflection in mm for built modules (default: %(default)s)')
+    parser.add_argument('--angular', type=float, default=meshExport.DEFAULT_ANGULAR,
+                        help='angular deflection in radians for built modules (default: %(default)s)')
+    parser.add_argument('--json', help='write the layout to this file')
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip().lower() for fmt in args.formats.split(',') if fmt.strip()]
+    for fmt in formats:
+        if fmt not in PLATE_FORMATS:
+            parser.error('unsupported format %r' % fmt)
+    if not args.inputs:
+        from buildKit import MODULES
+        args.inputs = list(MODULES)
+
+    unique = list(dict.fromkeys(args.inputs))
+    loaded = meshExport.load_parts(unique, args.linear, args.angular, meshExport.DEFAULT_WELD)
+    meshes = {name: (vertices, faces) for _module, name, vertices, faces in loaded}
+    names = dict(zip(unique, (name for _module, name, _vertices, _faces in loaded)))
+    order = [names[item] for item in args.inputs] * args.copies * args.kits
+    try:
+        plates = best_layout([(name, meshes[name][0]) for name in order], args.bed, args.margin, args.gap,
+                             args.angles)
+    except ValueError as error:
+        parser.error(str(error))
+
+    os.makedirs(args.out, exist_ok=True)
+    for number, items in enumerate(plates, 1):
+        stem = os.path.join(args.out, '%s_%02d' % (args.name, number))
+        paths = [write_plate(stem, fmt, meshes, items) for fmt in formats]
+        print('plate %2d: %3d part(s), %4.1f %% of the bed  %s' % (
+            number, len(items), 100 * plate_fill(items, args.bed), '  '.join(os.path.basename(path) for path in paths)))
+    print('%d part(s) on %d plate(s)' % (len(order), len(plates)))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'bed': list(args.bed), 'margin': args.margin, 'gap': args.gap, 'plates': plates}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
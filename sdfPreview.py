@@ -0,0 +1,434 @@
+"""Fast signed distance preview of the module builders.
+
+The builders run unchanged, with their Part swapped for this module:
+makeBox, makeCylinder (any direction), fuse, cut, common, rotate,
+translate and moved (patternOps instances) build a tree of signed
+distance functions instead of B-rep solids. The tree is sampled on a
+NumPy grid slab by slab, so memory stays bounded by --chunk points
+whatever the resolution, and tools that lie farther than two voxels
+from a slab are not evaluated there at all.
+The surface is extracted with marching tetrahedra (six per grid cell,
+so the mesh is closed) and the volume is taken from the grid.
+
+At 0.5 mm a part meshes in about a second or less and its volume alone
+takes a few tenths, within 0.1 % of the kernel's for the five modules:
+close enough to see a dimension change or rank sweep candidates. Edges
+are rounded to about one voxel, so final output still goes through the
+exact kernel (buildKit.py).
+
+    python3 sdfPreview.py ledHousing --set tilt_angle_deg=15 --stl preview.stl
+    python3 sdfPreview.py --resolution 0.25
+"""
+import argparse
+import contextlib
+import copy
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+DEFAULT_RESOLUTION = 0.5    # grid spacing in mm
+DEFAULT_CHUNK = 1 << 20     # grid points evaluated at once
+
+SHIM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'freecadShim')
+
+# Kuhn split of a cube into six tetrahedra along the 0-7 diagonal; corner
+# c of a cell sits at offset (c & 1, c >> 1 & 1, c >> 2 & 1)
+_TETS = np.array([[0, 1, 3, 7], [0, 1, 5, 7], [0, 2, 3, 7], [0, 2, 6, 7], [0, 4, 5, 7], [0, 4, 6, 7]])
+_CORNERS = np.array([[c & 1, c >> 1 & 1, c >> 2 & 1] for c in range(8)])
+
+
+def _axis_rotation(axis, degrees):
+    axis = np.asarray(tuple(axis), dtype=np.float64)
+    axis /= np.linalg.norm(axis)
+    x, y, z = axis
+    c, s = math.cos(math.radians(degrees)), math.sin(math.radians(degrees))
+    return np.array([
+        [c + x * x * (1 - c), x * y * (1 - c) - z * s, x * z * (1 - c) + y * s],
+        [y * x * (1 - c) + z * s, c + y * y * (1 - c), y * z * (1 - c) - x * s],
+        [z * x * (1 - c) - y * s, z * y * (1 - c) + x * s, c + z * z * (1 - c)],
+    ])
+
+
+def _frame(direction):
+    """Rotation taking local Z onto direction."""
+    w = np.asarray(tuple(direction), dtype=np.float64)
+    w /= np.linalg.norm(w)
+    helper = np.array([1.0, 0.0, 0.0]) if abs(w[0]) < 0.9 else np.array([0.0, 1.0, 0.0])
+    u = np.cross(helper, w)
+    u /= np.linalg.norm(u)
+    return np.stack([u, np.cross(w, u), w], axis=1)
+
+
+# ---------------------------------------
+# Part-compatible SDF shapes
+# ---------------------------------------
+class Shape:
+    """Node of the SDF tree with its own placement (world from local)."""
+
+    def __init__(self, kind='empty', children=(), size=()):
+        self.kind = kind                # empty, box, cylinder, fuse, cut or common
+        self.children = list(children)
+        self.size = tuple(size)         # box (x, y, z); cylinder (radius, height)
+        self.rotation = np.eye(3)
+        self.translation = np.zeros(3)
+
+    def _boolean(self, kind, others):
+        others = list(others) if isinstance(others, (list, tuple)) else [others]
+        return Shape(kind, [self] + others)
+
+    def fuse(self, others):
+        return self._boolean('fuse', others)
+
+    def cut(self, others):
+        return self._boolean('cut', others)
+
+    def common(self, others):
+        return self._boolean('common', others)
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    def moved(self, placement):
+        """New instance of this shape under placement, sharing its tree."""
+        matrix = np.array(placement.toMatrix().A).reshape(4, 4)
+        shape = Shape('fuse', [self])
+        shape.rotation = matrix[:3, :3]
+        shape.translation = matrix[:3, 3]
+        return shape
+
+    def rotate(self, center, axis, degrees):
+        """Rotate in place about the axis through center; returns self."""
+        r = _axis_rotation(axis, degrees)
+        c = np.asarray(tuple(center), dtype=np.float64)
+        self.rotation = r @ self.rotation
+        self.translation = r @ (self.translation - c) + c
+        return self
+
+    def translate(self, offset):
+        self.translation = self.translation + np.asarray(tuple(offset), dtype=np.float64)
+        return self
+
+    def bounds(self):
+        """World axis-aligned bounds (lo, hi); conservative under rotation."""
+        if self.kind == 'box':
+            lo, hi = np.zeros(3), np.array(self.size, dtype=np.float64)
+        elif self.kind == 'cylinder':
+            r, h = self.size
+            lo, hi = np.array([-r, -r, 0.0]), np.array([r, r, h])
+        elif self.kind == 'empty':
+            return self.translation.copy(), self.translation.copy()
+        else:
+            bounds = [child.bounds() for child in self.children]
+            if self.kind == 'fuse':
+                lo = np.min([b[0] for b in bounds], axis=0)
+                hi = np.max([b[1] for b in bounds], axis=0)
+            elif self.kind == 'cut':
+                lo, hi = bounds[0]
+            else:
+                lo = np.max([b[0] for b in bounds], axis=0)
+                hi = np.maximum(np.min([b[1] for b in bounds], axis=0), lo)
+        corners = lo + _CORNERS * (hi - lo)
+        points = corners @ self.rotation.T + self.translation
+        return points.min(axis=0), points.max(axis=0)
+
+    def distance(self, points, lo=None, hi=None, margin=0.0):
+        """Signed distance (negative inside) of world points.
+
+        Nodes whose bounds miss the box [lo, hi] grown by margin are
+        skipped and come back as None: everything in the box is more than
+        margin outside them. Inside booleans, every tool but the first is
+        only evaluated at the points within margin of its bounds; farther
+        away the values are only bounds. Exact only near the surface of
+        boolean results, which is all the sign and marching tetrahedra need.
+        """
+        if lo is not None:
+            own_lo, own_hi = self.bounds()
+            if (own_lo > hi + margin).any() or (own_hi < lo - margin).any():
+                return None
+        local = (points - self.translation) @ self.rotation
+        # Per-coordinate columns; reductions over a length-3 axis are slow
+        if self.kind == 'box':
+            q = [np.abs(local[:, i] - size / 2.0) - size / 2.0 for i, size in enumerate(self.size)]
+            return _combine(q)
+        if self.kind == 'cylinder':
+            r, h = self.size
+            return _combine([np.hypot(local[:, 0], local[:, 1]) - r, np.abs(local[:, 2] - h / 2.0) - h / 2.0])
+        if self.kind == 'empty':
+            return None
+        if lo is not None:
+            # Children see the box in this node's local frame
+            corners = (lo + _CORNERS * (hi - lo) - self.translation) @ self.rotation
+            lo, hi = corners.min(axis=0), corners.max(axis=0)
+        result = self.children[0].distance(local, lo, hi, margin)
+        if result is None and self.kind != 'fuse':
+            return None
+        for child in self.children[1:]:
+            # Only the points near the child need its distance
+            child_lo, child_hi = child.bounds()
+            near = np.ones(len(local), dtype=bool)
+            for i in range(3):
+                near &= (local[:, i] >= child_lo[i] - margin) & (local[:, i] <= child_hi[i] + margin)
+            if not near.any():
+                if self.kind == 'common':
+                    return None
+                continue
+            d = child.distance(local[near], margin=margin)
+            if self.kind == 'fuse':
+                if result is None:
+                    result = np.full(len(local), margin)
+                result[near] = np.minimum(result[near], d)
+            elif self.kind == 'cut':
+                result[near] = np.maximum(result[near], -d)
+            else:
+                far = np.full(len(local), margin)
+                far[near] = d
+                result = np.maximum(result, far)
+        return result
+
+    @property
+    def Volume(self):
+        return sample(self, DEFAULT_RESOLUTION, mesh=False)['volume']
+
+
+def _combine(q):
+    """Exact distance from per-axis slab distances q of a box-like primitive."""
+    outside = sum(np.maximum(qi, 0.0) ** 2 for qi in q)
+    return np.sqrt(outside) + np.minimum(np.maximum.reduce(q), 0.0)
+
+
+def makeBox(length, width, height, origin=None, direction=None):
+    shape = Shape('box', size=(length, width, height))
+    if direction is not None:
+        shape.rotation = _frame(direction)
+    if origin is not None:
+        shape.translation = np.asarray(tuple(origin), dtype=np.float64)
+    return shape
+
+
+def makeCylinder(radius, height, base=None, direction=None):
+    shape = Shape('cylinder', size=(radius, height))
+    if direction is not None:
+        shape.rotation = _frame(direction)
+    if base is not None:
+        shape.translation = np.asarray(tuple(base), dtype=np.float64)
+    return shape
+
+
+def makeCompound(shapes):
+    return Shape('fuse', shapes)
+
+
+def _shim_freecad():
+    """freecadShim's FreeCAD: Vector, Rotation and Placement in plain Python."""
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location('FreeCAD', os.path.join(SHIM_DIR, 'FreeCAD.py'))
+    shim = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(shim)
+    return shim
+
+
+@contextlib.contextmanager
+def sdf_kernel(module):
+    """Let a builder module build SDF trees while the block runs.
+
+    The builders keep using FreeCAD for their vector math (FreeCAD.Vector,
+    Rotation and Placement, also in patternOps.py). Without FreeCAD the
+    pure Python stand-in from freecadShim takes its place for the block,
+    so no CAD kernel is needed at all.
+    """
+    import kernelLoader
+
+    part = module.Part
+    module.Part = sys.modules[__name__]
+    installed = False
+    try:
+        kernelLoader.load('FreeCAD')
+    except ImportError:
+        # The builders' kernelLoader proxies look FreeCAD up in sys.modules
+        sys.modules['FreeCAD'] = _shim_freecad()
+        installed = True
+    try:
+        yield
+    finally:
+        module.Part = part
+        if installed:
+            sys.modules.pop('FreeCAD', None)
+
+
+def build_sdf(module, params=None):
+    """The module's final shape as an SDF tree (builders run unchanged)."""
+    with sdf_kernel(module):
+        return module.build(params)
+
+
+# ---------------------------------------
+# Grid sampling and marching tetrahedra
+# ---------------------------------------
+def _interpolate(pa, fa, pb, fb):
+    t = (fa / (fa - fb))[:, None]
+    return pa + t * (pb - pa)
+
+
+def _tetrahedra(positions, values):
+    """Triangles where (m, 4, 3) tetrahedra with (m, 4) values cross zero.
+
+    Triangles face the positive (outside) side.
+    """
+    inside = values < 0
+    count = inside[:, 0].astype(np.int8) + inside[:, 1] + inside[:, 2] + inside[:, 3]
+    crossing = (count > 0) & (count < 4)
+    inside, count = inside[crossing], count[crossing]
+    order = np.argsort(~inside, axis=1, kind='stable')     # inside corners first
+    p = np.take_along_axis(positions[crossing], order[:, :, None], axis=1)
+    f = np.take_along_axis(values[crossing], order, axis=1)
+    tris, outward = [], []
+
+    # One corner apart from the other three: a single triangle
+    for lone, a, rest in ((count == 1, 0, (1, 2, 3)), (count == 3, 3, (0, 1, 2))):
+        pa, fa = p[lone, a], f[lone, a]
+        tris.append(np.stack([_interpolate(pa, fa, p[lone, b], f[lone, b]) for b in rest], axis=1))
+        outward.append(p[lone, 3] - p[lone, 0])
+
+    # Two inside, two outside: a quad split in two; each triangle plane
+    # separates corner 3 from corner 0 and from corner 1 respectively
+    pt, ft = p[count == 2], f[count == 2]
+    q = [_interpolate(pt[:, i], ft[:, i], pt[:, j], ft[:, j]) for i, j in ((0, 2), (0, 3), (1, 3), (1, 2))]
+    tris.append(np.stack([q[0], q[1], q[2]], axis=1))
+    outward.append(pt[:, 3] - pt[:, 0])
+    tris.append(np.stack([q[0], q[2], q[3]], axis=1))
+    outward.append(pt[:, 3] - pt[:, 1])
+
+    tris = np.concatenate(tris)
+    outward = np.concatenate(outward)
+    normals = np.cross(tris[:, 1] - tris[:, 0], tris[:, 2] - tris[:, 0])
+    flip = np.einsum('ij,ij->i', normals, outward) < 0
+    tris[flip] = tris[flip][:, ::-1]
+    return tris[(normals != 0).any(axis=1)]
+
+
+def _march(values, origin, spacing):
+    """Triangles of the zero level set of a (nx, ny, nz) sample block."""
+    nx, ny, nz = values.shape
+    if min(nx, ny, nz) < 2:
+        return np.zeros((0, 3, 3))
+    inside = values < 0
+    any_inside = np.zeros((nx - 1, ny - 1, nz - 1), dtype=bool)
+    all_inside = np.ones((nx - 1, ny - 1, nz - 1), dtype=bool)
+    for dx, dy, dz in _CORNERS:
+        corner = inside[dx:nx - 1 + dx, dy:ny - 1 + dy, dz:nz - 1 + dz]
+        any_inside |= corner
+        all_inside &= corner
+    cell = np.argwhere(any_inside & ~all_inside)
+    if not len(cell):
+        return np.zeros((0, 3, 3))
+    corner_index = cell[:, None, :] + _CORNERS[None]                        # (m, 8, 3)
+    corner_values = values[corner_index[..., 0], corner_index[..., 1], corner_index[..., 2]]
+    corner_points = origin + corner_index * spacing
+    tris = [_tetrahedra(corner_points[:, tet], corner_values[:, tet]) for tet in _TETS]
+    return np.concatenate(tris)
+
+
+def sample(shape, resolution=DEFAULT_RESOLUTION, chunk=DEFAULT_CHUNK, mesh=True):
+    """Sample shape on a grid; returns volume, mesh triangles and grid size.
+
+    The grid reaches two voxels past the bounds, so the mesh is closed.
+    Slabs of grid layers are evaluated in turn (adjacent slabs share one
+    layer for the mesh), each at most chunk points.
+    """
+    lo, hi = shape.bounds()
+    margin = 2 * resolution
+    # Half a voxel off the bounds, so the faces on round dimensions fall
+    # between samples instead of on them (zero samples give slivers)
+    origin = lo - margin - resolution / 2.0
+    counts = np.ceil((hi + margin - origin) / resolution).astype(int) + 1
+    layer = int(counts[1] * counts[2])
+    layers = max(2, chunk // max(layer, 1))
+
+    yz = np.stack(np.meshgrid(np.arange(counts[1]), np.arange(counts[2]), indexing='ij'), axis=-1).reshape(-1, 2)
+    occupied = 0.0
+    tris = []
+    start = 0
+    while start < counts[0]:
+        stop = min(start + layers, counts[0])
+        xs = np.arange(start, stop)
+        index = np.concatenate([np.repeat(xs, layer)[:, None], np.tile(yz, (len(xs), 1))], axis=1)
+        points = origin + index * resolution
+        values = shape.distance(points, points.min(axis=0), points.max(axis=0), margin)
+        if values is None:
+            values = np.full(len(points), margin)
+        # Share of each voxel inside, from the distance at its center
+        occupied += np.clip(0.5 - values / resolution, 0.0, 1.0).sum()
+        if mesh:
+            block = values.reshape(len(xs), counts[1], counts[2])
+            if start > 0:
+                block = np.concatenate([previous, block])
+            tris.append(_march(block, origin + [(start - (start > 0)) * resolution, 0, 0], resolution))
+            previous = block[-1:]
+        start = stop
+
+    return {
+        'volume': occupied * resolution ** 3,
+        'triangles': np.concatenate(tris) if tris else np.zeros((0, 3, 3)),
+        'grid': tuple(int(n) for n in counts),
+        'resolution': resolution,
+    }
+
+
+def preview(module, params=None, resolution=DEFAULT_RESOLUTION, chunk=DEFAULT_CHUNK, mesh=True):
+    """Build module through the SDF kernel and sample it; adds timing to sample()."""
+    start = time.perf_counter()
+    shape = build_sdf(module, params)
+    result = sample(shape, resolution, chunk, mesh)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def main(argv=None):
+    import buildKit
+    import meshGeometry
+    import stlIO
+
+    parser = argparse.ArgumentParser(description='Preview module builds through signed distance functions.')
+    parser.add_argument('modules', nargs='*', help='modules to preview (default: all)')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='override a parameter (JSON value), may be repeated')
+    parser.add_argument('--resolution', type=float, default=DEFAULT_RESOLUTION,
+                        help='grid spacing in mm (default: %(default)s)')
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK,
+                        help='grid points evaluated at once (default: %(default)s)')
+    parser.add_argument('--volume-only', action='store_true', help='skip the mesh')
+    parser.add_argument('--stl', help='write the preview mesh to this STL (one module only)')
+    args = parser.parse_args(argv)
+
+    modules = args.modules or list(buildKit.MODULES)
+    if args.stl and len(modules) != 1:
+        parser.error('--stl needs exactly one module')
+    overrides = buildKit.parse_overrides(args.set)
+    try:
+        loaded = [buildKit.load_module(name) for name in modules]
+    except ValueError as error:
+        parser.error(str(error))
+    # Each module takes the overrides it has, but every override must reach one
+    unused = sorted(set(overrides).difference(*(module.PARAMS for module in loaded)))
+    if unused:
+        parser.error('no selected module has parameter(s) %s' % ', '.join(unused))
+
+    for name, module in zip(modules, loaded):
+        params = {key: value for key, value in overrides.items() if key in module.PARAMS}
+        result = preview(module, params, args.resolution, args.chunk, not args.volume_only)
+        tris = result['triangles']
+        line = '%-24s %7.3f s  grid %s  volume %10.1f mm3' % (
+            name, result['seconds'], 'x'.join(str(n) for n in result['grid']), result['volume'])
+        if not args.volume_only:
+            line += '  (mesh %10.1f mm3, %d triangles)' % (meshGeometry.signed_volume(tris), len(tris))
+        print(line)
+        if args.stl:
+            stlIO.write_stl(args.stl, tris.astype(np.float32))
+
+
+if __name__ == '__main__':
+    main()
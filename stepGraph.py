@@ -0,0 +1,110 @@
+"""Incremental rebuilds of a module's step pipeline.
+
+A builder module is a chain of nodes: build_base followed by one node
+per CUT_STEPS entry, each cutting its tools from the previous node's
+shape. Every node memoizes its output together with the parameter
+values it actually read (recorded while it ran), so a rebuild re-runs
+a node only when one of those values changed or an upstream node was
+re-run. Changing fingerHole's led_window_width therefore re-runs only
+'STEP 10: LED Light Window':
+
+    builder = IncrementalBuilder(fingerHole)
+    shape = builder.build()
+    shape = builder.build({'led_window_width': 19.0})
+    builder.last_run   # ['STEP 10: LED Light Window']
+
+Returned shapes are the memoized objects; copy them before modifying
+them in place (rotate, translate, ...).
+"""
+import booleanOps
+
+BASE_NODE = 'base'
+
+
+class TrackedParams(dict):
+    """Parameter dict that records which names were read."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = set()
+
+    def __getitem__(self, name):
+        self.reads.add(name)
+        return super().__getitem__(name)
+
+    def get(self, name, default=None):
+        self.reads.add(name)
+        return super().get(name, default)
+
+
+class _Memo:
+
+    def __init__(self, values, shape):
+        self.values = values    # {param name: value read by the node}
+        self.shape = shape
+
+
+class IncrementalBuilder:
+
+    def __init__(self, module):
+        self.module = module
+        self.nodes = [BASE_NODE] + [label for label, _step in module.CUT_STEPS]
+        self._steps = dict(module.CUT_STEPS)
+        self._memo = {}
+        self.last_run = []
+        self.run_counts = {node: 0 for node in self.nodes}
+
+    def graph(self):
+        """Return {node: [upstream nodes]} for the pipeline."""
+        return {node: self.nodes[i - 1:i] for i, node in enumerate(self.nodes)}
+
+    def reads(self, node):
+        """Parameter names the node read on its last run (empty if never run)."""
+        memo = self._memo.get(node)
+        return sorted(memo.values) if memo else []
+
+    def _is_current(self, node, p):
+        memo = self._memo.get(node)
+        if memo is None:
+            return False
+        return all(name in p and p[name] == value for name, value in memo.values.items())
+
+    def stale_nodes(self, params=None):
+        """Nodes a build with these parameters would re-run, in order."""
+        p = dict(self.module.PARAMS, **(params or {}))
+        stale = []
+        for node in self.nodes:
+            if stale or not self._is_current(node, p):
+                stale.append(node)
+        return stale
+
+    def _run(self, node, p, shape):
+        tracked = TrackedParams(p)
+        if node == BASE_NODE:
+            output = self.module.build_base(tracked)
+        else:
+            tools = booleanOps.flatten_tools([(node, self._steps[node](tracked))])
+            output = booleanOps.cut_batched(shape, tools)
+        self._memo[node] = _Memo({name: p[name] for name in tracked.reads}, output)
+        self.run_counts[node] += 1
+        return output
+
+    def build(self, params=None):
+        p = dict(self.module.PARAMS, **(params or {}))
+        self.last_run = []
+        shape = None
+        for node in self.nodes:
+            # Once a node re-runs, everything downstream sees a new input shape
+            if self.last_run or not self._is_current(node, p):
+                shape = self._run(node, p, shape)
+                self.last_run.append(node)
+            else:
+                shape = self._memo[node].shape
+        return shape
+
+    def invalidate(self, node=None):
+        """Forget the memo of one node (and so everything after it) or of all nodes."""
+        if node is None:
+            self._memo.clear()
+        else:
+            self._memo.pop(node, None)
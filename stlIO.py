@@ -0,0 +1,213 @@
+"""Binary STL reading and writing with NumPy, no CAD kernel required.
+
+A binary STL is an 80 byte header, a little-endian uint32 facet count
+and one 50 byte record per facet. STL_DTYPE describes that record, so a
+file can be memory-mapped and used as a structured array without
+copying:
+
+    facets = read_stl('ledHousingModule.stl')
+    facets['vertices']          # (n, 3, 3) float32 view into the file
+    facets['normal']            # (n, 3)
+
+    for chunk in iter_stl('huge.stl', chunk_facets=1 << 20):
+        ...                     # bounded memory, one chunk at a time
+
+    write_stl('copy.stl', facets['vertices'])
+
+ASCII STL files are also read (parsed into memory, so never zero-copy).
+
+    python3 stlIO.py *.stl      # facet counts and bounding boxes
+"""
+import argparse
+import os
+import struct
+
+import numpy as np
+
+HEADER_SIZE = 80
+COUNT_SIZE = 4
+DATA_OFFSET = HEADER_SIZE + COUNT_SIZE
+
+STL_DTYPE = np.dtype([
+    ('normal', '<f4', (3,)),
+    ('vertices', '<f4', (3, 3)),
+    ('attr', '<u2'),
+])
+
+DEFAULT_HEADER = b'binary STL written by stlIO.py'
+
+
+def is_binary_stl(path):
+    """A file is binary when its size matches the facet count in its header."""
+    size = os.path.getsize(path)
+    if size < DATA_OFFSET:
+        return False
+    with open(path, 'rb') as f:
+        f.seek(HEADER_SIZE)
+        (count,) = struct.unpack('<I', f.read(COUNT_SIZE))
+    return size == DATA_OFFSET + count * STL_DTYPE.itemsize
+
+
+def read_header(path):
+    """Return (header bytes, facet count) of a binary STL."""
+    with open(path, 'rb') as f:
+        header = f.read(HEADER_SIZE)
+        (count,) = struct.unpack('<I', f.read(COUNT_SIZE))
+    return header, count
+
+
+def _read_ascii_stl(path):
+    normals = []
+    vertices = []
+    with open(path, 'r', errors='replace') as f:
+        for line in f:
+            words = line.split()
+            if not words:
+                continue
+            if words[0] == 'facet' and len(words) >= 5:
+                normals.append([float(v) for v in words[2:5]])
+            elif words[0] == 'vertex' and len(words) >= 4:
+                vertices.append([float(v) for v in words[1:4]])
+    if len(vertices) != 3 * len(normals):
+        raise ValueError('%s: malformed ASCII STL' % path)
+    facets = np.zeros(len(normals), dtype=STL_DTYPE)
+    facets['normal'] = np.asarray(normals, dtype=np.float32).reshape(-1, 3)
+    facets['vertices'] = np.asarray(vertices, dtype=np.float32).reshape(-1, 3, 3)
+    return facets
+
+
+def read_stl(path, mmap=True):
+    """Return the facets of an STL file as a STL_DTYPE array.
+
+    Binary files are memory-mapped read-only when mmap is true, otherwise
+    read into memory. ASCII files are always parsed into memory.
+    """
+    if not is_binary_stl(path):
+        with open(path, 'rb') as f:
+            if f.read(5).lower() == b'solid':
+                return _read_ascii_stl(path)
+        raise ValueError('%s: not a valid STL file' % path)
+    _header, count = read_header(path)
+    if count == 0:
+        return np.zeros(0, dtype=STL_DTYPE)
+    if mmap:
+        return np.memmap(path, dtype=STL_DTYPE, mode='r', offset=DATA_OFFSET, shape=(count,))
+    return np.fromfile(path, dtype=STL_DTYPE, count=count, offset=DATA_OFFSET)
+
+
+def iter_stl(path, chunk_facets=1 << 20):
+    """Yield consecutive STL_DTYPE chunks of a binary STL with bounded memory."""
+    _header, count = read_header(path)
+    with open(path, 'rb') as f:
+        f.seek(DATA_OFFSET)
+        remaining = count
+        while remaining:
+            n = min(chunk_facets, remaining)
+            chunk = np.fromfile(f, dtype=STL_DTYPE, count=n)
+            if len(chunk) != n:
+                raise ValueError('%s: truncated STL (expected %d facets)' % (path, count))
+            remaining -= n
+            yield chunk
+
+
+def facet_normals(vertices):
+    """Unit normals of (n, 3, 3) triangles; zero for degenerate facets."""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    normals = np.cross(vertices[:, 1] - vertices[:, 0], vertices[:, 2] - vertices[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, lengths, out=normals, where=lengths > 0)
+    normals[lengths[:, 0] == 0] = 0
+    return normals
+
+
+def make_facets(vertices, normals=None, attr=None):
+    """Pack (n, 3, 3) triangles into a STL_DTYPE array."""
+    vertices = np.asarray(vertices)
+    facets = np.empty(len(vertices), dtype=STL_DTYPE)
+    facets['vertices'] = vertices
+    facets['normal'] = facet_normals(vertices) if normals is None else normals
+    facets['attr'] = 0 if attr is None else attr
+    return facets
+
+
+def _header_bytes(header):
+    if isinstance(header, str):
+        header = header.encode('ascii', 'replace')
+    # A header starting with 'solid' makes some readers take the file for ASCII
+    if header[:5].lower() == b'solid':
+        header = b'binary ' + header
+    return header[:HEADER_SIZE].ljust(HEADER_SIZE, b' ')
+
+
+def write_stl(path, data, normals=None, header=DEFAULT_HEADER):
+    """Write a binary STL from a STL_DTYPE array or (n, 3, 3) triangles."""
+    data = np.asarray(data)
+    facets = data if data.dtype == STL_DTYPE else make_facets(data, normals)
+    with open(path, 'wb') as f:
+        f.write(_header_bytes(header))
+        f.write(struct.pack('<I', len(facets)))
+        np.ascontiguousarray(facets, dtype=STL_DTYPE).tofile(f)
+
+
+class StlWriter:
+    """Streaming binary STL writer; the facet count is patched on close.
+
+        with StlWriter('out.stl') as writer:
+            for chunk in iter_stl('in.stl'):
+                writer.write(chunk)
+    """
+
+    def __init__(self, path, header=DEFAULT_HEADER):
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'wb')
+        self._file.write(_header_bytes(header))
+        self._file.write(struct.pack('<I', 0))
+
+    def write(self, data, normals=None):
+        data = np.asarray(data)
+        facets = data if data.dtype == STL_DTYPE else make_facets(data, normals)
+        np.ascontiguousarray(facets, dtype=STL_DTYPE).tofile(self._file)
+        self.count += len(facets)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.seek(HEADER_SIZE)
+        self._file.write(struct.pack('<I', self.count))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def bounding_box(path, chunk_facets=1 << 20):
+    """Return (min xyz, max xyz) of an STL, streaming over its facets."""
+    lo = np.full(3, np.inf)
+    hi = np.full(3, -np.inf)
+    for chunk in iter_stl(path, chunk_facets) if is_binary_stl(path) else [read_stl(path)]:
+        points = chunk['vertices'].reshape(-1, 3)
+        if len(points):
+            lo = np.minimum(lo, points.min(axis=0))
+            hi = np.maximum(hi, points.max(axis=0))
+    return lo, hi
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Show facet counts and bounding boxes of STL files.')
+    parser.add_argument('paths', nargs='+', help='STL files')
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        count = read_header(path)[1] if is_binary_stl(path) else len(read_stl(path))
+        lo, hi = bounding_box(path)
+        size = hi - lo
+        print('%-36s %8d facets  %7.2f x %7.2f x %7.2f mm' % (
+            os.path.basename(path), count, size[0], size[1], size[2]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""Symmetric construction: cut one sector, mirror it, cut the rest.
+
+Most modules are mirror symmetric about the XZ and YZ planes: the
+photodiode housing, the finger hole block, the LED housing (its four
+LED bores are a quarter turn apart, but in a 34 x 50 box, so the solid
+keeps the two mirrors, not the quarter turn). Their booleans can then
+run on a half or quarter of the base solid, which is mirrored back
+afterwards. The cuts that break a symmetry are applied to the whole
+solid at the end.
+
+Nothing is declared per module. The symmetry planes are those under
+which the base solid is its own mirror image, and a cut step stays in
+the sector when its tools, taken together, are their own mirror image
+under every one of those planes. Shapes are compared by volume, center
+of mass and inertia tensor per solid (Solid.Volume, CenterOfMass,
+MatrixOfInertia), which the kernel computes from the B-rep without
+booleans:
+
+    planes = symmetry_planes(base)                  # ('x', 'y'): mirrors x -> -x and y -> -y
+    inside, after = split_steps(steps, planes, 50.0)  # e.g. the 45 degree bump cutter goes after
+    shape = cut_symmetric(base, steps)              # what apply_cuts(base, steps, 'symmetric') does
+
+    python3 symmetryOps.py              # planes and symmetry breaking steps of every module
+"""
+import argparse
+
+from kernelLoader import FreeCAD, Part
+import numpy as np
+
+import booleanOps
+
+# Mirror planes through the origin, by the axis they negate
+MIRRORS = {
+    'x': (1.0, 0.0, 0.0),
+    'y': (0.0, 1.0, 0.0),
+}
+
+# Relative tolerance on lengths (to the part size), volumes and inertia
+TOLERANCE = 1e-6
+
+
+# ---------------------------------------
+# Mirror signatures
+# ---------------------------------------
+
+def signatures(shape):
+    """[(volume, center of mass, inertia tensor)] of every solid of shape."""
+    result = []
+    for solid in shape.Solids:
+        inertia = np.array(solid.MatrixOfInertia.A, dtype=np.float64).reshape(4, 4)[:3, :3]
+        result.append((float(solid.Volume), np.array(tuple(solid.CenterOfMass), dtype=np.float64), inertia))
+    return result
+
+
+def mirrored(signature, axis):
+    """Signature of the mirror image of a solid in the plane negating axis."""
+    volume, center, inertia = signature
+    flip = np.ones(3)
+    flip['xyz'.index(axis)] = -1.0
+    return volume, center * flip, inertia * np.outer(flip, flip)
+
+
+def _same(a, b, size):
+    volume = max(abs(a[0]), abs(b[0]), 1e-300)
+    return (abs(a[0] - b[0]) <= TOLERANCE * volume
+            and np.abs(a[1] - b[1]).max() <= TOLERANCE * size
+            and np.abs(a[2] - b[2]).max() <= TOLERANCE * volume * size * size)
+
+
+def invariant(shapes, axis, size):
+    """True when the mirror images of shapes (as a set) are shapes again.
+
+    size is the length the tolerance is relative to, the size of the
+    part. Each mirrored solid must match a different solid of the set.
+    """
+    solids = [signature for shape in shapes for signature in signatures(shape)]
+    unmatched = list(range(len(solids)))
+    for signature in solids:
+        image = mirrored(signature, axis)
+        match = next((i for i in unmatched if _same(image, solids[i], size)), None)
+        if match is None:
+            return False
+        unmatched.remove(match)
+    return True
+
+
+def _size(shape):
+    box = shape.BoundBox
+    return max(box.XMax - box.XMin, box.YMax - box.YMin, box.ZMax - box.ZMin, 1e-9)
+
+
+def symmetry_planes(base):
+    """Axes of the MIRRORS under which base is its own mirror image."""
+    size = _size(base)
+    return tuple(axis for axis in MIRRORS if invariant([base], axis, size))
+
+
+def split_steps(steps, planes, size):
+    """(steps cut in the sector, steps cut after mirroring) of (label, tools) steps."""
+    inside, after = [], []
+    for label, tools in steps:
+        tools = tools if isinstance(tools, (list, tuple)) else [tools]
+        symmetric = all(invariant(tools, axis, size) for axis in planes)
+        (inside if symmetric else after).append((label, tools))
+    return inside, after
+
+
+# ---------------------------------------
+# Construction
+# ---------------------------------------
+
+def sector_box(shape, planes):
+    """Box over the part on the positive side of every plane."""
+    box = shape.BoundBox
+    margin = 0.01 * _size(shape) + 1.0
+    lo = [box.XMin - margin, box.YMin - margin, box.ZMin - margin]
+    hi = [box.XMax + margin, box.YMax + margin, box.ZMax + margin]
+    for axis in planes:
+        lo['xyz'.index(axis)] = 0.0
+    return Part.makeBox(hi[0] - lo[0], hi[1] - lo[1], hi[2] - lo[2], FreeCAD.Vector(*lo))
+
+
+def _overlaps(shape, box):
+    a, b = shape.BoundBox, box.BoundBox
+    return (a.XMin <= b.XMax and b.XMin <= a.XMax and a.YMin <= b.YMax and b.YMin <= a.YMax
+            and a.ZMin <= b.ZMax and b.ZMin <= a.ZMax)
+
+
+def mirror_fuse(sector, planes):
+    """The sector and its mirror images in every plane, fused into one solid."""
+    shape = sector
+    for axis in planes:
+        shape = shape.fuse(shape.mirror(FreeCAD.Vector(0, 0, 0), FreeCAD.Vector(*MIRRORS[axis])))
+    # Fusing along the mirror planes leaves split faces; merge them
+    return shape.removeSplitter()
+
+
+def cut_symmetric(base, steps):
+    """Same solid as booleanOps.cut_batched(base, all tools), built from one sector.
+
+    Falls back to a plain batched cut when the base has no symmetry or no
+    step keeps it.
+    """
+    planes = symmetry_planes(base)
+    inside, after = split_steps(steps, planes, _size(base))
+    if not planes or not inside:
+        return booleanOps.cut_batched(base, booleanOps.flatten_tools(steps))
+
+    box = sector_box(base, planes)
+    sector = base.common(box)
+    # Tools wholly in the mirrored sectors come back with the mirror
+    tools = [tool for tool in booleanOps.flatten_tools(inside) if _overlaps(tool, box)]
+    sector = booleanOps.cut_batched(sector, tools)
+    return booleanOps.cut_batched(mirror_fuse(sector, planes), booleanOps.flatten_tools(after))
+
+
+def analyze(module, params=None):
+    """Symmetry planes of a module's base and where each of its cut steps goes."""
+    p = dict(module.PARAMS, **(params or {}))
+    base = module.build_base(p)
+    steps = [(label, step(p)) for label, step in module.CUT_STEPS]
+    planes = symmetry_planes(base)
+    inside, after = split_steps(steps, planes, _size(base))
+    return {
+        'module': module.__name__,
+        'planes': list(planes),
+        'sector': {(): 'whole', ('x',): 'half', ('y',): 'half', ('x', 'y'): 'quarter'}[planes],
+        'sector_steps': [label for label, _tools in inside],
+        'after_steps': [label for label, _tools in after],
+    }
+
+
+def main(argv=None):
+    import buildKit
+
+    parser = argparse.ArgumentParser(description='Show the symmetry planes and symmetry breaking cuts of each module.')
+    parser.add_argument('modules', nargs='*', help='modules to analyze (default: all)')
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.modules or buildKit.MODULES:
+        result = analyze(buildKit.load_module(name))
+        results.append(result)
+        print('%-24s %-7s mirrors %-4s  %d step(s) in the sector, after: %s' % (
+            name, result['sector'], ','.join(result['planes']) or '-', len(result['sector_steps']),
+            ', '.join(result['after_steps']) or '-'))
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,425 @@
+"""Monte Carlo tolerance stack-up of the assembled box.
+
+Every dimension in DIMENSIONS is drawn around its nominal value with the
+print process's scatter (and optionally its bias: outside dimensions
+print large, pockets small). Parts float within their clearances, and
+each LED bore gets a small direction error. For each sampled kit the
+CHECKS give a margin in mm (>= 0: OK), all samples at once:
+
+- fit: a tab or insert still enters its pocket (the clearances
+  46.0 - 0.2, 18 - 0.2, 2 - 0.1 and the 1.7 mm photodiode pocket walls)
+- seat: a tab does not bottom out before its part sits on its rim,
+  allowing seat_allowance of overlap to be squeezed out
+- optics: every LED beam axis passes the fingerHole light hole and
+  lands on the photodiode hole (the convergence on the photodiode axis)
+
+The report gives the yield (kits passing every check), the pass rate and
+margin spread of each check, and per dimension its share of each
+check's variance (linear fit over the samples) and the yield if that
+dimension were held exact, i.e. which dimensions actually drive the
+failed kits. Samples are split into batches over worker processes; the
+batches return sums only, so memory stays flat at any sample count.
+
+    python3 toleranceStack.py --samples 1000000 --jobs 4
+    python3 toleranceStack.py --sigma 0.08 --bias 0.05 --tolerances tolerances.json --json stack.json
+
+A tolerances file overrides the scatter per dimension:
+{"fingerHole": {"top_width": 0.1}}.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import buildKit
+from ledGeometry import led_count, led_layout
+
+PROCESS = {
+    'sigma': 0.05,              # standard deviation of printed dimensions, mm
+    'bias': 0.0,                # outside dimensions print this much large, pockets small, mm
+    'angle_sigma_deg': 0.25,    # standard deviation of printed angles
+    'bore_sigma_deg': 0.25,     # direction error of each LED bore
+    'seat_allowance': 0.1,      # axial overlap a seat may squeeze out, mm
+}
+
+# (module, parameter, kind): 'outside' and 'pocket' get the bias with
+# opposite signs, 'position' none, 'angle' the angular scatter
+DIMENSIONS = (
+    ('photodiodeHousing', 'housing_height', 'outside'),
+    ('photodiodeHousing', 'pocket_width', 'pocket'),
+    ('photodiodeHousing', 'pocket_length', 'pocket'),
+    ('photodiodeHousing', 'pocket_height', 'pocket'),
+    ('photodiodeHousing', 'mount_height', 'outside'),
+    ('photodiodeHousing', 'hole_radius', 'pocket'),
+    ('fingerHole', 'bottom_width', 'outside'),
+    ('fingerHole', 'bottom_length', 'outside'),
+    ('fingerHole', 'bottom_height', 'outside'),
+    ('fingerHole', 'middle_height', 'outside'),
+    ('fingerHole', 'top_width', 'outside'),
+    ('fingerHole', 'top_length', 'outside'),
+    ('fingerHole', 'top_height', 'outside'),
+    ('fingerHole', 'light_radius', 'pocket'),
+    ('fingerHole', 'light_depth', 'position'),
+    ('fingerHole', 'filter_width', 'pocket'),
+    ('fingerHole', 'filter_depth', 'pocket'),
+    ('fingerHole', 'filter_height', 'pocket'),
+    ('fingerHole', 'side_pocket_width', 'pocket'),
+    ('fingerHole', 'side_pocket_height', 'pocket'),
+    ('ledHousing', 'box_width', 'outside'),
+    ('ledHousing', 'box_length', 'outside'),
+    ('ledHousing', 'box_height', 'outside'),
+    ('ledHousing', 'wall_thickness', 'outside'),
+    ('ledHousing', 'base_thickness', 'outside'),
+    ('ledHousing', 'tilt_angle_deg', 'angle'),
+    ('ledHousing', 'led_distance', 'position'),
+    ('ledHousing', 'led_plane_z', 'position'),
+    ('opticalFilterMountSlot', 'mount_width', 'outside'),
+    ('opticalFilterMountSlot', 'mount_length', 'outside'),
+    ('opticalFilterMountSlot', 'mount_height', 'outside'),
+    ('humiditySensorMountSlot', 'mount_block_width', 'outside'),
+    ('humiditySensorMountSlot', 'mount_block_length', 'outside'),
+)
+
+BIAS_SIGN = {'outside': 1.0, 'pocket': -1.0, 'position': 0.0, 'angle': 0.0}
+
+
+# ---------------------------------------
+# Sampling
+# ---------------------------------------
+
+def nominal_params(params=None):
+    """Full parameter dicts of the five modules, given {module: overrides}."""
+    params = params or {}
+    return {name: dict(buildKit.load_module(name).PARAMS, **params.get(name, {})) for name in buildKit.MODULES}
+
+
+def scatter(process, tolerances=None):
+    """(bias, sigma) per entry of DIMENSIONS."""
+    tolerances = tolerances or {}
+    bias = np.array([process['bias'] * BIAS_SIGN[kind] for _module, _name, kind in DIMENSIONS])
+    sigma = np.array([
+        tolerances.get(module, {}).get(name, process['angle_sigma_deg'] if kind == 'angle' else process['sigma'])
+        for module, name, kind in DIMENSIONS])
+    return bias, sigma
+
+
+def sample(nominal, count, rng, process, tolerances=None):
+    """Draw count kits: (deviations (count, dims), random draws for play and bores)."""
+    bias, sigma = scatter(process, tolerances)
+    deviations = bias + sigma * rng.standard_normal((count, len(DIMENSIONS)))
+    draws = {
+        'finger_play': rng.uniform(-1.0, 1.0, (count, 2)),
+        'led_play': rng.uniform(-1.0, 1.0, (count, 2)),
+        'bore_error': np.radians(process['bore_sigma_deg']) * rng.standard_normal((count, led_count(nominal['ledHousing']), 2)),
+    }
+    return deviations, draws
+
+
+def kit_params(nominal, deviations):
+    """{module: params} with each sampled dimension as a (count,) column."""
+    p = {module: dict(params) for module, params in nominal.items()}
+    for (module, name, _kind), column in zip(DIMENSIONS, deviations.T):
+        p[module][name] = nominal[module][name] + column
+    return p
+
+
+# ---------------------------------------
+# Checks, all kits at once
+#
+# Each returns the margin in mm per kit, >= 0 when satisfied. Assembly
+# axes as in kitAssembly.py: fingerHole is turned 90 degrees about Z, so
+# its Y runs along X; ledHousing is flipped about X.
+# ---------------------------------------
+
+def _photodiode_gaps(p):
+    pd, finger = p['photodiodeHousing'], p['fingerHole']
+    return np.stack(np.broadcast_arrays(pd['pocket_width'] - finger['bottom_length'],
+                                        pd['pocket_length'] - finger['bottom_width']), axis=-1)
+
+
+def _groove_gaps(p):
+    """(outer, inner) gaps of the fingerHole top tab ring in the LED housing groove, (count, 2) each."""
+    led, finger = p['ledHousing'], p['fingerHole']
+    outer = np.stack(np.broadcast_arrays(led['box_width'] - 2 * led['wall_thickness'] - finger['top_length'],
+                                         led['box_length'] - 2 * led['wall_thickness'] - finger['top_width']), axis=-1)
+    # The tab ring is top_wall wide, the platform platform_inset inside the box
+    inner = np.stack(np.broadcast_arrays(
+        finger['top_length'] - 2 * finger['top_wall'] - (led['box_width'] - 2 * led['platform_inset']),
+        finger['top_width'] - 2 * finger['top_wall'] - (led['box_length'] - 2 * led['platform_inset'])), axis=-1)
+    return outer, inner
+
+
+def photodiode_pocket_fit(p, draws, process):
+    return _photodiode_gaps(p).min(axis=-1)
+
+
+def led_groove_outer_fit(p, draws, process):
+    return _groove_gaps(p)[0].min(axis=-1)
+
+
+def led_groove_inner_fit(p, draws, process):
+    return _groove_gaps(p)[1].min(axis=-1)
+
+
+def filter_slot_fit(p, draws, process):
+    finger, mount = p['fingerHole'], p['opticalFilterMountSlot']
+    return np.minimum(finger['filter_width'] - mount['mount_width'], finger['filter_height'] - mount['mount_length'])
+
+
+def humidity_slot_fit(p, draws, process):
+    finger, mount = p['fingerHole'], p['humiditySensorMountSlot']
+    return np.minimum(finger['side_pocket_width'] - mount['mount_block_width'],
+                      finger['side_pocket_height'] - mount['mount_block_length'])
+
+
+def finger_tab_seat(p, draws, process):
+    """The bottom tab does not bottom out in the photodiode pocket before the middle block sits on the rim."""
+    return p['photodiodeHousing']['pocket_height'] - p['fingerHole']['bottom_height'] + process['seat_allowance']
+
+
+def photodiode_mount_seat(p, draws, process):
+    """The photodiode mount does not hold the fingerHole off the housing rim."""
+    pd = p['photodiodeHousing']
+    return pd['pocket_height'] - pd['mount_height'] + process['seat_allowance']
+
+
+def led_tab_seat(p, draws, process):
+    """The top tab does not bottom out in the LED groove before the housing sits on the middle block."""
+    led = p['ledHousing']
+    return led['box_height'] - led['base_thickness'] - p['fingerHole']['top_height'] + process['seat_allowance']
+
+
+def filter_slot_seat(p, draws, process):
+    """The filter mount does not bottom out before its base plate is flush."""
+    return p['fingerHole']['filter_depth'] - p['opticalFilterMountSlot']['mount_height'] + process['seat_allowance']
+
+
+def _beams(p, draws):
+    """LED beam origins and directions in the assembly, with play and bore errors, (count, LEDs, 3)."""
+    led, finger, pd = p['ledHousing'], p['fingerHole'], p['photodiodeHousing']
+    centers, beams = led_layout(led)
+    count = len(draws['led_play'])
+    centers = np.broadcast_to(centers, (count,) + centers.shape[-2:])
+    beams = np.broadcast_to(beams, (count,) + beams.shape[-2:])
+
+    # Bore direction error: tip the beam about two axes across it
+    across = np.cross(beams, [0.0, 0.0, 1.0])
+    across /= np.linalg.norm(across, axis=-1, keepdims=True)
+    up = np.cross(across, beams)
+    error = draws['bore_error']
+    beams = beams + error[..., :1] * across + error[..., 1:] * up
+    beams = beams / np.linalg.norm(beams, axis=-1, keepdims=True)
+
+    # Stack heights as in kitAssembly.placements, the housing flipped about X
+    finger_z = pd['housing_height'] - finger['bottom_height']
+    led_z = finger_z + finger['bottom_height'] + finger['middle_height'] + led['box_height']
+    outer, inner = _groove_gaps(p)
+    shift = (draws['finger_play'] * np.maximum(_photodiode_gaps(p), 0) / 2
+             + draws['led_play'] * np.maximum(np.minimum(outer, inner), 0) / 2)
+    flip = np.array([1.0, -1.0, -1.0])
+    origins = centers * flip + np.concatenate([shift, np.zeros((count, 1))], axis=-1)[:, None, :]
+    origins[..., 2] += np.broadcast_to(led_z, count)[:, None]
+    return origins, beams * flip
+
+
+def _axis_miss(origins, beams, z, center):
+    """Distance of each beam axis from center (count, 2) in the plane at height z (count,)."""
+    t = (np.broadcast_to(z, origins.shape[:1])[:, None] - origins[..., 2]) / beams[..., 2]
+    hits = origins[..., :2] + t[..., None] * beams[..., :2]
+    return np.linalg.norm(hits - center[:, None, :], axis=-1)
+
+
+def beam_light_hole(p, draws, process):
+    """Every beam axis passes the fingerHole light hole, at its top and bottom."""
+    finger, pd = p['fingerHole'], p['photodiodeHousing']
+    origins, beams = _beams(p, draws)
+    center = draws['finger_play'] * np.maximum(_photodiode_gaps(p), 0) / 2
+    bottom = pd['housing_height']
+    miss = np.maximum(_axis_miss(origins, beams, bottom, center),
+                      _axis_miss(origins, beams, bottom + finger['light_depth'], center))
+    return finger['light_radius'] - miss.max(axis=-1)
+
+
+def beam_photodiode(p, draws, process):
+    """Every beam axis lands on the photodiode hole (its top, on the housing axis)."""
+    pd = p['photodiodeHousing']
+    origins, beams = _beams(p, draws)
+    top = pd['housing_height'] - pd['pocket_height'] + pd['mount_height']
+    miss = _axis_miss(origins, beams, top, np.zeros((len(origins), 2)))
+    return pd['hole_radius'] - miss.max(axis=-1)
+
+
+CHECKS = (
+    ('photodiode_pocket_fit', 'fit', photodiode_pocket_fit),
+    ('led_groove_outer_fit', 'fit', led_groove_outer_fit),
+    ('led_groove_inner_fit', 'fit', led_groove_inner_fit),
+    ('filter_slot_fit', 'fit', filter_slot_fit),
+    ('humidity_slot_fit', 'fit', humidity_slot_fit),
+    ('finger_tab_seat', 'seat', finger_tab_seat),
+    ('photodiode_mount_seat', 'seat', photodiode_mount_seat),
+    ('led_tab_seat', 'seat', led_tab_seat),
+    ('filter_slot_seat', 'seat', filter_slot_seat),
+    ('beam_light_hole', 'optics', beam_light_hole),
+    ('beam_photodiode', 'optics', beam_photodiode),
+)
+
+
+def evaluate(nominal, deviations, draws, process):
+    """(count, checks) margins of the sampled kits."""
+    p = kit_params(nominal, deviations)
+    count = len(deviations)
+    return np.stack([np.broadcast_to(check(p, draws, process), count) for _name, _category, check in CHECKS], axis=1)
+
+
+# ---------------------------------------
+# Batches and statistics
+# ---------------------------------------
+
+def run_batch(nominal, process, tolerances, count, seed):
+    """Additive statistics of count sampled kits."""
+    rng = np.random.default_rng(seed)
+    deviations, draws = sample(nominal, count, rng, process, tolerances)
+    margins = evaluate(nominal, deviations, draws, process)
+    passed = margins >= 0
+
+    # The same kits with one dimension at a time held at its nominal value
+    exact = np.empty(len(DIMENSIONS), dtype=np.int64)
+    for j in range(len(DIMENSIONS)):
+        held = deviations.copy()
+        held[:, j] = 0.0
+        exact[j] = int((evaluate(nominal, held, draws, process) >= 0).all(axis=1).sum())
+
+    x = np.concatenate([np.ones((count, 1)), deviations], axis=1)
+    return {
+        'count': count,
+        'passed': int(passed.all(axis=1).sum()),
+        'check_passed': passed.sum(axis=0),
+        'margin_sum': margins.sum(axis=0),
+        'margin_sq': (margins ** 2).sum(axis=0),
+        'margin_min': margins.min(axis=0),
+        'exact_passed': exact,
+        'xtx': x.T @ x,
+        'xty': x.T @ margins,
+    }
+
+
+def _merge(total, part):
+    if total is None:
+        return dict(part)
+    merged = {key: total[key] + part[key] for key in part if key != 'margin_min'}
+    merged['margin_min'] = np.minimum(total['margin_min'], part['margin_min'])
+    return merged
+
+
+def summarize(stats, process, tolerances=None):
+    n = stats['count']
+    mean = stats['margin_sum'] / n
+    std = np.sqrt(np.maximum(stats['margin_sq'] / n - mean ** 2, 0.0))
+
+    # Linear fit margin ~ deviations; share of each dimension in each check's variance
+    xtx = stats['xtx']
+    coef = np.linalg.lstsq(xtx, stats['xty'], rcond=None)[0][1:]
+    dev_mean = xtx[0, 1:] / n
+    dev_var = np.diag(xtx)[1:] / n - dev_mean ** 2
+    share = coef ** 2 * dev_var[:, None] / np.maximum(std ** 2, 1e-30)
+
+    _bias, sigma = scatter(process, tolerances)
+    yield_ = stats['passed'] / n
+    checks = {name: {
+        'category': category,
+        'pass_rate': float(stats['check_passed'][k] / n),
+        'margin_mean': float(mean[k]),
+        'margin_std': float(std[k]),
+        'margin_min': float(stats['margin_min'][k]),
+    } for k, (name, category, _check) in enumerate(CHECKS)}
+    dimensions = {}
+    for j, (module, name, kind) in enumerate(DIMENSIONS):
+        dimensions['%s.%s' % (module, name)] = {
+            'kind': kind,
+            'sigma': float(sigma[j]),
+            'yield_if_exact': float(stats['exact_passed'][j] / n),
+            'yield_gain': float(stats['exact_passed'][j] / n - yield_),
+            'sensitivity': {check: float(coef[j, k]) for k, (check, _category, _fn) in enumerate(CHECKS)},
+            'variance_share': {check: float(share[j, k]) for k, (check, _category, _fn) in enumerate(CHECKS)},
+        }
+    return {'samples': n, 'yield': float(yield_), 'process': process, 'checks': checks, 'dimensions': dimensions}
+
+
+def analyze(samples=100000, process=None, tolerances=None, params=None, jobs=1, seed=0, batch=20000):
+    """Sample, check and summarize samples kits over jobs worker processes."""
+    process = dict(PROCESS, **(process or {}))
+    nominal = nominal_params(params)
+    tasks = [(min(batch, samples - start), [seed, start]) for start in range(0, samples, batch)]
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(jobs) as pool:
+            futures = [pool.submit(run_batch, nominal, process, tolerances, count, task_seed)
+                       for count, task_seed in tasks]
+            results = [future.result() for future in futures]
+    else:
+        results = [run_batch(nominal, process, tolerances, count, task_seed) for count, task_seed in tasks]
+    stats = None
+    for result in results:
+        stats = _merge(stats, result)
+    return summarize(stats, process, tolerances)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Monte Carlo tolerance stack-up of the assembled box.')
+    parser.add_argument('--samples', type=int, default=100000, help='kits to sample (default: 100000)')
+    parser.add_argument('--sigma', type=float, default=PROCESS['sigma'],
+                        help='standard deviation of printed dimensions in mm (default: %(default)s)')
+    parser.add_argument('--bias', type=float, default=PROCESS['bias'],
+                        help='outside dimensions print this much large, pockets small (default: %(default)s)')
+    parser.add_argument('--angle-sigma', type=float, default=PROCESS['angle_sigma_deg'],
+                        help='standard deviation of printed angles in degrees (default: %(default)s)')
+    parser.add_argument('--bore-sigma', type=float, default=PROCESS['bore_sigma_deg'],
+                        help='LED bore direction error in degrees (default: %(default)s)')
+    parser.add_argument('--seat-allowance', type=float, default=PROCESS['seat_allowance'],
+                        help='axial overlap a seat may squeeze out in mm (default: %(default)s)')
+    parser.add_argument('--tolerances', help='JSON file of {module: {parameter: sigma}} overrides')
+    parser.add_argument('--params', help='JSON file of {module: parameter overrides} for the nominal design')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='worker processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--top', type=int, default=10, help='dimensions to list (default: 10)')
+    parser.add_argument('--json', help='write the full report to this file')
+    args = parser.parse_args(argv)
+
+    tolerances = params = None
+    if args.tolerances:
+        with open(args.tolerances) as f:
+            tolerances = json.load(f)
+    if args.params:
+        with open(args.params) as f:
+            params = json.load(f)
+    process = {
+        'sigma': args.sigma,
+        'bias': args.bias,
+        'angle_sigma_deg': args.angle_sigma,
+        'bore_sigma_deg': args.bore_sigma,
+        'seat_allowance': args.seat_allowance,
+    }
+
+    report = analyze(args.samples, process, tolerances, params, args.jobs, args.seed)
+    print('%d kits: yield %.2f%%' % (report['samples'], 100 * report['yield']))
+    for name, check in report['checks'].items():
+        print('  %-24s %-6s pass %6.2f%%  margin %+7.3f +- %.3f mm  (min %+.3f)' % (
+            name, check['category'], 100 * check['pass_rate'], check['margin_mean'], check['margin_std'],
+            check['margin_min']))
+    print('dimensions driving failures (yield if held exact):')
+    ranked = sorted(report['dimensions'].items(), key=lambda item: -item[1]['yield_gain'])
+    for name, dim in ranked[:args.top]:
+        check, share = max(dim['variance_share'].items(), key=lambda item: item[1])
+        print('  %-42s sigma %.3f  %6.2f%% (%+.2f)  %3.0f%% of %s' % (
+            name, dim['sigma'], 100 * dim['yield_if_exact'], 100 * dim['yield_gain'], 100 * share, check))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""Wall thickness of STL meshes by inward ray casting.
+
+Every facet is covered with sample points (meshGeometry.cover_points,
+pulled slightly towards the facet centre so no ray starts on an edge).
+From each point a ray runs against the facet normal, into the material,
+and its first hit on the mesh BVH (meshBVH.MeshBVH.first_hits, all rays
+of a batch together) is the wall thickness there. A facet's thickness is
+the smallest of its samples. Facets thinner than the printer's minimum
+wall are grouped into connected regions and reported:
+
+    python3 wallThickness.py *.stl --min-wall 0.8
+    python3 wallThickness.py build sweep --jobs 4 --json walls.json
+    python3 wallThickness.py ledHousingModule.stl --ply maps     # per-facet map
+
+The exit status is 1 when any file has a region below --min-wall, so
+the check can run after every build or sweep. Thickness is measured
+along the normal only: a wall meeting another at a corner reads as the
+distance through the wall, not as the (larger) corner diagonal.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import meshExport
+import stlIO
+from meshBVH import MeshBVH, _unit_normals
+from meshGeometry import as_triangles, cover_points, triangle_areas
+from meshProperties import stl_paths
+
+# Two 0.4 mm perimeters, as designSweep.MIN_WALL
+MIN_WALL = 0.8
+
+# Samples are pulled this fraction of the way to their facet's centre
+SHRINK = 0.02
+
+# A hit facet turned further than this from the start facet (its normal
+# against the ray) is the far side of a wedge, e.g. where a tilted hole
+# breaks through a face and leaves a knife edge, not a wall
+WEDGE_ANGLE = 60.0
+
+
+def facet_thickness(tris, spacing=0.5, max_thickness=10.0, wedge_angle=WEDGE_ANGLE, bvh=None):
+    """(n,) wall thickness per facet, inf where it exceeds max_thickness.
+
+    Thin walls need dense samples, so spacing (mm) should stay below
+    the features of interest; rays stop at max_thickness, which keeps
+    the thick parts of a solid cheap. Rays ending on a wedge (see
+    WEDGE_ANGLE) do not count.
+    """
+    tris = as_triangles(tris)
+    bvh = bvh or MeshBVH(tris)
+    points, facets = cover_points(tris, spacing)
+    centers = tris.mean(axis=1)
+    points += SHRINK * (centers[facets] - points)
+
+    normals = _unit_normals(tris)[facets]
+    # Start just inside the surface, so the start facet itself is never hit
+    eps = 1e-6 * max(float(np.ptp(tris.reshape(-1, 3), axis=0).max()), 1.0)
+    t, hit = bvh.first_hits(points - eps * normals, -normals, max_thickness)
+    hit_normals = _unit_normals(tris)[hit]
+    wedge = np.einsum('ij,ij->i', hit_normals, -normals) < np.cos(np.radians(wedge_angle))
+    t[(hit < 0) | wedge] = np.inf
+
+    thickness = np.full(len(tris), np.inf)
+    np.minimum.at(thickness, facets, t + eps)
+    return thickness
+
+
+def thin_regions(tris, thickness, min_wall=MIN_WALL):
+    """Connected groups of facets thinner than min_wall (sharing a corner), thinnest first."""
+    thin = np.flatnonzero(thickness < min_wall)
+    if not len(thin):
+        return []
+    ids = meshExport.corner_ids(tris[thin])
+    labels = np.arange(len(thin))
+    # Propagate the smallest label over shared corners until nothing changes
+    while True:
+        corner = np.full(ids.max() + 1, len(thin))
+        np.minimum.at(corner, ids.ravel(), np.repeat(labels, 3))
+        merged = corner[ids].min(axis=1)
+        if np.array_equal(merged, labels):
+            break
+        labels = merged
+
+    areas = triangle_areas(tris[thin])
+    regions = []
+    for label in np.unique(labels):
+        members = thin[labels == label]
+        points = tris[members].reshape(-1, 3)
+        weights = areas[labels == label]
+        regions.append({
+            'facets': int(len(members)),
+            'area': float(weights.sum()),
+            'min_thickness': float(thickness[members].min()),
+            'center': (tris[members].mean(axis=1).T @ weights / max(weights.sum(), 1e-30)).tolist(),
+            'bbox_min': points.min(axis=0).tolist(),
+            'bbox_max': points.max(axis=0).tolist(),
+        })
+    return sorted(regions, key=lambda region: region['min_thickness'])
+
+
+def thickness_colors(thickness, min_wall, max_thickness):
+    """RGB per facet: red below min_wall, then yellow to green up to 4 x min_wall and beyond."""
+    scale = np.clip((np.minimum(thickness, max_thickness) - min_wall) / (3 * min_wall), 0.0, 1.0)
+    colors = np.empty((len(thickness), 3), dtype=np.uint8)
+    colors[:, 0] = np.where(thickness < min_wall, 220, (230 * (1 - scale)).astype(np.uint8))
+    colors[:, 1] = np.where(thickness < min_wall, 30, 200)
+    colors[:, 2] = 40
+    return colors
+
+
+def write_map(path, tris, thickness, min_wall=MIN_WALL, max_thickness=10.0):
+    """PLY of the mesh with per-face color and thickness ('quality', max_thickness where unbounded)."""
+    vertices, faces = meshExport.triangle_mesh(tris)
+    colors = thickness_colors(thickness, min_wall, max_thickness)
+    properties = [('red', 'uchar', colors[:, 0]), ('green', 'uchar', colors[:, 1]),
+                  ('blue', 'uchar', colors[:, 2]), ('quality', 'float', np.minimum(thickness, max_thickness))]
+    with open(path, 'wb') as f:
+        f.write(meshExport.ply_bytes(vertices, faces, 'wall thickness by wallThickness.py', properties))
+    return path
+
+
+def analyze_file(path, min_wall=MIN_WALL, spacing=0.5, max_thickness=10.0, wedge_angle=WEDGE_ANGLE, map_dir=None):
+    tris = as_triangles(stlIO.read_stl(path))
+    thickness = facet_thickness(tris, spacing, max_thickness, wedge_angle)
+    areas = triangle_areas(tris)
+    finite = np.isfinite(thickness)
+    report = {
+        'facets': int(len(tris)),
+        'min_thickness': float(thickness.min()) if len(tris) else float('inf'),
+        'thin_area': float(areas[thickness < min_wall].sum()),
+        'thin_regions': thin_regions(tris, thickness, min_wall),
+        'histogram': np.histogram(thickness[finite], bins=np.arange(0.0, max_thickness + 0.5, 0.5),
+                                  weights=areas[finite])[0].tolist(),
+        'map': None,
+    }
+    if map_dir:
+        os.makedirs(map_dir, exist_ok=True)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        report['map'] = write_map(os.path.join(map_dir, stem + '.thickness.ply'), tris, thickness, min_wall,
+                                  max_thickness)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Find walls thinner than the printer can print.')
+    parser.add_argument('inputs', nargs='*', default=['.'], help='STL files or directories of them (default: .)')
+    parser.add_argument('--min-wall', type=float, default=MIN_WALL,
+                        help='thinnest printable wall in mm (default: %(default)s)')
+    parser.add_argument('--spacing', type=float, default=0.5, help='sample spacing on the surface in mm')
+    parser.add_argument('--max-thickness', type=float, default=10.0,
+                        help='rays stop here; thicker walls are not measured (default: %(default)s)')
+    parser.add_argument('--wedge-angle', type=float, default=WEDGE_ANGLE,
+                        help='ignore hits on faces turned further than this from the start face (default: %(default)s)')
+    parser.add_argument('--ply', help='write per-facet thickness maps (colored PLY) into this directory')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('--json', help='write the full report to this file')
+    args = parser.parse_args(argv)
+
+    paths = stl_paths(args.inputs)
+    options = (args.min_wall, args.spacing, args.max_thickness, args.wedge_angle, args.ply)
+    if args.jobs == 1 or len(paths) < 2:
+        reports = {path: analyze_file(path, *options) for path in paths}
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = {path: pool.submit(analyze_file, path, *options) for path in paths}
+            reports = {path: future.result() for path, future in futures.items()}
+
+    failed = False
+    for path, report in reports.items():
+        regions = report['thin_regions']
+        failed = failed or bool(regions)
+        print('%-36s min %6.3f mm  %s' % (
+            os.path.basename(path), report['min_thickness'],
+            '%d thin region(s), %.2f mm2' % (len(regions), report['thin_area']) if regions else 'ok'))
+        for region in regions:
+            print('    %6.3f mm  %7.2f mm2  at (%.2f, %.2f, %.2f)' % (
+                (region['min_thickness'], region['area']) + tuple(region['center'])))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())